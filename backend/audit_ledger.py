@@ -0,0 +1,347 @@
+# backend/audit_ledger.py
+"""
+The Append-Only Audit Ledger.
+Every AuditEntry lands here once, chained to its predecessor by SHA-256, and is never
+rewritten. I9State only carries an AuditCursor (seq + head hash) pointing at the newest entry.
+
+A chain cannot show that its own newest entries were cut off, so verification also
+checks that the entry each session's AuditCursor points at is still there, unchanged.
+
+Verify offline (exit code 1 if any chain is broken):
+
+    python -m backend.audit_ledger verify [--session SESSION_ID] [--path data/audit.db] [--sessions data/sessions.db]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from backend.models import AuditCursor, AuditEntry
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_LEDGER_PATH = os.path.join(BASE_DIR, "..", "data", "audit.db")
+
+# Group commit: appends arriving within the window share one transaction (and one fsync)
+AUDIT_FLUSH_INTERVAL_MS = float(os.getenv("AUDIT_FLUSH_INTERVAL_MS", "5"))
+AUDIT_FLUSH_MAX_BATCH = int(os.getenv("AUDIT_FLUSH_MAX_BATCH", "256"))
+AUDIT_PAGE_LIMIT = 500
+
+GENESIS_HASH = "0" * 64
+
+
+# ==========================================
+# 1. THE CHAIN
+# ==========================================
+def canonical_payload(session_id: str, seq: int, entry: AuditEntry) -> str:
+    """The exact bytes that get hashed and stored; session and seq are inside so rows cannot be moved."""
+    body = {"session_id": session_id, "seq": seq, **entry.model_dump(mode="json")}
+    return json.dumps(body, sort_keys=True, separators=(",", ":"))
+
+def chain_hash(prev_hash: str, payload: str) -> str:
+    return hashlib.sha256(f"{prev_hash}\n{payload}".encode("utf-8")).hexdigest()
+
+def verify_chain(rows: Iterable[tuple]) -> List[str]:
+    """
+    rows: (session_id, seq, payload, prev_hash, hash) ordered by session_id, seq.
+    Returns one message per problem; an empty list means every chain is intact.
+    """
+    problems = []
+    current, expected_seq, expected_prev = None, 0, GENESIS_HASH
+    for session_id, seq, payload, prev_hash, digest in rows:
+        if session_id != current:
+            current, expected_seq, expected_prev = session_id, 0, GENESIS_HASH
+        expected_seq += 1
+        where = f"{session_id}#{seq}"
+        if seq != expected_seq:
+            problems.append(f"{where}: expected seq {expected_seq} (entry missing or reordered)")
+            expected_seq = seq
+        if prev_hash != expected_prev:
+            problems.append(f"{where}: prev_hash does not match the previous entry")
+        if chain_hash(prev_hash, payload) != digest:
+            problems.append(f"{where}: hash mismatch (entry was modified)")
+        try:
+            body = json.loads(payload)
+            if body.get("session_id") != session_id or body.get("seq") != seq:
+                problems.append(f"{where}: payload belongs to {body.get('session_id')}#{body.get('seq')}")
+        except json.JSONDecodeError:
+            problems.append(f"{where}: payload is not valid JSON")
+        expected_prev = digest
+    return problems
+
+
+def verify_cursor(session_id: str, cursor: AuditCursor, digest_at_seq: Optional[str]) -> List[str]:
+    """
+    digest_at_seq: the ledger's hash at cursor.seq (None if there is no such entry).
+    Entries are appended only after the session commit, and the cursor is saved after that,
+    so a crash in between may leave the ledger one commit ahead of the session, never behind.
+    """
+    if cursor.seq == 0:
+        return []
+    if digest_at_seq is None:
+        return [f"{session_id}: session points at #{cursor.seq} but the ledger has no such entry (newest entries missing)"]
+    if digest_at_seq != cursor.head_hash:
+        return [f"{session_id}#{cursor.seq}: hash differs from the session's audit cursor (chain was rewritten)"]
+    return []
+
+
+# ==========================================
+# 2. THE SQLITE LEDGER (group-committed)
+# ==========================================
+class AuditLedger:
+    """
+    SQLite, WAL, synchronous=FULL: an acknowledged append survives a power cut.
+    Concurrent appends are buffered for AUDIT_FLUSH_INTERVAL_MS and committed together,
+    so durability costs one fsync per batch instead of one per chat turn.
+    Chain heads are read inside BEGIN IMMEDIATE, so workers sharing the file stay consistent.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_LEDGER_PATH,
+        flush_interval_ms: float = AUDIT_FLUSH_INTERVAL_MS,
+        max_batch: int = AUDIT_FLUSH_MAX_BATCH,
+    ):
+        self.path = path
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch = max_batch
+        self._pending: list = []  # (session_id, entries, future)
+        self._pending_entries = 0
+        self._flush_task: Optional[asyncio.Task] = None
+        self._db_lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute("PRAGMA busy_timeout=30000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS audit ("
+            " session_id TEXT NOT NULL,"
+            " seq INTEGER NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " prev_hash TEXT NOT NULL,"
+            " hash TEXT NOT NULL,"
+            " PRIMARY KEY (session_id, seq))"
+        )
+        # Append-only at the storage layer too: rewriting history needs dropping the triggers first
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS audit_no_update BEFORE UPDATE ON audit "
+            "BEGIN SELECT RAISE(ABORT, 'audit ledger is append-only'); END"
+        )
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS audit_no_delete BEFORE DELETE ON audit "
+            "BEGIN SELECT RAISE(ABORT, 'audit ledger is append-only'); END"
+        )
+
+    # ---------- writes ----------
+    async def append(self, session_id: str, entries: List[AuditEntry]) -> Optional[AuditCursor]:
+        """Resolves once the entries are durably committed; returns the session's new head."""
+        if not entries:
+            return None
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((session_id, entries, future))
+        self._pending_entries += len(entries)
+        if self._pending_entries >= self.max_batch:
+            loop.create_task(self._flush())
+        elif self._flush_task is None:
+            self._flush_task = loop.create_task(self._flush_later())
+        return await future
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        await self._flush()
+
+    async def _flush(self) -> None:
+        batch, self._pending, self._pending_entries = self._pending, [], 0
+        if self._flush_task is not None and self._flush_task is not asyncio.current_task():
+            self._flush_task.cancel()
+        self._flush_task = None
+        if not batch:
+            return
+        try:
+            cursors = await asyncio.to_thread(self._write_batch, [(s, e) for s, e, _ in batch])
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, future), cursor in zip(batch, cursors):
+            if not future.done():
+                future.set_result(cursor)
+
+    def _write_batch(self, batch: List[tuple]) -> List[AuditCursor]:
+        with self._db_lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                heads, cursors = {}, []
+                for session_id, entries in batch:
+                    seq, prev_hash = heads.get(session_id) or self._head_sync(session_id)
+                    rows = []
+                    for entry in entries:
+                        seq += 1
+                        payload = canonical_payload(session_id, seq, entry)
+                        digest = chain_hash(prev_hash, payload)
+                        rows.append((session_id, seq, payload, prev_hash, digest))
+                        prev_hash = digest
+                    conn.executemany(
+                        "INSERT INTO audit (session_id, seq, payload, prev_hash, hash) VALUES (?, ?, ?, ?, ?)", rows
+                    )
+                    heads[session_id] = (seq, prev_hash)
+                    cursors.append(AuditCursor(seq=seq, head_hash=prev_hash))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return cursors
+
+    def _head_sync(self, session_id: str) -> tuple:
+        row = self._conn.execute(
+            "SELECT seq, hash FROM audit WHERE session_id = ? ORDER BY seq DESC LIMIT 1", (session_id,)
+        ).fetchone()
+        return (row[0], row[1]) if row else (0, GENESIS_HASH)
+
+    # ---------- reads ----------
+    def _read_sync(self, session_id: str, after: int, limit: int) -> List[dict]:
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT seq, payload, prev_hash, hash FROM audit WHERE session_id = ? AND seq > ? "
+                "ORDER BY seq LIMIT ?",
+                (session_id, after, limit),
+            ).fetchall()
+        entries = []
+        for seq, payload, prev_hash, digest in rows:
+            body = json.loads(payload)
+            body.pop("session_id", None)
+            body.update(prev_hash=prev_hash, hash=digest)
+            entries.append(body)
+        return entries
+
+    async def read(self, session_id: str, after: int = 0, limit: int = 100) -> List[dict]:
+        """One page of a session's entries with seq > after, oldest first."""
+        return await asyncio.to_thread(self._read_sync, session_id, after, max(1, min(limit, AUDIT_PAGE_LIMIT)))
+
+    async def head(self, session_id: str) -> AuditCursor:
+        def _head():
+            with self._db_lock:
+                seq, digest = self._head_sync(session_id)
+            return AuditCursor(seq=seq, head_hash=digest if seq else None)
+        return await asyncio.to_thread(_head)
+
+    def _digest_at_sync(self, session_id: str, seq: int) -> Optional[str]:
+        row = self._conn.execute("SELECT hash FROM audit WHERE session_id = ? AND seq = ?", (session_id, seq)).fetchone()
+        return row[0] if row else None
+
+    async def check_cursor(self, session_id: str, cursor: AuditCursor) -> List[str]:
+        """One indexed lookup: is the entry the session points at still in the ledger, unchanged?"""
+        def _check():
+            with self._db_lock:
+                digest = self._digest_at_sync(session_id, cursor.seq)
+            return verify_cursor(session_id, cursor, digest)
+        return await asyncio.to_thread(_check)
+
+    def verify_sync(self, session_id: Optional[str] = None,
+                    cursors: Optional[Dict[str, AuditCursor]] = None) -> List[str]:
+        """Every link of the chain(s), plus each session's cursor when cursors are given."""
+        with self._db_lock:
+            if session_id is None:
+                rows = self._conn.execute(
+                    "SELECT session_id, seq, payload, prev_hash, hash FROM audit ORDER BY session_id, seq"
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT session_id, seq, payload, prev_hash, hash FROM audit WHERE session_id = ? ORDER BY seq",
+                    (session_id,),
+                ).fetchall()
+            digests = {
+                sid: self._digest_at_sync(sid, cursor.seq)
+                for sid, cursor in (cursors or {}).items()
+                if session_id is None or sid == session_id
+            }
+        problems = verify_chain(rows)
+        for sid, digest in digests.items():
+            problems.extend(verify_cursor(sid, cursors[sid], digest))
+        return problems
+
+    async def verify(self, session_id: Optional[str] = None,
+                     cursors: Optional[Dict[str, AuditCursor]] = None) -> List[str]:
+        return await asyncio.to_thread(self.verify_sync, session_id, cursors)
+
+    async def close(self) -> None:
+        if self._pending:
+            await self._flush()
+        with self._db_lock:
+            self._conn.close()
+
+
+def create_audit_ledger() -> AuditLedger:
+    return AuditLedger(path=os.getenv("AUDIT_LEDGER_PATH", DEFAULT_LEDGER_PATH))
+
+
+# ==========================================
+# 3. OFFLINE VERIFIER
+# ==========================================
+def read_session_cursors(path: str, session_id: Optional[str] = None) -> Dict[str, AuditCursor]:
+    """Audit cursors of the sessions in a SQLite session store, opened read-only."""
+    from backend.session_store import STATE_NAMESPACE, deserialize_state
+
+    conn = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+    query, params = "SELECT key, value FROM kv WHERE namespace = ?", (STATE_NAMESPACE,)
+    if session_id:
+        query, params = query + " AND key = ?", params + (session_id,)
+    try:
+        return {key: deserialize_state(value).audit_cursor for key, value in conn.execute(query, params)}
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify the hash chains of the I-9 audit ledger.")
+    parser.add_argument("command", choices=["verify"])
+    parser.add_argument("--session", default=None, help="Only verify this session's chain")
+    parser.add_argument("--path", default=os.getenv("AUDIT_LEDGER_PATH", DEFAULT_LEDGER_PATH))
+    parser.add_argument("--sessions", default=None,
+                        help="SQLite session store whose audit cursors must match the ledger (detects truncation)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"No audit ledger at {args.path}")
+        sys.exit(2)
+    # Read-only: verification must never be able to alter the evidence
+    conn = sqlite3.connect(f"file:{os.path.abspath(args.path)}?mode=ro", uri=True)
+    query = "SELECT session_id, seq, payload, prev_hash, hash FROM audit"
+    params = ()
+    if args.session:
+        query += " WHERE session_id = ?"
+        params = (args.session,)
+    rows = conn.execute(query + " ORDER BY session_id, seq", params)
+
+    count, sessions = 0, set()
+    def counted(cursor):
+        nonlocal count
+        for row in cursor:
+            count += 1
+            sessions.add(row[0])
+            yield row
+
+    problems = verify_chain(counted(rows))
+    if args.sessions:
+        for session_id, cursor in read_session_cursors(args.sessions, args.session).items():
+            row = conn.execute(
+                "SELECT hash FROM audit WHERE session_id = ? AND seq = ?", (session_id, cursor.seq)
+            ).fetchone()
+            problems.extend(verify_cursor(session_id, cursor, row[0] if row else None))
+    conn.close()
+    for problem in problems:
+        print(f"BROKEN {problem}")
+    print(f"Checked {count} entries across {len(sessions)} sessions: {'OK' if not problems else f'{len(problems)} problems'}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+# backend/backoffice_index.py
+"""
+The HR Back-Office Index.
+Secondary indexes over every live session, so HR can ask "who is blocked on
+RESOLVE_SSN_STATUS_FOR_EVERIFY?" or "whose Section 1 is overdue?" without
+deserializing every I9State:
+
+  facets     gap / citizenship / workflow / employer / ready -> set of session ids
+  deadlines  section1 / section2 / reverification    -> sorted (date ordinal, session id)
+
+Chat turns update it incrementally after each committed state. It is rebuilt from the
+session store on first use and every BACKOFFICE_REBUILD_SECONDS (which also drops
+expired sessions); with a store shared across workers (SQLite), other workers' writes
+are pulled in every BACKOFFICE_REFRESH_SECONDS.
+"""
+import asyncio
+import heapq
+import os
+import time
+from bisect import bisect_left, insort
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from backend.models import I9State
+from backend.session_store import SessionStore, deserialize_state
+
+BACKOFFICE_REFRESH_SECONDS = float(os.getenv("BACKOFFICE_REFRESH_SECONDS", "2"))
+BACKOFFICE_REBUILD_SECONDS = float(os.getenv("BACKOFFICE_REBUILD_SECONDS", "300"))
+BACKOFFICE_PAGE_LIMIT = 500
+
+FACETS = ("gap", "citizenship", "workflow", "employer", "ready")
+DEADLINE_KINDS = ("section1", "section2", "reverification")
+UNKNOWN = "unknown"
+# Sorts after every real date, so sessions without a deadline page last
+_NO_DEADLINE = date.max.toordinal() + 1
+
+
+# ==========================================
+# 1. THE INDEXED PROJECTION
+# ==========================================
+@dataclass
+class SessionSummary:
+    session_id: str
+    employer: str
+    employee_name: str
+    citizenship: str
+    workflow: str
+    gaps: Tuple[str, ...]
+    ready: bool
+    deadlines: Dict[str, date] = field(default_factory=dict)
+
+    def facet_values(self) -> Iterable[Tuple[str, str]]:
+        for gap in self.gaps:
+            yield "gap", gap
+        yield "citizenship", self.citizenship
+        yield "workflow", self.workflow
+        yield "employer", self.employer
+        yield "ready", "true" if self.ready else "false"
+
+    def to_dict(self) -> dict:
+        return {
+            "session_id": self.session_id,
+            "employer": self.employer,
+            "employee_name": self.employee_name,
+            "citizenship_status": self.citizenship,
+            "workflow_mode": self.workflow,
+            "compliance_gaps": list(self.gaps),
+            "is_ready_for_form": self.ready,
+            "deadlines": {kind: due.isoformat() for kind, due in self.deadlines.items()},
+        }
+
+
+def section1_due(state: I9State) -> Optional[date]:
+    """Section 1 is due on the HR-provided date, else by the first day of employment; none once completed."""
+    if state.sla_tracking.section1_completed_at is not None:
+        return None
+    try:
+        return date.fromisoformat(state.employee.section1_due_date)
+    except (TypeError, ValueError):
+        # Free text like "EOD Today" carries no date we can index
+        return state.sla_tracking.hire_date or state.employee.hire_date
+
+
+def summarize_state(session_id: str, state: I9State) -> SessionSummary:
+    deadlines = {
+        "section1": section1_due(state),
+        "section2": state.sla_tracking.section2_due_date,
+        "reverification": state.sla_tracking.reverification_due_date,
+    }
+    return SessionSummary(
+        session_id=session_id,
+        employer=state.employer.company_name,
+        employee_name=f"{state.employee.first_name} {state.employee.last_name}".strip(),
+        citizenship=state.citizenship_status or UNKNOWN,
+        workflow=state.workflow_mode or UNKNOWN,
+        gaps=tuple(state.compliance_gaps),
+        ready=state.is_ready_for_form,
+        deadlines={kind: due for kind, due in deadlines.items() if due is not None},
+    )
+
+
+def _summarize_entries(entries: List[Tuple[str, bytes, float]]) -> List[SessionSummary]:
+    return [summarize_state(key, deserialize_state(value)) for key, value, _ in entries]
+
+
+# ==========================================
+# 2. THE INDEX
+# ==========================================
+class BackOfficeIndex:
+    """
+    The Filing Cabinet.
+    Every mutation is synchronous and runs on the event loop, so queries always see a
+    consistent index without locks. Facet filters intersect id sets (smallest first);
+    deadline ranges are two bisects; paging takes the k smallest instead of sorting all.
+    """
+
+    def __init__(self):
+        self._rows: Dict[str, SessionSummary] = {}
+        self._facets: Dict[str, Dict[str, Set[str]]] = {facet: {} for facet in FACETS}
+        self._deadlines: Dict[str, List[Tuple[int, str]]] = {kind: [] for kind in DEADLINE_KINDS}
+        self._built_at: Optional[float] = None
+        self._polled_at = 0.0
+        self._watermark = 0.0
+        # Local updates made while a rebuild/poll was off the loop, replayed over its result
+        self._touched: Optional[Dict[str, Optional[I9State]]] = None
+        self._refresh_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    # --- mutations ---
+    def update(self, session_id: str, state: I9State) -> None:
+        """Called after a session's new state is committed to the store."""
+        if self._touched is not None:
+            self._touched[session_id] = state
+        self._put(summarize_state(session_id, state))
+
+    def remove(self, session_id: str) -> None:
+        if self._touched is not None:
+            self._touched[session_id] = None
+        self._drop(session_id)
+
+    def _put(self, row: SessionSummary) -> None:
+        self._drop(row.session_id)
+        self._rows[row.session_id] = row
+        for facet, value in row.facet_values():
+            self._facets[facet].setdefault(value, set()).add(row.session_id)
+        for kind, due in row.deadlines.items():
+            insort(self._deadlines[kind], (due.toordinal(), row.session_id))
+
+    def _drop(self, session_id: str) -> None:
+        row = self._rows.pop(session_id, None)
+        if row is None:
+            return
+        for facet, value in row.facet_values():
+            bucket = self._facets[facet].get(value)
+            if bucket is not None:
+                bucket.discard(session_id)
+                if not bucket:
+                    del self._facets[facet][value]
+        for kind, due in row.deadlines.items():
+            entries = self._deadlines[kind]
+            position = bisect_left(entries, (due.toordinal(), session_id))
+            if position < len(entries) and entries[position][1] == session_id:
+                del entries[position]
+
+    def _load(self, rows: List[SessionSummary]) -> None:
+        """Bulk build: one sort per deadline kind instead of an insort per row."""
+        for row in rows:
+            self._rows[row.session_id] = row
+            for facet, value in row.facet_values():
+                self._facets[facet].setdefault(value, set()).add(row.session_id)
+            for kind, due in row.deadlines.items():
+                self._deadlines[kind].append((due.toordinal(), row.session_id))
+        for entries in self._deadlines.values():
+            entries.sort()
+
+    # --- keeping up with the store ---
+    async def refresh(self, store: SessionStore) -> None:
+        """Rebuilds when never built or stale; otherwise pulls other workers' writes from shared stores."""
+        now = time.monotonic()
+        rebuild = self._built_at is None or now - self._built_at > BACKOFFICE_REBUILD_SECONDS
+        poll = store.shared and now - self._polled_at > BACKOFFICE_REFRESH_SECONDS
+        if not rebuild and not poll:
+            return
+        async with self._refresh_lock:
+            if self._built_at is None or time.monotonic() - self._built_at > BACKOFFICE_REBUILD_SECONDS:
+                await self.rebuild(store)
+            elif store.shared and time.monotonic() - self._polled_at > BACKOFFICE_REFRESH_SECONDS:
+                await self._poll(store)
+
+    async def rebuild(self, store: SessionStore) -> int:
+        self._touched = {}
+        try:
+            started = time.monotonic()
+            entries = await store.scan_states()
+            fresh = BackOfficeIndex()
+            await asyncio.to_thread(lambda: fresh._load(_summarize_entries(entries)))
+            self._rows, self._facets, self._deadlines = fresh._rows, fresh._facets, fresh._deadlines
+            self._replay_touched()
+            self._watermark = max((updated_at for _, _, updated_at in entries), default=self._watermark)
+            self._built_at = self._polled_at = started
+        finally:
+            self._touched = None
+        return len(self._rows)
+
+    async def _poll(self, store: SessionStore) -> None:
+        self._touched = {}
+        try:
+            self._polled_at = time.monotonic()
+            entries = await store.scan_states(updated_after=self._watermark)
+            if entries:
+                for row in await asyncio.to_thread(_summarize_entries, entries):
+                    self._put(row)
+                self._replay_touched()
+                self._watermark = entries[-1][2]
+        finally:
+            self._touched = None
+
+    def _replay_touched(self) -> None:
+        for session_id, state in self._touched.items():
+            if state is None:
+                self._drop(session_id)
+            else:
+                self._put(summarize_state(session_id, state))
+
+    # --- queries ---
+    def _due_ids(self, kind: str, due_after: Optional[date], due_before: Optional[date]) -> Set[str]:
+        """Sessions with a `kind` deadline in [due_after, due_before] (both inclusive, either open)."""
+        entries = self._deadlines[kind]
+        lo = bisect_left(entries, (due_after.toordinal(),)) if due_after else 0
+        hi = bisect_left(entries, (due_before.toordinal() + 1,)) if due_before else len(entries)
+        return {session_id for _, session_id in entries[lo:hi]}
+
+    def _candidates(self, filters: Dict[str, Optional[str]], ready: Optional[bool], due_kind: str,
+                    due_after: Optional[date], due_before: Optional[date]) -> Optional[Set[str]]:
+        """Matching session ids, or None when nothing narrows the search (every session)."""
+        if ready is not None:
+            filters = {**filters, "ready": "true" if ready else "false"}
+        sets: List[Set[str]] = [self._facets[facet].get(value, set()) for facet, value in filters.items() if value]
+        if due_after or due_before:
+            sets.append(self._due_ids(due_kind, due_after, due_before))
+        if not sets:
+            return None
+        sets.sort(key=len)
+        candidates = set(sets[0])
+        for other in sets[1:]:
+            candidates &= other
+            if not candidates:
+                break
+        return candidates
+
+    def query(self, gap: Optional[str] = None, citizenship: Optional[str] = None, workflow: Optional[str] = None,
+              employer: Optional[str] = None, ready: Optional[bool] = None, due_kind: str = "section1",
+              due_after: Optional[date] = None, due_before: Optional[date] = None,
+              offset: int = 0, limit: int = 50) -> dict:
+        """One page of matching sessions, soonest `due_kind` deadline first (then by session id)."""
+        if due_kind not in DEADLINE_KINDS:
+            raise ValueError(f"due_kind must be one of {', '.join(DEADLINE_KINDS)}")
+        limit = max(1, min(limit, BACKOFFICE_PAGE_LIMIT))
+        offset = max(0, offset)
+        filters = {"gap": gap, "citizenship": citizenship, "workflow": workflow, "employer": employer}
+        candidates = self._candidates(filters, ready, due_kind, due_after, due_before)
+        pool = candidates if candidates is not None else self._rows.keys()
+
+        def order(session_id: str) -> Tuple[int, str]:
+            due = self._rows[session_id].deadlines.get(due_kind)
+            return (due.toordinal() if due else _NO_DEADLINE, session_id)
+
+        page = heapq.nsmallest(offset + limit, pool, key=order)[offset:]
+        total = len(pool)
+        return {
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "next_offset": offset + limit if offset + limit < total else None,
+            "sessions": [self._rows[session_id].to_dict() for session_id in page],
+        }
+
+    def counts(self, employer: Optional[str] = None, today: Optional[date] = None, due_soon_days: int = 7) -> dict:
+        """Aggregate counts per facet value plus overdue / due-soon per deadline kind."""
+        today = today or date.today()
+        scope = self._facets["employer"].get(employer, set()) if employer else None
+
+        def count(ids: Set[str]) -> int:
+            return len(ids) if scope is None else len(ids & scope)
+
+        facets = {
+            facet: {value: count(ids) for value, ids in sorted(values.items())}
+            for facet, values in self._facets.items()
+            if facet != "employer" or scope is None
+        }
+        deadlines = {
+            kind: {
+                "overdue": count(self._due_ids(kind, None, today - timedelta(days=1))),
+                "due_soon": count(self._due_ids(kind, today, today + timedelta(days=due_soon_days))),
+            }
+            for kind in DEADLINE_KINDS
+        }
+        return {
+            "sessions": len(self._rows) if scope is None else len(scope),
+            "ready_for_form": count(self._facets["ready"].get("true", set())),
+            "facets": {facet: {value: n for value, n in values.items() if n} for facet, values in facets.items()},
+            "deadlines": deadlines,
+            "as_of": today.isoformat(),
+        }
@@ -0,0 +1,92 @@
+# backend/bm25.py
+import math
+import re
+from typing import Dict, List, Sequence, Tuple
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Unigrams plus adjacent bigrams, hyphenated ids kept whole.
+    "List C" -> ["list", "c", "list c"]; "I-94" -> ["i-94"]. The bigram is what lets a
+    two-word term of art outrank documents that merely contain both words.
+    """
+    tokens = _TOKEN.findall(text.lower())
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+class BM25Index:
+    """
+    The Keyword Index.
+    Classic Okapi BM25 over the same chunks that live in the vector store, with
+    postings lists so a query only touches documents that contain its terms.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids: List[str] = []
+        self.documents: List[str] = []
+        self._position: Dict[str, int] = {}
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._doc_len: List[int] = []
+        self._avg_len = 0.0
+        self._idf: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def build(self, ids: Sequence[str], documents: Sequence[str]) -> "BM25Index":
+        self.ids = list(ids)
+        self.documents = list(documents)
+        self._position = {chunk_id: i for i, chunk_id in enumerate(self.ids)}
+        self._postings = {}
+        self._doc_len = []
+        for doc_index, text in enumerate(self.documents):
+            terms = tokenize(text)
+            self._doc_len.append(len(terms))
+            counts = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, tf in counts.items():
+                self._postings.setdefault(term, []).append((doc_index, tf))
+
+        n = len(self.documents)
+        self._avg_len = (sum(self._doc_len) / n) if n else 0.0
+        self._idf = {
+            term: math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+        return self
+
+    def search(self, query: str, n_results: int = 3) -> List[Tuple[str, float]]:
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf[term]
+            for doc_index, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self._doc_len[doc_index] / self._avg_len)
+                scores[doc_index] = scores.get(doc_index, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:n_results]
+        return [(self.ids[doc_index], score) for doc_index, score in ranked]
+
+    def document(self, chunk_id: str) -> str:
+        return self.documents[self._position[chunk_id]]
+
+    def has_phrase(self, phrase: str) -> bool:
+        """True when every unigram/bigram of the phrase occurs somewhere in the corpus."""
+        terms = tokenize(phrase)
+        return bool(terms) and all(term in self._postings for term in terms)
+
+
+def reciprocal_rank_fusion(result_lists: Sequence[Sequence[str]], k: int = 60) -> List[str]:
+    """Merges ranked id lists: score(d) = sum over lists of 1 / (k + rank)."""
+    scores: Dict[str, float] = {}
+    for results in result_lists:
+        for rank, chunk_id in enumerate(results, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
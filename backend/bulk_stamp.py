@@ -0,0 +1,301 @@
+# backend/bulk_stamp.py
+"""
+Roster-driven Section 1 stamping for seasonal onboarding cohorts.
+
+    python -m backend.bulk_stamp roster.jsonl --format pdf
+    python -m backend.bulk_stamp roster.json --format zip --workers 8 --out output/batches
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+import uuid
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from typing import Iterator, List, Optional
+
+from backend.pdf_service import (
+    BASE_DIR, FIELD_COORDS, MultiFormWriter, get_template, safe_filename_part, stamp_section1,
+)
+
+BULK_OUTPUT_DIR = os.path.join(BASE_DIR, "..", "output", "batches")
+BULK_WORKERS = int(os.getenv("BULK_STAMP_WORKERS", str(os.cpu_count() or 2)))
+BULK_EXECUTOR = os.getenv("BULK_STAMP_EXECUTOR", "process")
+# Cap on errors echoed back in the report; the full list is always written to report.json
+REPORT_ERROR_LIMIT = 200
+
+FORMATS = ("pdf", "zip", "dir")
+
+
+class RosterError(ValueError):
+    """A single roster record that cannot be stamped. Reported, never fatal to the batch."""
+
+
+# ==========================================
+# 1. STREAMING ROSTER READERS (bounded memory)
+# ==========================================
+def _element_end(buffer: str) -> Optional[int]:
+    """Offset of the "," or "]" closing the first array element in buffer, None if not buffered yet."""
+    depth, in_string, escaped = 0, False, False
+    for position, char in enumerate(buffer):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "[{":
+            depth += 1
+        elif char in "]}" and depth > 0:
+            depth -= 1
+        elif char in ",]" and depth == 0:
+            return position
+    return None
+
+
+def _iter_json_array(fp, chunk_size: int = 64 * 1024) -> Iterator:
+    """
+    Yields the elements of a top-level JSON array without loading the whole file.
+    A malformed element is yielded as a RosterError and parsing resumes after it.
+    """
+    decoder = json.JSONDecoder()
+    buffer, started, eof = "", False, False
+    while True:
+        if not eof and len(buffer) < chunk_size:
+            chunk = fp.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+        buffer = buffer.lstrip()
+        if not started:
+            if not buffer:
+                return
+            if buffer[0] != "[":
+                raise ValueError("Roster must be a JSON array or JSON Lines")
+            buffer, started = buffer[1:], True
+            continue
+        if buffer.startswith("]"):
+            return
+        if buffer.startswith(","):
+            buffer = buffer[1:]
+            continue
+        try:
+            value, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError as e:
+            end = _element_end(buffer)
+            if end is None and not eof:
+                # Most likely just cut off at the chunk boundary
+                chunk = fp.read(chunk_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+            yield RosterError(f"Invalid JSON: {e.msg}")
+            if end is None:
+                return
+            buffer = buffer[end:]
+            continue
+        yield value
+        buffer = buffer[end:]
+
+
+def iter_roster(path: str) -> Iterator[tuple]:
+    """Yields (index, record) or (index, RosterError) for .json arrays and .jsonl files."""
+    with open(path, "r", encoding="utf-8") as fp:
+        head = fp.read(1024).lstrip()
+        fp.seek(0)
+        if head.startswith("["):
+            for index, record in enumerate(_iter_json_array(fp)):
+                yield index, record
+            return
+        index = 0
+        for line in fp:
+            if not line.strip():
+                continue
+            try:
+                yield index, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield index, RosterError(f"Invalid JSON: {e.msg}")
+            index += 1
+
+
+# ==========================================
+# 2. PER-RECORD WORK
+# ==========================================
+def check_record(record) -> dict:
+    if not isinstance(record, dict):
+        raise RosterError("Record must be a JSON object")
+    if not record.get("first_name") or not record.get("last_name"):
+        raise RosterError("first_name and last_name are required")
+    for key in FIELD_COORDS:
+        value = record.get(key)
+        if value is not None and not isinstance(value, (str, int, float)):
+            raise RosterError(f"{key} must be a scalar value")
+    return record
+
+
+def output_filename(index: int, record: dict) -> str:
+    """Collision-free: the roster position is unique, the digest ties the file to its record."""
+    digest = hashlib.sha256(json.dumps(record, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:10]
+    who = safe_filename_part(record.get("employee_id") or f"{record.get('first_name')}_{record.get('last_name')}", "employee")
+    return f"i9_section1_{index:06d}_{who}_{digest}.pdf"
+
+
+def _stamp_to_dir(index: int, record, out_dir: str) -> str:
+    record = check_record(record)
+    filename = output_filename(index, record)
+    with open(os.path.join(out_dir, filename), "wb") as f:
+        f.write(stamp_section1(record))
+    return filename
+
+
+def _stamp_to_bytes(index: int, record) -> tuple:
+    record = check_record(record)
+    return output_filename(index, record), stamp_section1(record)
+
+
+def _warm_worker():
+    get_template()
+
+
+# ==========================================
+# 3. THE BATCH RUNNER
+# ==========================================
+@dataclass
+class BatchReport:
+    batch_id: str
+    format: str
+    total: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    seconds: float = 0.0
+    artifact: Optional[str] = None
+    errors: List[dict] = field(default_factory=list)
+
+    def record_error(self, index: int, record, error: Exception) -> None:
+        self.failed += 1
+        employee_id = record.get("employee_id") if isinstance(record, dict) else None
+        self.errors.append({"index": index, "employee_id": employee_id, "error": str(error)})
+
+    def summary(self) -> dict:
+        data = asdict(self)
+        data["errors"] = self.errors[:REPORT_ERROR_LIMIT]
+        data["errors_truncated"] = len(self.errors) > REPORT_ERROR_LIMIT
+        return data
+
+
+def run_batch(
+    roster: Iterator[tuple],
+    fmt: str = "pdf",
+    out_root: str = BULK_OUTPUT_DIR,
+    workers: int = BULK_WORKERS,
+    executor_kind: str = BULK_EXECUTOR,
+) -> BatchReport:
+    """
+    Stamps every roster record into out_root/<batch_id>/ as:
+      pdf -> one multi-form PDF (shared template resources, smallest and fastest)
+      zip -> one zip of individual PDFs
+      dir -> individual PDFs written directly by the workers
+    Bad records are collected in the report; the batch always runs to the end.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {FORMATS}")
+
+    report = BatchReport(batch_id=f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}", format=fmt)
+    out_dir = os.path.join(out_root, report.batch_id)
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+
+    if fmt == "pdf":
+        # One sequential writer; each form is a ~1 KB append, so no pool is needed
+        report.artifact = os.path.join(out_dir, "i9_section1_batch.pdf")
+        with open(report.artifact, "wb") as fp:
+            writer = MultiFormWriter(get_template(), fp)
+            for index, record in roster:
+                report.total += 1
+                try:
+                    if isinstance(record, Exception):
+                        raise record
+                    writer.add(check_record(record))
+                    report.succeeded += 1
+                except Exception as e:
+                    report.record_error(index, record, e)
+            writer.close()
+    else:
+        pool_cls = ProcessPoolExecutor if executor_kind == "process" else ThreadPoolExecutor
+        archive = zipfile.ZipFile(os.path.join(out_dir, "i9_section1_batch.zip"), "w", zipfile.ZIP_STORED) if fmt == "zip" else None
+        # Bounded in-flight work keeps memory flat no matter how long the roster is
+        max_in_flight = workers * 4
+        in_flight = {}
+
+        def drain(block_until_below: int) -> None:
+            while len(in_flight) > block_until_below:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, record = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                        if archive is not None:
+                            filename, pdf_bytes = result
+                            archive.writestr(filename, pdf_bytes)
+                        report.succeeded += 1
+                    except Exception as e:
+                        report.record_error(index, record, e)
+
+        with pool_cls(max_workers=workers, initializer=_warm_worker) as pool:
+            for index, record in roster:
+                report.total += 1
+                if isinstance(record, Exception):
+                    report.record_error(index, None, record)
+                    continue
+                if archive is not None:
+                    future = pool.submit(_stamp_to_bytes, index, record)
+                else:
+                    future = pool.submit(_stamp_to_dir, index, record, out_dir)
+                in_flight[future] = (index, record)
+                drain(max_in_flight - 1)
+            drain(0)
+
+        if archive is not None:
+            archive.close()
+            report.artifact = archive.filename
+        else:
+            report.artifact = out_dir
+
+    report.errors.sort(key=lambda error: error["index"])
+    report.seconds = round(time.perf_counter() - start, 3)
+    with open(os.path.join(out_dir, "report.json"), "w", encoding="utf-8") as f:
+        json.dump(asdict(report), f, indent=2)
+    return report
+
+
+def find_artifact(batch_id: str, out_root: str = BULK_OUTPUT_DIR) -> Optional[str]:
+    """Resolves a batch id to its downloadable file, refusing anything outside out_root."""
+    if safe_filename_part(batch_id, "") != batch_id:
+        return None
+    batch_dir = os.path.join(out_root, batch_id)
+    for name in ("i9_section1_batch.pdf", "i9_section1_batch.zip"):
+        path = os.path.join(batch_dir, name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-stamp Section 1 PDFs from an HR roster (JSON array or JSONL).")
+    parser.add_argument("roster")
+    parser.add_argument("--format", choices=FORMATS, default="pdf")
+    parser.add_argument("--out", default=BULK_OUTPUT_DIR)
+    parser.add_argument("--workers", type=int, default=BULK_WORKERS)
+    parser.add_argument("--executor", choices=("process", "thread"), default=BULK_EXECUTOR)
+    args = parser.parse_args()
+
+    report = run_batch(iter_roster(args.roster), args.format, args.out, args.workers, args.executor)
+    print(json.dumps(report.summary(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
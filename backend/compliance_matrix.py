@@ -1,34 +1,62 @@
 # backend/compliance_matrix.py
 from typing import List
 from backend.models import I9State
+from backend.rules_engine import Derive, Gap, MISSING, PRESENT, compile_rules, one_of
 
-def evaluate_compliance_gaps(state: I9State) -> List[str]:
-    """
-    The Mathematical Gap Engine.
-    Determines exactly what conversational confirmations are still required
-    before the Section 1 Form UI can be legally unlocked.
-    """
-    gaps = []
-
+# ==========================================
+# THE COMPLIANCE MATRIX (single source of truth)
+# ==========================================
+# Every gap, UI requirement and document list the backend enforces is declared here
+# and nowhere else. backend/state_machine.py and evaluate_compliance_gaps() both run
+# this table through the compiled engine in backend/rules_engine.py.
+COMPLIANCE_RULES = [
     # 1. CORE REQUIREMENT: Immigration Status
     # The employee MUST confirm their status, even if HR pre-loaded it.
-    if not state.citizenship_status:
-        gaps.append("CONFIRM_CITIZENSHIP_STATUS")
-        # Fatal gap. Do not evaluate other conditions until this is resolved.
-        return gaps 
+    # Fatal gap: every other rule below requires a status, so nothing else fires until it is resolved.
+    Gap("CONFIRM_CITIZENSHIP_STATUS", when={"citizenship_status": MISSING}),
 
     # 2. E-VERIFY REQUIREMENT: Social Security Number
     # If the employer uses E-Verify, we must resolve the SSN situation BEFORE drawing the form.
-    if state.employer.uses_everify:
-        # If they haven't explicitly provided an SSN or a receipt, it's a gap.
-        if not state.ssn_provided and not state.ssn_receipt_provided:
-            gaps.append("RESOLVE_SSN_STATUS_FOR_EVERIFY")
+    Gap("RESOLVE_SSN_STATUS_FOR_EVERIFY", when={
+        "citizenship_status": PRESENT,
+        "employer.uses_everify": True,
+        "ssn_status_resolved": False,
+    }),
 
     # 3. ALIEN AUTHORIZED REQUIREMENT: Expiration Date
     # If they are AAW, we must explicitly confirm their expiration date status.
-    if state.citizenship_status == "alien_authorized":
-        # We need a flag to ensure the AI actually asked them about this
-        if not getattr(state, 'expiration_date_resolved', False):
-            gaps.append("CONFIRM_WORK_AUTH_EXPIRATION")
+    Gap("CONFIRM_WORK_AUTH_EXPIRATION", when={
+        "citizenship_status": "alien_authorized",
+        "expiration_date_resolved": False,
+    }),
+
+    # 4. UI INSTRUCTIONS (deny-by-default)
+    Derive("requires_alien_number", default=False, cases=(({"citizenship_status": "lpr"}, True),)),
+    Derive("requires_uscis_number", default=False, cases=(({"citizenship_status": "lpr"}, True),)),
+    # Rule: Expiration date is required for most EADs and Visas
+    Derive("requires_expiration_date", default=False, cases=(({"citizenship_status": "alien_authorized"}, True),)),
+    # INA §1324b Guardrail: Give the employee the choice of identifier.
+    # We do not force an I-94 just because they said "H-1B". We offer all valid options.
+    Derive("alien_identifier_options", default=[], cases=(
+        ({"citizenship_status": "alien_authorized"}, ["alien_number", "i94_number", "passport"]),
+    )),
+    # INA §1324b Guardrail: Neutral pathway presentation for every status
+    Derive("eligible_document_lists", default=[], cases=(
+        ({"citizenship_status": one_of("citizen", "noncitizen_national", "lpr", "alien_authorized")}, ["LIST_A", "LIST_B_AND_C"]),
+    )),
 
-    return gaps
\ No newline at end of file
+    # 5. READINESS: the form unlocks only when nothing is blocking it
+    Derive("is_ready_for_form", default=False, cases=(
+        ({"workflow_mode": PRESENT, "citizenship_status": PRESENT, "compliance_gaps": MISSING}, True),
+    )),
+]
+
+COMPLIANCE_ENGINE = compile_rules(COMPLIANCE_RULES)
+
+def evaluate_compliance_gaps(state: I9State) -> List[str]:
+    """
+    The Mathematical Gap Engine.
+    Determines exactly what conversational confirmations are still required
+    before the Section 1 Form UI can be legally unlocked.
+    """
+    return COMPLIANCE_ENGINE.gaps_for(state)
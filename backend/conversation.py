@@ -0,0 +1,117 @@
+# backend/conversation.py
+import os
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from backend.metrics import counter
+from backend.session_store import SessionStore
+
+HISTORY_NAMESPACE = "history"
+
+# Prompt budget for replayed conversation (verbatim window + rolling summary)
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))
+# Upper bound for the rolling summary itself; the oldest summary lines fall off first
+HISTORY_SUMMARY_TOKEN_BUDGET = int(os.getenv("HISTORY_SUMMARY_TOKEN_BUDGET", "300"))
+
+HISTORY_TOKENS_SAVED = counter(
+    "history_prompt_tokens_saved_total",
+    "Prompt tokens not replayed to the LLM thanks to history windowing",
+)
+HISTORY_TURNS = counter("history_turns_total", "Chat turns assembled from server-side history")
+
+# Chars per summary line; enough to keep the gist of a confirmation or a question
+_SUMMARY_LINE_CHARS = 160
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap provider-agnostic estimate (~4 chars per token plus per-message framing)."""
+    return len(text) // 4 + 4
+
+
+class ConversationTurn(BaseModel):
+    role: str
+    content: str
+    tokens: int = 0
+
+
+class ConversationMemory(BaseModel):
+    """
+    The Server-Side Transcript.
+    Recent turns are kept verbatim; once they exceed the budget the oldest ones are
+    folded into a rolling summary. The structured I9State remains the source of truth
+    for facts — the summary only preserves conversational continuity.
+    """
+    summary_lines: List[str] = Field(default_factory=list)
+    turns: List[ConversationTurn] = Field(default_factory=list)
+    # Everything ever said, as if the whole transcript were replayed (for the savings counter)
+    full_transcript_tokens: int = 0
+    # Replies rejected in recent turns (unparseable, invalid delta, low confidence); read by the model router
+    recent_failures: int = 0
+
+    def append(self, role: str, content: str) -> None:
+        tokens = estimate_tokens(content)
+        self.turns.append(ConversationTurn(role=role, content=content, tokens=tokens))
+        self.full_transcript_tokens += tokens
+        self._compact()
+
+    def _compact(self) -> None:
+        budget = HISTORY_TOKEN_BUDGET - HISTORY_SUMMARY_TOKEN_BUDGET
+        window_tokens = sum(t.tokens for t in self.turns)
+        # Always keep the latest turn verbatim, however long it is
+        while len(self.turns) > 1 and window_tokens > budget:
+            oldest = self.turns.pop(0)
+            window_tokens -= oldest.tokens
+            self.summary_lines.append(_summarize_turn(oldest))
+
+        while self.summary_lines and estimate_tokens("\n".join(self.summary_lines)) > HISTORY_SUMMARY_TOKEN_BUDGET:
+            self.summary_lines.pop(0)
+
+    def last_assistant_message(self) -> str:
+        """The agent's most recent reply (what the employee is answering right now)."""
+        for turn in reversed(self.turns):
+            if turn.role == "assistant":
+                return turn.content
+        return ""
+
+    def to_messages(self) -> List[dict]:
+        """The token-budgeted window, ready to splice between the system prompt and the new message."""
+        messages = []
+        if self.summary_lines:
+            messages.append({
+                "role": "system",
+                "content": "EARLIER CONVERSATION (SUMMARY):\n" + "\n".join(self.summary_lines),
+            })
+        messages.extend({"role": t.role, "content": t.content} for t in self.turns)
+        return messages
+
+
+def _summarize_turn(turn: ConversationTurn) -> str:
+    text = " ".join(turn.content.split())
+    if len(text) > _SUMMARY_LINE_CHARS:
+        text = text[:_SUMMARY_LINE_CHARS].rsplit(" ", 1)[0] + "…"
+    speaker = "Employee" if turn.role == "user" else "Agent"
+    return f"- {speaker}: {text}"
+
+
+def record_window_savings(memory: ConversationMemory, window: List[dict]) -> int:
+    """Counts how many prompt tokens this turn avoided versus replaying the full transcript."""
+    window_tokens = sum(estimate_tokens(m["content"]) for m in window)
+    saved = max(0, memory.full_transcript_tokens - window_tokens)
+    HISTORY_TOKENS_SAVED.inc(saved)
+    HISTORY_TURNS.inc()
+    return saved
+
+
+class ConversationStore:
+    """Persists ConversationMemory next to the I9State in the same SessionStore backend."""
+
+    def __init__(self, store: SessionStore):
+        self.store = store
+
+    async def get(self, session_id: str) -> Optional[ConversationMemory]:
+        data = await self.store.load(HISTORY_NAMESPACE, session_id)
+        return ConversationMemory.model_validate_json(data) if data is not None else None
+
+    async def put(self, session_id: str, memory: ConversationMemory) -> None:
+        await self.store.save(HISTORY_NAMESPACE, session_id, memory.model_dump_json().encode("utf-8"))
@@ -1,7 +1,8 @@
-import chromadb
-from chromadb.utils import embedding_functions
 import os
+import threading
 from dotenv import load_dotenv
+from backend.embeddings import configured_provider, get_embedding_function, collection_name_for
+from backend.bm25 import BM25Index
 
 # 1. Setup paths relative to THIS file's location
 # This line finds the directory where db.py lives
@@ -10,60 +11,109 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # Now we point to the data folder correctly
 # We go "up" one level from backend/ and then into data/
 DB_PATH = os.path.join(BASE_DIR, "..", "data", "vector_db")
-RULES_FILE = os.path.join(BASE_DIR, "..", "data", "i9_rules.txt")
 
-# Ensure the directories exist
-os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+# 2. Lazily initialized "Brain Storage"
+# Nothing below touches disk, network or chromadb until the first call that needs it,
+# so importing this module is cheap for workers and tools that never query rules.
+_client = None
+_embedding_fn = None
+_collection = None
+_bm25_index = None
+_init_lock = threading.Lock()
 
-# 2. Initialize the "Brain Storage" (ChromaDB)
-client = chromadb.PersistentClient(path=DB_PATH)
+def get_collection():
+    """Opens ChromaDB and the rules collection on first use (thread-safe)."""
+    global _client, _embedding_fn, _collection
+    if _collection is None:
+        with _init_lock:
+            if _collection is None:
+                import chromadb
 
-# Load environment variables
-load_dotenv()
-openai_ef = embedding_functions.OpenAIEmbeddingFunction(
-    api_key=os.getenv("OPENAI_API_KEY"),
-    model_name="text-embedding-3-small"
-)
+                # Ensure the directories exist
+                os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+                _client = chromadb.PersistentClient(path=DB_PATH)
 
-# 3. Create a "Collection"
-collection = client.get_or_create_collection(
-    name="i9_compliance_rules", 
-    embedding_function=openai_ef
-)
+                # Load environment variables
+                load_dotenv()
+                # Pluggable: OpenAI by default, or a local CPU model / hashing fallback (see backend/embeddings.py)
+                provider = configured_provider()
+                _embedding_fn = get_embedding_function(provider)
 
-def ingest_rules():
-    """Reads the text file and saves it to the vector database."""
-    if not os.path.exists(RULES_FILE):
-        print(f"Error: Could not find the file at {RULES_FILE}")
-        return
+                # 3. Create a "Collection"
+                _collection = _client.get_or_create_collection(
+                    name=collection_name_for(provider),
+                    embedding_function=_embedding_fn
+                )
+    return _collection
+
+def get_embedding_fn():
+    get_collection()
+    return _embedding_fn
+
+def is_initialized():
+    return _collection is not None
 
-    with open(RULES_FILE, "r") as f:
-        text = f.read()
+def warm_up():
+    """Explicit warm-up: opens the collection and builds the BM25 index. Returns the chunk count."""
+    collection = get_collection()
+    get_bm25_index()
+    return collection.count()
 
-    # Simple chunking: split by paragraphs or double newlines
-    chunks = [c.strip() for c in text.split("\n\n") if c.strip()]
-    
+def ingest_rules():
+    """Syncs the M-274 text and the CFR / Instructions PDFs into the vector database.
+    Only new or changed chunks are embedded; chunks that no longer exist are deleted."""
+    from backend.ingest import build_chunks, sync_collection
+
+    chunks = build_chunks()
     if not chunks:
-        print("Error: The i9_rules.txt file is empty!")
+        print("Error: No rule sources found to ingest!")
         return
 
-    # Give each chunk a unique ID
-    ids = [f"id_{i}" for i in range(len(chunks))]
-    
-    # Store them!
-    collection.upsert(
-        documents=chunks,
-        ids=ids
+    stats = sync_collection(get_collection(), get_embedding_fn(), chunks)
+    print(
+        f"Synced {stats['chunks']} rule segments into ChromaDB at {DB_PATH} "
+        f"(added {stats['added']}, deleted {stats['deleted']}, unchanged {stats['unchanged']}, "
+        f"{stats['embedding_calls']} embedding calls)"
     )
-    print(f"Successfully ingested {len(chunks)} rule segments into ChromaDB at {DB_PATH}")
+    global _bm25_index
+    _bm25_index = None
 
-def query_rules(user_query):
+def query_rules(user_query, n_results=3):
     """Finds the most relevant I-9 rules for a user's question."""
-    results = collection.query(
+    results = get_collection().query(
         query_texts=[user_query],
-        n_results=3
+        n_results=n_results
     )
     return results["documents"][0]
 
+def embed_query(user_query):
+    """Embeds a single query with the same function the collection was built with."""
+    return list(get_embedding_fn()([user_query])[0])
+
+def query_rules_by_embedding(query_embedding, n_results=3):
+    """Same as query_rules, but for a query that has already been embedded."""
+    results = get_collection().query(
+        query_embeddings=[query_embedding],
+        n_results=n_results
+    )
+    return results["documents"][0]
+
+def query_rule_ids_by_embedding(query_embedding, n_results=3):
+    """Ranked (id, document) pairs from the vector index, for rank fusion."""
+    results = get_collection().query(
+        query_embeddings=[query_embedding],
+        n_results=n_results,
+        include=["documents"]
+    )
+    return list(zip(results["ids"][0], results["documents"][0]))
+
+def get_bm25_index():
+    """BM25 over every chunk currently in the collection. Built locally; no embedding calls."""
+    global _bm25_index
+    if _bm25_index is None:
+        stored = get_collection().get(include=["documents"])
+        _bm25_index = BM25Index().build(stored["ids"], stored["documents"])
+    return _bm25_index
+
 if __name__ == "__main__":
     ingest_rules()
\ No newline at end of file
@@ -0,0 +1,84 @@
+# backend/embeddings.py
+import hashlib
+import math
+import os
+import re
+from typing import List
+
+HASHING_EMBEDDING_DIM = int(os.getenv("HASHING_EMBEDDING_DIM", "1024"))
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+
+class HashingEmbeddingFunction:
+    """
+    The Offline Fallback.
+    Signed feature hashing of unigrams and bigrams with sublinear term frequency,
+    L2-normalized. Document vectors never depend on corpus statistics, so content-hash
+    chunk ids stay valid; corpus-level weighting (IDF) is left to the BM25 index.
+    Satisfies Chroma's EmbeddingFunction protocol without importing chromadb.
+    """
+
+    def __init__(self, dim: int = HASHING_EMBEDDING_DIM):
+        self.dim = dim
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in input]
+
+    @staticmethod
+    def name() -> str:
+        return "i9_hashing"
+
+    def _embed(self, text: str) -> List[float]:
+        tokens = _TOKEN.findall(text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+        counts = {}
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            sign = 1.0 if digest[4] & 1 else -1.0
+            counts[bucket] = counts.get(bucket, 0.0) + sign
+
+        vector = [0.0] * self.dim
+        for bucket, count in counts.items():
+            vector[bucket] = math.copysign(1.0 + math.log(abs(count)), count) if count else 0.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+
+def configured_provider() -> str:
+    """
+    EMBEDDING_PROVIDER: "openai" (network), "onnx" (Chroma's bundled MiniLM, CPU),
+    "sentence-transformers" (CPU/GPU) or "hashing" (pure-Python, no downloads, fully offline).
+    Read at call time so a .env loaded after import still applies.
+    """
+    return os.getenv("EMBEDDING_PROVIDER", "openai").lower()
+
+
+def get_embedding_function(provider: str):
+    """Returns a Chroma-compatible embedding function for the given provider."""
+    if provider == "hashing":
+        return HashingEmbeddingFunction()
+
+    from chromadb.utils import embedding_functions
+
+    if provider == "openai":
+        return embedding_functions.OpenAIEmbeddingFunction(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            model_name=os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+        )
+    if provider == "onnx":
+        # MiniLM-L6-v2 exported to ONNX; downloaded once, then runs locally on CPU
+        return embedding_functions.ONNXMiniLM_L6_V2()
+    if provider == "sentence-transformers":
+        return embedding_functions.SentenceTransformerEmbeddingFunction(
+            model_name=os.getenv("LOCAL_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+        )
+    raise ValueError(f"Unknown EMBEDDING_PROVIDER: {provider}")
+
+
+def collection_name_for(provider: str) -> str:
+    """Vectors from different providers are not comparable, so each gets its own collection."""
+    base = "i9_compliance_rules"
+    return base if provider == "openai" else f"{base}__{provider.replace('-', '_')}"
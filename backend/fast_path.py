@@ -0,0 +1,181 @@
+# backend/fast_path.py
+import os
+import re
+from typing import List, Optional
+
+from backend.metrics import counter
+from backend.models import I9State, StateDeltaPayload
+from backend.state_machine import CITIZENSHIP_STATUSES, normalize_citizenship_status
+
+# ==========================================
+# DETERMINISTIC FAST PATH (no LLM round-trip)
+# ==========================================
+# Short, unambiguous answers to the gap the agent just asked about ("yes", "H-1B",
+# "green card holder") are resolved locally. Anything else goes to the LLM as before.
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+# Longer messages usually carry context or a question the agent should answer
+FAST_PATH_MAX_WORDS = int(os.getenv("FAST_PATH_MAX_WORDS", "12"))
+
+FAST_PATH_TURNS = counter("fast_path_turns_total", "Chat turns by fast-path outcome (hit or the reason for falling back)")
+FAST_PATH_SECONDS_SAVED = counter(
+    "fast_path_llm_seconds_saved_total",
+    "Estimated LLM latency avoided by fast-path hits (moving average of recent LLM turns)",
+)
+LLM_TURN_SECONDS = counter("llm_turn_seconds_total", "Wall time spent waiting on the LLM for chat turns")
+
+# Seeded with a typical gpt-4o JSON turn; replaced by real measurements as they arrive
+_llm_latency_ewma = 2.5
+_EWMA_ALPHA = 0.2
+
+def record_llm_latency(seconds: float) -> None:
+    global _llm_latency_ewma
+    _llm_latency_ewma += _EWMA_ALPHA * (seconds - _llm_latency_ewma)
+    LLM_TURN_SECONDS.inc(seconds)
+
+
+# ==========================================
+# 1. THE KEYWORD GRAMMAR
+# ==========================================
+_AFFIRM = re.compile(
+    r"^(?:yes|yeah|yep|yup|correct|right|that'?s (?:right|correct)|that is (?:right|correct)|confirmed?|"
+    r"i confirm|affirmative|sure|ok(?:ay)?|absolutely|indeed|exactly)\b"
+)
+# Any of these make the answer ambiguous enough to hand to the LLM
+_HEDGE = re.compile(
+    r"\b(?:no|nope|not|never|don'?t|doesn'?t|didn'?t|isn'?t|wasn'?t|won'?t|can'?t|cannot|but|however|"
+    r"maybe|unsure|not sure|think|probably|what|why|how|which|when|help|change|changed|actually|wrong|was)\b"
+)
+# The whole message is a confirmation and nothing else ("yes", "yes, that's correct.")
+_BARE_AFFIRM = re.compile(
+    r"^(?:(?:yes|yeah|yep|yup|correct|right|that'?s (?:right|correct)|that is (?:right|correct)|confirmed?|"
+    r"i confirm|affirmative|sure|ok(?:ay)?|absolutely|indeed|exactly)[\s,.!]*)+$"
+)
+_SSN_AFFIRM = re.compile(r"\b(?:i have (?:an? |my )?(?:ssn|social security)|i(?:'ve| have) applied)\b")
+_EXPIRATION_AFFIRM = re.compile(r"\b(?:\d{1,2}/\d{1,2}/\d{2,4}|\d{4}-\d{2}-\d{2}|expires?|expiration)\b")
+
+# Ordered phrase -> canonical status text fed through the shared state_machine normalizer.
+# Citizenship and permanent residence only count with an explicit U.S. qualifier.
+_US = r"(?:u\.?s\.?a?\.?|united states|american)"
+_STATUS_KEYWORDS = [
+    (re.compile(r"\bnon-?\s?citizen national\b"), "noncitizen national"),
+    (re.compile(rf"\b(?:{_US} citizen|citizen of (?:the )?(?:{_US}|america))(?!\w)"), "citizen"),
+    (re.compile(rf"\b(?:green card|lawful permanent resident|{_US} permanent resident|lpr)\b"), "permanent resident"),
+    (re.compile(r"\b(?:h-?1b|h-?2[ab]|l-?1|o-?1|tn|f-?1 opt|ead|work permit|employment authorization|"
+                r"authorized (?:alien|to work)|work visa)\b"), "alien authorized"),
+]
+# "citizen of India", "permanent resident of Canada": a status, but not a U.S. one
+_FOREIGN_STATUS = re.compile(rf"\b(?:citizen|resident|national)s? of (?!(?:the )?(?:{_US}|america)(?!\w))")
+_VISA = re.compile(r"\b(h-?1b|h-?2[ab]|l-?1|o-?1|tn)\b")
+
+# Which gap the agent's last question was about, judged from its wording
+_GAP_TOPICS = {
+    "CONFIRM_CITIZENSHIP_STATUS": re.compile(r"\b(?:status|citizen|visa|h-?1b|green card|permanent resident|immigration|records indicate)\b"),
+    "RESOLVE_SSN_STATUS_FOR_EVERIFY": re.compile(r"\b(?:social security|ssn)\b"),
+    "CONFIRM_WORK_AUTH_EXPIRATION": re.compile(r"\b(?:expir\w*|valid until)\b"),
+}
+
+# Templated narration for the next open gap (neutral on documents, per INA §1324b)
+NARRATIONS = {
+    "CONFIRM_CITIZENSHIP_STATUS": "Thank you, {first_name}. Could you confirm your citizenship or immigration status for Section 1?",
+    "RESOLVE_SSN_STATUS_FOR_EVERIFY": (
+        "Thank you, {first_name}. Because {company} participates in E-Verify, could you confirm that you have "
+        "a U.S. Social Security number, or that you have applied for one?"
+    ),
+    "CONFIRM_WORK_AUTH_EXPIRATION": (
+        "Thank you, {first_name}. Does your employment authorization have an expiration date? "
+        "You will be able to enter it on the form."
+    ),
+}
+READY_NARRATION = "Thank you, {first_name}. Everything is confirmed, and Section 1 of your Form I-9 is ready for you to complete."
+NEXT_STEP_NARRATION = "Thank you, {first_name}, that's noted."
+
+
+# ==========================================
+# 2. EXTRACTION
+# ==========================================
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().replace("’", "'").split())
+
+def _asked_gap(gaps: List[str], last_question: str) -> Optional[str]:
+    """
+    The single open gap the previous agent message asked about, or None if unclear.
+    No agent message (history evicted or seeded empty) means nothing was asked, even with one gap left.
+    """
+    question = _normalize(last_question)
+    topics = [gap for gap in gaps if gap in _GAP_TOPICS and _GAP_TOPICS[gap].search(question)]
+    return topics[0] if len(topics) == 1 else None
+
+def _status_delta(message: str, state: I9State, last_question: str) -> Optional[dict]:
+    if _FOREIGN_STATUS.search(message):
+        return None
+    mentioned = {canonical for pattern, canonical in _STATUS_KEYWORDS if pattern.search(message)}
+    if "noncitizen national" in mentioned:
+        mentioned.discard("citizen")
+    if len(mentioned) > 1:
+        return None
+    if mentioned:
+        raw = mentioned.pop()
+    elif _BARE_AFFIRM.match(message) and state.employee.preloaded_status and _normalize(state.employee.preloaded_status) in _normalize(last_question):
+        # "Yes" to "Our records indicate you are joining us on an H-1B visa" confirms the HR record,
+        # but only when the question actually quoted that record back to the employee
+        preloaded = _normalize(state.employee.preloaded_status)
+        matches = {canonical for pattern, canonical in _STATUS_KEYWORDS if pattern.search(preloaded)}
+        raw = matches.pop() if len(matches) == 1 else preloaded
+        message = preloaded
+    else:
+        return None
+
+    status = normalize_citizenship_status(raw)
+    if status not in CITIZENSHIP_STATUSES:
+        return None
+    delta = {"citizenship_status": status}
+    visa = _VISA.search(message)
+    if status == "alien_authorized" and visa:
+        delta["visa_type"] = visa.group(1).upper()
+    return delta
+
+def extract_fast_delta(state: I9State, user_message: str, last_question: str = "") -> Optional[dict]:
+    """
+    Returns a state delta when the message resolves the open gap beyond doubt; None means
+    "ask the LLM". Records the outcome either way.
+    """
+    message = _normalize(user_message)
+    if not message or message == "init_conversation":
+        return None
+    if not state.compliance_gaps:
+        FAST_PATH_TURNS.inc(outcome="no_open_gap")
+        return None
+    if len(message.split()) > FAST_PATH_MAX_WORDS or "?" in message or _HEDGE.search(message):
+        FAST_PATH_TURNS.inc(outcome="ambiguous_message")
+        return None
+    gap = _asked_gap(state.compliance_gaps, last_question)
+    if gap is None:
+        FAST_PATH_TURNS.inc(outcome="ambiguous_question")
+        return None
+
+    affirmed = bool(_AFFIRM.search(message))
+    delta = None
+    if gap == "CONFIRM_CITIZENSHIP_STATUS":
+        delta = _status_delta(message, state, last_question)
+    elif gap == "RESOLVE_SSN_STATUS_FOR_EVERIFY" and (affirmed or _SSN_AFFIRM.search(message)):
+        delta = {"ssn_status_resolved": True}
+    elif gap == "CONFIRM_WORK_AUTH_EXPIRATION" and (affirmed or _EXPIRATION_AFFIRM.search(message)):
+        delta = {"expiration_date_resolved": True}
+
+    FAST_PATH_TURNS.inc(outcome="hit" if delta else "no_match")
+    if delta:
+        FAST_PATH_SECONDS_SAVED.inc(_llm_latency_ewma)
+    return delta
+
+def fast_path_payload(delta: dict) -> StateDeltaPayload:
+    return StateDeltaPayload(intent="STATE_UPDATE", state_delta=delta, confidence_score=1.0)
+
+def templated_narration(state: I9State) -> str:
+    """Narration for the state AFTER the fast-path delta was applied: next question, or form ready."""
+    values = {"first_name": state.employee.first_name, "company": state.employer.company_name}
+    if state.is_ready_for_form:
+        return READY_NARRATION.format(**values)
+    for gap in state.compliance_gaps:
+        if gap in NARRATIONS:
+            return NARRATIONS[gap].format(**values)
+    return NEXT_STEP_NARRATION.format(**values)
@@ -0,0 +1,430 @@
+# backend/hr_directory.py
+"""
+HR records (employer context + employee profile) for new I-9 sessions.
+
+Providers are indexed by employee id (one lookup per new session) and by employer id
++ hire date (cohort preload). A read-through LRU/TTL cache sits in front of whichever
+provider is configured:
+
+    HR_PROVIDER=demo     every id gets the built-in CEIPAL Corp / H-1B demo profile (default)
+    HR_PROVIDER=roster   HR_ROSTER_PATH, a .json array or .jsonl file loaded into memory
+    HR_PROVIDER=sqlite   HR_DB_PATH, populated with `python -m backend.hr_directory import roster.jsonl`
+
+Roster records are one per hire, with the employer denormalized onto each line:
+    {"employee_id": "E1001", "employer_id": "acme", "company_name": "Acme Inc", "uses_everify": true,
+     "first_name": "Ana", "last_name": "Diaz", "hire_date": "2026-03-02", "preloaded_status": "Green card",
+     "section1_due_date": "2026-03-02"}
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from pydantic import ValidationError
+
+from backend.metrics import counter
+from backend.models import EmployeeProfile, EmployerContext, I9State
+from backend.session_store import BASE_DIR
+
+DEFAULT_HR_DB_PATH = os.path.join(BASE_DIR, "..", "data", "hr.db")
+
+HR_PROVIDER = os.getenv("HR_PROVIDER", "demo").lower()
+HR_ROSTER_PATH = os.getenv("HR_ROSTER_PATH", "")
+HR_DB_PATH = os.getenv("HR_DB_PATH", DEFAULT_HR_DB_PATH)
+HR_CACHE_MAX_ENTRIES = int(os.getenv("HR_CACHE_MAX_ENTRIES", "50000"))
+# HR data changes rarely during onboarding; a stale minute is fine, a stale day is not
+HR_CACHE_TTL_SECONDS = float(os.getenv("HR_CACHE_TTL_SECONDS", "900"))
+
+HR_LOOKUPS = counter("hr_lookups_total", "HR record lookups by outcome (cache_hit, provider_hit, not_found)")
+
+# Bound variables per SQLite statement stay well under SQLITE_MAX_VARIABLE_NUMBER
+_SQL_BATCH = 500
+
+
+class HRRecordError(ValueError):
+    """A roster record that cannot become an HR record."""
+
+
+@dataclass(frozen=True)
+class HRRecord:
+    employee_id: str
+    employer_id: str
+    employer: EmployerContext
+    employee: EmployeeProfile
+
+
+_TRUE = {"true", "t", "yes", "y", "1"}
+_FALSE = {"false", "f", "no", "n", "0"}
+
+def parse_bool(value, default: bool) -> bool:
+    """Roster flags as exported from CSV/JSONL ("false", "0", "no"); anything unrecognized is an error."""
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    text = str(value).strip().lower()
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    raise ValueError(f"expected true or false, got {value!r}")
+
+
+def record_from_roster(raw) -> HRRecord:
+    if not isinstance(raw, dict):
+        raise HRRecordError("Record must be a JSON object")
+    employee_id, employer_id = raw.get("employee_id"), raw.get("employer_id")
+    if not employee_id or not employer_id:
+        raise HRRecordError("employee_id and employer_id are required")
+    try:
+        uses_everify = parse_bool(raw.get("uses_everify"), default=True)
+    except ValueError as e:
+        raise HRRecordError(f"Invalid record {employee_id}: uses_everify {e}")
+    try:
+        employer = EmployerContext(
+            company_name=raw.get("company_name") or str(employer_id),
+            uses_everify=uses_everify,
+        )
+        employee = EmployeeProfile(
+            first_name=raw.get("first_name") or "",
+            last_name=raw.get("last_name") or "",
+            hire_date=raw.get("hire_date"),
+            preloaded_status=raw.get("preloaded_status"),
+            section1_due_date=raw.get("section1_due_date"),
+        )
+    except ValidationError as e:
+        raise HRRecordError(f"Invalid record {employee_id}: {e.errors()[0]['msg']}")
+    return HRRecord(str(employee_id), str(employer_id), employer, employee)
+
+
+def iter_roster_records(path: str) -> Iterator[HRRecord]:
+    """Streams a roster file; bad lines are reported and skipped."""
+    from backend.bulk_stamp import iter_roster
+
+    for index, raw in iter_roster(path):
+        try:
+            if isinstance(raw, Exception):
+                raise raw
+            yield record_from_roster(raw)
+        except ValueError as e:
+            print(f"Skipping roster record {index}: {e}")
+
+
+def hydrate_session(record: HRRecord) -> I9State:
+    """A new session for this hire, with compliance gaps already evaluated on the HR data."""
+    from backend.compliance_matrix import evaluate_compliance_gaps
+    from backend.sla_scheduler import derive_due_dates
+
+    # Copies: the cached record is shared by every session of this hire
+    state = I9State(employer=record.employer.model_copy(), employee=record.employee.model_copy())
+    state.sla_tracking.hire_date = record.employee.hire_date
+    state.compliance_gaps = evaluate_compliance_gaps(state)
+    return derive_due_dates(state)
+
+
+def _in_range(record: HRRecord, hired_from: Optional[date], hired_to: Optional[date]) -> bool:
+    hire_date = record.employee.hire_date
+    if hired_from is None and hired_to is None:
+        return True
+    if hire_date is None:
+        return False
+    return (hired_from is None or hire_date >= hired_from) and (hired_to is None or hire_date <= hired_to)
+
+
+# ==========================================
+# 1. THE PROVIDER INTERFACE
+# ==========================================
+class HRProvider(ABC):
+    @abstractmethod
+    async def get(self, employee_id: str) -> Optional[HRRecord]: ...
+
+    async def get_many(self, employee_ids: Iterable[str]) -> Dict[str, HRRecord]:
+        found = {}
+        for employee_id in employee_ids:
+            record = await self.get(employee_id)
+            if record is not None:
+                found[employee_id] = record
+        return found
+
+    @abstractmethod
+    async def cohort(self, employer_id: str, hired_from: Optional[date] = None,
+                     hired_to: Optional[date] = None) -> List[HRRecord]:
+        """Every hire of one employer, optionally limited to a hire-date window (inclusive)."""
+
+    async def close(self) -> None:
+        pass
+
+
+class DemoHRProvider(HRProvider):
+    """The single hard-coded demo hire the app has always greeted."""
+
+    async def get(self, employee_id: str) -> Optional[HRRecord]:
+        return HRRecord(
+            employee_id=employee_id,
+            employer_id="ceipal",
+            employer=EmployerContext(company_name="CEIPAL Corp", uses_everify=True),
+            employee=EmployeeProfile(first_name="Rajesh", preloaded_status="H-1B", section1_due_date="EOD Today"),
+        )
+
+    async def cohort(self, employer_id, hired_from=None, hired_to=None) -> List[HRRecord]:
+        return []
+
+
+# ==========================================
+# 2. ROSTER FILE (in-memory indexes)
+# ==========================================
+class RosterHRProvider(HRProvider):
+    def __init__(self, path: str):
+        self.path = path
+        self._employees: Dict[str, HRRecord] = {}
+        self._by_employer: Dict[str, List[str]] = {}
+        employers: Dict[str, EmployerContext] = {}
+        for record in iter_roster_records(path):
+            # One shared EmployerContext per employer id (the first line wins)
+            employer = employers.setdefault(record.employer_id, record.employer)
+            if employer is not record.employer:
+                record = HRRecord(record.employee_id, record.employer_id, employer, record.employee)
+            if record.employee_id not in self._employees:
+                self._by_employer.setdefault(record.employer_id, []).append(record.employee_id)
+            self._employees[record.employee_id] = record
+        print(f"Loaded {len(self._employees)} hires for {len(employers)} employers from {path}")
+
+    async def get(self, employee_id: str) -> Optional[HRRecord]:
+        return self._employees.get(employee_id)
+
+    async def get_many(self, employee_ids: Iterable[str]) -> Dict[str, HRRecord]:
+        return {i: self._employees[i] for i in employee_ids if i in self._employees}
+
+    async def cohort(self, employer_id, hired_from=None, hired_to=None) -> List[HRRecord]:
+        records = (self._employees[i] for i in self._by_employer.get(employer_id, ()))
+        return [record for record in records if _in_range(record, hired_from, hired_to)]
+
+
+# ==========================================
+# 3. SQLITE (indexed, shared across workers)
+# ==========================================
+class SQLiteHRProvider(HRProvider):
+    _SELECT = (
+        "SELECT e.employee_id, e.employer_id, r.company_name, r.uses_everify, e.first_name, e.last_name,"
+        " e.hire_date, e.preloaded_status, e.section1_due_date"
+        " FROM employees e JOIN employers r ON r.employer_id = e.employer_id"
+    )
+
+    def __init__(self, path: str = DEFAULT_HR_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS employers ("
+            " employer_id TEXT PRIMARY KEY,"
+            " company_name TEXT NOT NULL,"
+            " uses_everify INTEGER NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS employees ("
+            " employee_id TEXT PRIMARY KEY,"
+            " employer_id TEXT NOT NULL,"
+            " first_name TEXT NOT NULL,"
+            " last_name TEXT NOT NULL,"
+            " hire_date TEXT,"
+            " preloaded_status TEXT,"
+            " section1_due_date TEXT)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS employees_employer_hire ON employees(employer_id, hire_date)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row(row) -> HRRecord:
+        employee_id, employer_id, company_name, uses_everify, first, last, hire_date, status, due = row
+        return HRRecord(
+            employee_id=employee_id,
+            employer_id=employer_id,
+            employer=EmployerContext(company_name=company_name, uses_everify=bool(uses_everify)),
+            employee=EmployeeProfile(first_name=first, last_name=last, hire_date=hire_date,
+                                     preloaded_status=status, section1_due_date=due),
+        )
+
+    def import_records(self, records: Iterable[HRRecord], batch_size: int = 5000) -> int:
+        """Upserts roster records in batched transactions. Returns the number written."""
+        conn = self._connect()
+        written, batch = 0, []
+
+        def flush():
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT INTO employers (employer_id, company_name, uses_everify) VALUES (?, ?, ?) "
+                "ON CONFLICT(employer_id) DO UPDATE SET company_name = excluded.company_name,"
+                " uses_everify = excluded.uses_everify",
+                list({r.employer_id: (r.employer_id, r.employer.company_name, int(r.employer.uses_everify)) for r in batch}.values()),
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO employees VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (r.employee_id, r.employer_id, r.employee.first_name, r.employee.last_name,
+                     r.employee.hire_date.isoformat() if r.employee.hire_date else None,
+                     r.employee.preloaded_status, r.employee.section1_due_date)
+                    for r in batch
+                ],
+            )
+            conn.execute("COMMIT")
+
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                flush()
+                written += len(batch)
+                batch = []
+        if batch:
+            flush()
+            written += len(batch)
+        return written
+
+    def _get_many_sync(self, employee_ids: List[str]) -> Dict[str, HRRecord]:
+        found = {}
+        for start in range(0, len(employee_ids), _SQL_BATCH):
+            chunk = employee_ids[start:start + _SQL_BATCH]
+            placeholders = ",".join("?" * len(chunk))
+            for row in self._connect().execute(f"{self._SELECT} WHERE e.employee_id IN ({placeholders})", chunk):
+                found[row[0]] = self._row(row)
+        return found
+
+    def _cohort_sync(self, employer_id, hired_from, hired_to) -> List[HRRecord]:
+        sql, params = f"{self._SELECT} WHERE e.employer_id = ?", [employer_id]
+        if hired_from is not None:
+            sql += " AND e.hire_date >= ?"
+            params.append(hired_from.isoformat())
+        if hired_to is not None:
+            sql += " AND e.hire_date <= ?"
+            params.append(hired_to.isoformat())
+        return [self._row(row) for row in self._connect().execute(sql + " ORDER BY e.hire_date, e.employee_id", params)]
+
+    async def get(self, employee_id: str) -> Optional[HRRecord]:
+        return (await self.get_many([employee_id])).get(employee_id)
+
+    async def get_many(self, employee_ids: Iterable[str]) -> Dict[str, HRRecord]:
+        return await asyncio.to_thread(self._get_many_sync, list(employee_ids))
+
+    async def cohort(self, employer_id, hired_from=None, hired_to=None) -> List[HRRecord]:
+        return await asyncio.to_thread(self._cohort_sync, employer_id, hired_from, hired_to)
+
+
+# ==========================================
+# 4. READ-THROUGH CACHE
+# ==========================================
+class CachedHRProvider(HRProvider):
+    """
+    The Front Desk.
+    LRU + TTL cache over any provider. Single lookups and batches only go to the
+    provider for ids that are not cached; cohort loads prime the cache for every hire.
+    """
+
+    def __init__(self, inner: HRProvider, max_entries: int = HR_CACHE_MAX_ENTRIES, ttl_seconds: float = HR_CACHE_TTL_SECONDS):
+        self.inner = inner
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple[HRRecord, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _cached(self, employee_id: str) -> Optional[HRRecord]:
+        entry = self._entries.get(employee_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[1] > self.ttl_seconds:
+            del self._entries[employee_id]
+            return None
+        self._entries.move_to_end(employee_id)
+        return entry[0]
+
+    def _remember(self, records: Iterable[HRRecord]) -> None:
+        now = time.monotonic()
+        for record in records:
+            self._entries[record.employee_id] = (record, now)
+            self._entries.move_to_end(record.employee_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, employee_id: str) -> Optional[HRRecord]:
+        return (await self.get_many([employee_id])).get(employee_id)
+
+    async def get_many(self, employee_ids: Iterable[str]) -> Dict[str, HRRecord]:
+        found, missing = {}, []
+        for employee_id in employee_ids:
+            record = self._cached(employee_id)
+            if record is not None:
+                found[employee_id] = record
+            else:
+                missing.append(employee_id)
+        HR_LOOKUPS.inc(len(found), outcome="cache_hit")
+        if missing:
+            loaded = await self.inner.get_many(missing)
+            self._remember(loaded.values())
+            found.update(loaded)
+            HR_LOOKUPS.inc(len(loaded), outcome="provider_hit")
+            HR_LOOKUPS.inc(len(missing) - len(loaded), outcome="not_found")
+        return found
+
+    async def cohort(self, employer_id, hired_from=None, hired_to=None) -> List[HRRecord]:
+        records = await self.inner.cohort(employer_id, hired_from, hired_to)
+        self._remember(records)
+        return records
+
+    async def preload(self, employee_ids: Iterable[str]) -> int:
+        """Bulk warm-up (e.g. tomorrow's start dates). Returns how many ids resolved."""
+        return len(await self.get_many(employee_ids))
+
+    async def close(self) -> None:
+        await self.inner.close()
+
+
+def create_hr_provider() -> CachedHRProvider:
+    if HR_PROVIDER == "demo":
+        inner = DemoHRProvider()
+    elif HR_PROVIDER == "roster":
+        if not HR_ROSTER_PATH:
+            raise ValueError("HR_PROVIDER=roster requires HR_ROSTER_PATH")
+        inner = RosterHRProvider(HR_ROSTER_PATH)
+    elif HR_PROVIDER == "sqlite":
+        inner = SQLiteHRProvider(HR_DB_PATH)
+    else:
+        raise ValueError(f"Unknown HR_PROVIDER: {HR_PROVIDER}")
+    return CachedHRProvider(inner)
+
+
+# ==========================================
+# 5. CLI: roster -> SQLite
+# ==========================================
+def main():
+    parser = argparse.ArgumentParser(description="Load a roster file into the SQLite HR store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    load = sub.add_parser("import")
+    load.add_argument("roster", help=".json array or .jsonl, one record per hire")
+    load.add_argument("--db", default=HR_DB_PATH)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    written = SQLiteHRProvider(args.db).import_records(iter_roster_records(args.roster))
+    print(f"Imported {written} hires into {args.db} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
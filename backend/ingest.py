@@ -0,0 +1,192 @@
+# backend/ingest.py
+import hashlib
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional
+
+from backend.conversation import estimate_tokens
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "..", "data")
+
+RULES_FILE = os.path.join(DATA_DIR, "i9_rules.txt")
+CFR_PDF = os.path.join(DATA_DIR, "8 CFR Part 274a (up to date as of 2-25-2026).pdf")
+INSTRUCTIONS_PDF = os.path.join(DATA_DIR, "Instructions for Form I-9.pdf")
+
+CHUNK_MAX_TOKENS = int(os.getenv("INGEST_CHUNK_MAX_TOKENS", "400"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("INGEST_CHUNK_OVERLAP_TOKENS", "60"))
+EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "64"))
+
+# Section headings per source: "4.4 Acceptable Receipts", "§ 274a.2 Verification of ..."
+M274_HEADING = re.compile(r"^(\d{1,2}(?:\.\d{1,2})+)\s+(\S.*)$")
+CFR_HEADING = re.compile(r"^§\s?(274a\.\d+)\s+(\S.*)$")
+
+
+@dataclass
+class SourceSpec:
+    name: str
+    path: str
+    kind: str                               # "text" or "pdf"
+    heading: Optional[re.Pattern] = None    # None -> page-bounded windows only
+
+
+SOURCES = [
+    SourceSpec("M-274", RULES_FILE, "text", M274_HEADING),
+    SourceSpec("8 CFR 274a", CFR_PDF, "pdf", CFR_HEADING),
+    SourceSpec("Form I-9 Instructions", INSTRUCTIONS_PDF, "pdf", None),
+]
+
+
+@dataclass
+class Chunk:
+    text: str
+    metadata: dict = field(default_factory=dict)
+
+    @property
+    def id(self) -> str:
+        """Content hash: identical text from the same source always maps to the same id."""
+        digest = hashlib.sha256(f"{self.metadata.get('source')}\x00{self.text}".encode("utf-8"))
+        return digest.hexdigest()[:32]
+
+
+# ==========================================
+# 1. EXTRACTION -> (line, page) units
+# ==========================================
+def read_lines(spec: SourceSpec) -> List[tuple]:
+    if spec.kind == "pdf":
+        from pypdf import PdfReader
+
+        units = []
+        for page_no, page in enumerate(PdfReader(spec.path).pages, start=1):
+            for line in (page.extract_text() or "").splitlines():
+                if line.strip():
+                    units.append((line.strip(), page_no))
+        return units
+
+    with open(spec.path, "r", encoding="utf-8") as f:
+        return [(line.strip(), None) for line in f if line.strip()]
+
+
+# ==========================================
+# 2. STRUCTURE-AWARE CHUNKING
+# ==========================================
+def split_sections(units: List[tuple], heading: Optional[re.Pattern]) -> Iterable[tuple]:
+    """Yields (section_number, title, units). Text before the first heading is section None."""
+    section, title, body = None, None, []
+    for text, page in units:
+        match = heading.match(text) if heading else None
+        if match:
+            if body:
+                yield section, title, body
+            section, title, body = match.group(1), match.group(2), []
+        body.append((text, page))
+    if body:
+        yield section, title, body
+
+
+def _explode(units: List[tuple], max_tokens: int) -> List[tuple]:
+    """Splits any single line longer than the window into word runs that fit."""
+    out = []
+    for text, page in units:
+        if estimate_tokens(text) <= max_tokens:
+            out.append((text, page))
+            continue
+        words, run = text.split(), []
+        for word in words:
+            run.append(word)
+            if estimate_tokens(" ".join(run)) >= max_tokens:
+                out.append((" ".join(run), page))
+                run = []
+        if run:
+            out.append((" ".join(run), page))
+    return out
+
+
+def sliding_windows(units: List[tuple], max_tokens: int, overlap_tokens: int) -> Iterable[List[tuple]]:
+    """Token-bounded windows over whole lines; consecutive windows share ~overlap_tokens of lines."""
+    units = _explode(units, max_tokens)
+    start = 0
+    while start < len(units):
+        end, used = start, 0
+        while end < len(units) and (end == start or used + estimate_tokens(units[end][0]) <= max_tokens):
+            used += estimate_tokens(units[end][0])
+            end += 1
+        yield units[start:end]
+        if end >= len(units):
+            break
+        # Step back over trailing lines to form the overlap, but always make progress
+        back, overlap = end, 0
+        while back - 1 > start and overlap + estimate_tokens(units[back - 1][0]) <= overlap_tokens:
+            back -= 1
+            overlap += estimate_tokens(units[back][0])
+        start = back
+
+
+def chunk_source(spec: SourceSpec, max_tokens: int = CHUNK_MAX_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> List[Chunk]:
+    chunks = []
+    for section, title, body in split_sections(read_lines(spec), spec.heading):
+        for part, window in enumerate(sliding_windows(body, max_tokens, overlap_tokens)):
+            lines = [text for text, _ in window]
+            # Continuation windows repeat the heading so they retrieve on their own
+            if part > 0 and section:
+                lines.insert(0, f"{section} {title} (cont.)")
+            pages = [page for _, page in window if page is not None]
+            metadata = {"source": spec.name, "section": section or "", "title": title or "", "part": part}
+            if pages:
+                metadata["page_start"] = min(pages)
+                metadata["page_end"] = max(pages)
+            chunks.append(Chunk(text="\n".join(lines), metadata=metadata))
+    return chunks
+
+
+# ==========================================
+# 3. INCREMENTAL SYNC
+# ==========================================
+def sync_collection(collection, embed_fn, chunks: List[Chunk], batch_size: int = EMBED_BATCH_SIZE) -> dict:
+    """
+    Makes the collection match `chunks` exactly:
+    embeds only ids the collection does not have yet (in batches) and deletes everything else.
+    A re-run over unchanged sources makes zero embedding calls.
+    """
+    wanted = {}
+    for chunk in chunks:
+        wanted.setdefault(chunk.id, chunk)  # identical passages collapse to one entry
+
+    existing = set(collection.get(include=[])["ids"])
+    new_ids = [chunk_id for chunk_id in wanted if chunk_id not in existing]
+    stale_ids = [chunk_id for chunk_id in existing if chunk_id not in wanted]
+
+    embed_calls = 0
+    for i in range(0, len(new_ids), batch_size):
+        batch = [wanted[chunk_id] for chunk_id in new_ids[i:i + batch_size]]
+        documents = [chunk.text for chunk in batch]
+        embeddings = embed_fn(documents)
+        embed_calls += 1
+        collection.add(
+            ids=[chunk.id for chunk in batch],
+            documents=documents,
+            embeddings=[list(e) for e in embeddings],
+            metadatas=[chunk.metadata for chunk in batch],
+        )
+
+    for i in range(0, len(stale_ids), 1000):
+        collection.delete(ids=stale_ids[i:i + 1000])
+
+    return {
+        "chunks": len(wanted),
+        "added": len(new_ids),
+        "deleted": len(stale_ids),
+        "unchanged": len(wanted) - len(new_ids),
+        "embedding_calls": embed_calls,
+    }
+
+
+def build_chunks(sources: List[SourceSpec] = SOURCES) -> List[Chunk]:
+    chunks = []
+    for spec in sources:
+        if not os.path.exists(spec.path):
+            print(f"Skipping {spec.name}: could not find {spec.path}")
+            continue
+        chunks.extend(chunk_source(spec))
+    return chunks
@@ -0,0 +1,287 @@
+# backend/llm_gateway.py
+import asyncio
+import os
+import random
+import time
+from typing import AsyncIterator, Dict, List, Optional
+
+from backend.conversation import estimate_tokens
+from backend.metrics import counter
+
+# ==========================================
+# LLM GATEWAY CONFIGURATION (per model lane)
+# ==========================================
+# In-flight completions per model; everything above waits in that model's queue
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+# Provider quotas for the account tier; 0 disables the corresponding bucket
+LLM_RPM_LIMIT = float(os.getenv("LLM_RPM_LIMIT", "500"))
+LLM_TPM_LIMIT = float(os.getenv("LLM_TPM_LIMIT", "30000"))
+# Completion tokens reserved up front per call (JSON turns are short)
+LLM_COMPLETION_TOKEN_ESTIMATE = int(os.getenv("LLM_COMPLETION_TOKEN_ESTIMATE", "400"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "8"))
+# Per attempt, and for the whole request including queueing and retries
+LLM_ATTEMPT_TIMEOUT_SECONDS = float(os.getenv("LLM_ATTEMPT_TIMEOUT_SECONDS", "30"))
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "45"))
+# Callers already waiting for a slot beyond which new ones are turned away at once
+LLM_MAX_QUEUE_DEPTH = int(os.getenv("LLM_MAX_QUEUE_DEPTH", "64"))
+
+LLM_REQUESTS = counter("llm_requests_total", "LLM calls through the gateway by model and outcome")
+LLM_RETRIES = counter("llm_retries_total", "LLM call retries by model and reason")
+LLM_SHED = counter("llm_shed_total", "Requests rejected by queue-depth load shedding, by model")
+
+_RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMOverloaded(Exception):
+    """Shed before queueing: the model lane is saturated. Maps to a 503 for the client."""
+
+    def __init__(self, model: str, retry_after: float):
+        super().__init__(f"{model} is saturated, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class LLMDeadlineExceeded(Exception):
+    """The request ran out of time while queued, rate limited, retrying or streaming."""
+
+
+# ==========================================
+# 1. TOKEN BUCKET (RPM / TPM)
+# ==========================================
+class TokenBucket:
+    """
+    Refills continuously at per_minute/60 per second up to one minute of capacity.
+    Not FIFO: each waiter sleeps on its own and re-checks, so one whose deadline cannot
+    be met fails at once instead of queueing behind the others. The check and the take
+    never straddle an await, so no lock is needed on one event loop.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float, deadline: float) -> None:
+        # A single request bigger than the whole bucket may still go once the bucket is full
+        amount = min(amount, self.capacity)
+        while True:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return
+            wait = (amount - self.tokens) / self.rate
+            if time.monotonic() + wait > deadline:
+                raise LLMDeadlineExceeded("Rate limit wait would exceed the request deadline")
+            await asyncio.sleep(wait)
+
+    def adjust(self, delta: float) -> None:
+        """Reconciles a reservation with actual usage (negative refunds)."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+# ==========================================
+# 2. MODEL LANES
+# ==========================================
+class ModelLane:
+    def __init__(self, model: str, concurrency: int, rpm: float, tpm: float):
+        self.model = model
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.waiting = 0
+        self.in_flight = 0
+
+
+def _retry_reason(error: Exception) -> Optional[str]:
+    """Why an error is worth retrying, or None if it is not."""
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return "timeout" if isinstance(error, asyncio.TimeoutError) else "connection"
+    status = getattr(error, "status_code", None)
+    if status in _RETRYABLE_STATUS:
+        return "rate_limited" if status == 429 else f"http_{status}"
+    # openai.APIConnectionError / APITimeoutError carry no status code
+    name = type(error).__name__
+    if name in ("APIConnectionError", "APITimeoutError"):
+        return "connection" if name == "APIConnectionError" else "timeout"
+    return None
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff; a provider Retry-After is treated as the floor."""
+    ceiling = min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * (2 ** attempt))
+    delay = random.uniform(0, ceiling)
+    return max(delay, retry_after) if retry_after else delay
+
+
+# ==========================================
+# 3. THE GATEWAY
+# ==========================================
+class LLMGateway:
+    """
+    The Provider Shock Absorber.
+    Every chat completion goes through here: shed if the model's queue is too deep,
+    otherwise wait for a concurrency slot and for RPM/TPM budget, then call with a
+    per-attempt timeout and retry transient failures with jittered backoff, all
+    inside one deadline for the whole request.
+    """
+
+    def __init__(self, client, max_concurrency: int = LLM_MAX_CONCURRENCY, rpm: float = LLM_RPM_LIMIT,
+                 tpm: float = LLM_TPM_LIMIT, max_queue_depth: int = LLM_MAX_QUEUE_DEPTH):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_queue_depth = max_queue_depth
+        self._lanes: Dict[str, ModelLane] = {}
+
+    def lane(self, model: str) -> ModelLane:
+        if model not in self._lanes:
+            self._lanes[model] = ModelLane(model, self.max_concurrency, self.rpm, self.tpm)
+        return self._lanes[model]
+
+    def status(self) -> dict:
+        return {model: {"in_flight": lane.in_flight, "waiting": lane.waiting} for model, lane in self._lanes.items()}
+
+    async def _admit(self, lane: ModelLane, estimated_tokens: int, deadline: float) -> None:
+        if lane.waiting >= self.max_queue_depth:
+            LLM_SHED.inc(model=lane.model)
+            # Rough time for the queue ahead to drain at the current concurrency
+            raise LLMOverloaded(lane.model, retry_after=max(1.0, lane.waiting / max(1, self.max_concurrency)))
+        lane.waiting += 1
+        try:
+            remaining = deadline - time.monotonic()
+            await asyncio.wait_for(lane.semaphore.acquire(), timeout=max(0.0, remaining))
+        except asyncio.TimeoutError:
+            raise LLMDeadlineExceeded(f"Queued for {lane.model} past the request deadline")
+        finally:
+            lane.waiting -= 1
+        try:
+            if lane.requests is not None:
+                await lane.requests.acquire(1, deadline)
+            if lane.tokens is not None:
+                await lane.tokens.acquire(estimated_tokens, deadline)
+        except BaseException:
+            lane.semaphore.release()
+            raise
+        lane.in_flight += 1
+
+    def _release(self, lane: ModelLane) -> None:
+        lane.in_flight -= 1
+        lane.semaphore.release()
+
+    @staticmethod
+    def _estimate(messages: List[dict]) -> int:
+        return sum(estimate_tokens(m.get("content") or "") for m in messages) + LLM_COMPLETION_TOKEN_ESTIMATE
+
+    async def _backoff_or_raise(self, lane: ModelLane, error: Exception, attempt: int, deadline: float) -> None:
+        reason = _retry_reason(error)
+        if reason is None or attempt >= LLM_MAX_RETRIES:
+            LLM_REQUESTS.inc(model=lane.model, outcome="error")
+            raise error
+        delay = backoff_delay(attempt, _retry_after(error))
+        if time.monotonic() + delay >= deadline:
+            LLM_REQUESTS.inc(model=lane.model, outcome="deadline")
+            raise LLMDeadlineExceeded(f"{lane.model} still failing ({reason}) at the request deadline") from error
+        LLM_RETRIES.inc(model=lane.model, reason=reason)
+        await asyncio.sleep(delay)
+
+    async def complete(self, model: str, messages: List[dict], deadline_seconds: float = LLM_DEADLINE_SECONDS, **kwargs):
+        """Non-streaming chat completion; returns the provider response object."""
+        lane = self.lane(model)
+        deadline = time.monotonic() + deadline_seconds
+        estimated = self._estimate(messages)
+        attempt = 0
+        while True:
+            await self._admit(lane, estimated, deadline)
+            try:
+                timeout = min(LLM_ATTEMPT_TIMEOUT_SECONDS, deadline - time.monotonic())
+                response = await asyncio.wait_for(
+                    self.client.chat.completions.create(model=model, messages=messages, **kwargs), timeout=timeout
+                )
+            except Exception as e:
+                error = e
+            else:
+                error = None
+            finally:
+                self._release(lane)
+            if error is not None:
+                await self._backoff_or_raise(lane, error, attempt, deadline)
+                attempt += 1
+                continue
+            usage = getattr(response, "usage", None)
+            if lane.tokens is not None and getattr(usage, "total_tokens", None):
+                lane.tokens.adjust(usage.total_tokens - estimated)
+            LLM_REQUESTS.inc(model=model, outcome="ok")
+            return response
+
+    async def stream(self, model: str, messages: List[dict], deadline_seconds: float = LLM_DEADLINE_SECONDS,
+                     **kwargs) -> AsyncIterator:
+        """
+        Streaming chat completion yielding provider chunks. The slot is held until the
+        stream ends. Retries only happen before the first chunk has been handed out.
+        """
+        lane = self.lane(model)
+        deadline = time.monotonic() + deadline_seconds
+        estimated = self._estimate(messages)
+        attempt = 0
+        while True:
+            await self._admit(lane, estimated, deadline)
+            yielded, error = False, None
+            # For reconciling the TPM reservation: provider usage (stream_options.include_usage)
+            # when the final chunk carries it, otherwise an estimate from the streamed text
+            usage_tokens, completion_parts = None, []
+            try:
+                timeout = min(LLM_ATTEMPT_TIMEOUT_SECONDS, deadline - time.monotonic())
+                stream = await asyncio.wait_for(
+                    self.client.chat.completions.create(model=model, messages=messages, stream=True, **kwargs),
+                    timeout=timeout,
+                )
+                iterator = stream.__aiter__()
+                while True:
+                    # Each chunk must arrive within the attempt timeout and the overall deadline
+                    timeout = min(LLM_ATTEMPT_TIMEOUT_SECONDS, deadline - time.monotonic())
+                    try:
+                        chunk = await asyncio.wait_for(iterator.__anext__(), timeout=max(0.0, timeout))
+                    except StopAsyncIteration:
+                        break
+                    usage = getattr(chunk, "usage", None)
+                    if getattr(usage, "total_tokens", None):
+                        usage_tokens = usage.total_tokens
+                    elif getattr(chunk, "choices", None) and chunk.choices[0].delta.content:
+                        completion_parts.append(chunk.choices[0].delta.content)
+                    yielded = True
+                    yield chunk
+            except Exception as e:
+                error = e
+            finally:
+                # Also runs when the client disconnects mid-stream (GeneratorExit / cancellation)
+                self._release(lane)
+                if lane.tokens is not None and yielded:
+                    if usage_tokens is None:
+                        usage_tokens = estimated - LLM_COMPLETION_TOKEN_ESTIMATE + estimate_tokens("".join(completion_parts))
+                    lane.tokens.adjust(usage_tokens - estimated)
+            if error is None:
+                LLM_REQUESTS.inc(model=model, outcome="ok")
+                return
+            if yielded:
+                LLM_REQUESTS.inc(model=model, outcome="error")
+                if isinstance(error, asyncio.TimeoutError):
+                    raise LLMDeadlineExceeded(f"{model} stream stalled") from error
+                raise error
+            await self._backoff_or_raise(lane, error, attempt, deadline)
+            attempt += 1
@@ -1,23 +1,42 @@
 # backend/main.py
+import asyncio
 import json
 import os
-from typing import List, Dict
-from fastapi import FastAPI, Request
-from fastapi.responses import StreamingResponse
+import tempfile
+import time
+from datetime import date, datetime
+from typing import Any, Dict, List
+from fastapi import FastAPI, Request, HTTPException, UploadFile, File
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-import openai
 from dotenv import load_dotenv
 
-# Import our Enterprise State Models and Enforcer
-from backend.models import I9State, StateDeltaPayload, EmployerContext, EmployeeProfile
-from backend.state_machine import apply_state_delta
-from backend import prompts
-
+# Load .env before backend modules read their configuration at import
 load_dotenv()
 
-app = FastAPI(title="CEIPAL I-9 Compliance Engine")
+# Import our Enterprise State Models and Enforcer
+from backend.models import AuditEntry, I9State, StateDeltaPayload
+from backend.state_machine import apply_state_delta
+from backend.streaming import NarrationStreamExtractor, sse_event
+from backend.conversation import ConversationMemory, record_window_savings
+from backend.resources import lifespan, get_llm_gateway, get_session_store, get_conversation_store, get_pdf_service, get_audit_ledger, get_response_cache, get_hr_directory, get_backoffice_index, get_sla_scheduler, warm_up, resource_status
+from backend.prompt_builder import build_prompt
+from backend.pdf_service import PDF_ARCHIVE_ENABLED, archive_pdf
+from backend.retrieval import RAG_LOOKUPS, RuleRetriever, should_retrieve, format_rules_for_prompt
+from backend.metrics import PROMETHEUS_CONTENT_TYPE, counter, gauge, render_prometheus
+from backend.llm_gateway import LLMDeadlineExceeded, LLMOverloaded
+from backend.response_cache import is_cacheable_turn, response_fingerprint
+from backend.model_router import create_model_router
+from backend.telemetry import record_error, record_usage, stage
+from backend.session_store import SessionBusy, SessionConflict
+from backend.hr_directory import hydrate_session
+from backend.sla_scheduler import derive_due_dates
+from backend.section1_validator import compile_schema, validate_roster
+from backend.fast_path import FAST_PATH_ENABLED, extract_fast_delta, fast_path_payload, record_llm_latency, templated_narration
+
+app = FastAPI(title="CEIPAL I-9 Compliance Engine", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -27,9 +46,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-client = openai.AsyncClient(api_key=os.getenv("OPENAI_API_KEY"))
+# Token-level streaming of the narration. Set to "false" to fall back to one blocking completion.
+STREAMING_ENABLED = os.getenv("CHAT_STREAMING_ENABLED", "true").lower() == "true"
 
-ACTIVE_SESSIONS: Dict[str, I9State] = {}
+RULE_RETRIEVER = RuleRetriever()
+# Completed turns by "<session_id>:<request_id>", kept as long as sessions are (store TTL)
+TURN_NAMESPACE = "turn"
+TURN_REPLAYS = counter("chat_turn_replays_total", "Retried chat requests answered from the stored result of the same request_id")
+MODEL_ROUTER = create_model_router()
+
+PROMPT_CACHEABLE_TOKENS = counter(
+    "prompt_cacheable_prefix_tokens_total",
+    "Estimated prompt tokens sent as a stable, provider-cacheable prefix",
+)
 
 class MessageItem(BaseModel):
     role: str
@@ -38,7 +67,29 @@ class MessageItem(BaseModel):
 class ChatRequest(BaseModel):
     session_id: str = "default_session"
     message: str | None = None
+    # Deprecated: history now lives server-side. Only used to seed a session that has none yet.
     history: List[MessageItem] = []
+    # Client-generated id per employee message; a retry with the same id replays the stored result
+    request_id: str | None = None
+    # HR id used to hydrate a brand-new session (defaults to the session id, as precreate names them)
+    employee_id: str | None = None
+
+class Section1Submission(BaseModel):
+    session_id: str
+    # Field name -> value, keyed by the names generate_strict_schema handed to the UI
+    fields: Dict[str, Any]
+
+class Section2Completion(BaseModel):
+    # Who in HR examined the documents; defaults to now when completed_at is omitted
+    completed_by: str = "HR"
+    completed_at: datetime | None = None
+
+class PrecreateRequest(BaseModel):
+    # Either an explicit list of hires, or a whole employer cohort (optionally by hire-date window)
+    employee_ids: List[str] = []
+    employer_id: str | None = None
+    hired_from: date | None = None
+    hired_to: date | None = None
 
 def generate_strict_schema(state: I9State) -> dict:
     """The Python backend alone decides what the UI looks like."""
@@ -77,100 +128,603 @@ def generate_strict_schema(state: I9State) -> dict:
         "fields": fields
     }
 
+async def commit_session(session_id: str, state: I9State, version: int) -> None:
+    """
+    Compare-and-swap the session first, then append its audit entries, then point the
+    session's audit cursor at them. A turn that loses the CAS (SessionConflict) leaves
+    nothing behind in the append-only ledger.
+    """
+    sessions = get_session_store()
+    entries = state.drain_audit()
+    with stage("session_save"):
+        # If a turn in another worker slipped past the session lock (lease expired),
+        # fail loudly instead of dropping its delta
+        derive_due_dates(state)
+        await sessions.put_if_version(session_id, state, version)
+    with stage("audit_append"):
+        cursor = await get_audit_ledger().append(session_id, entries)
+    if cursor is not None:
+        state.audit_cursor = cursor
+        with stage("session_save"):
+            await sessions.put_if_version(session_id, state, version + 1)
+    get_backoffice_index().update(session_id, state)
+    get_sla_scheduler().track(session_id, state)
+
+# ==========================================
+# HEALTH & WARM-UP
+# ==========================================
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up. Never touches lazy resources."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: reports which lazy resources are initialized and how many entries the store holds."""
+    status = resource_status()
+    if status["session_store"]:
+        status["store_entries"] = await get_session_store().size()
+    return status
+
+SESSION_STORE_ENTRIES = gauge("session_store_entries", "Live entries in the session store (sessions + transcripts)")
+RESPONSE_CACHE_ENTRIES = gauge("response_cache_entries", "Live entries in the LLM response cache")
+BACKOFFICE_INDEX_ENTRIES = gauge("backoffice_index_sessions", "Sessions held by the HR back-office index")
+LLM_LANE_DEPTH = gauge("llm_lane_requests", "LLM gateway requests per model lane, in flight or waiting for a slot")
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint. Sizes are sampled now, and only for resources already initialized."""
+    status = resource_status()
+    if status["session_store"]:
+        SESSION_STORE_ENTRIES.set(await get_session_store().size())
+    if status["response_cache"]:
+        RESPONSE_CACHE_ENTRIES.set(await get_response_cache().store.size())
+    if status["backoffice_index"] is not None:
+        BACKOFFICE_INDEX_ENTRIES.set(status["backoffice_index"])
+    for model, lane in status["llm_lanes"].items():
+        LLM_LANE_DEPTH.set(lane["in_flight"], model=model, state="in_flight")
+        LLM_LANE_DEPTH.set(lane["waiting"], model=model, state="waiting")
+    return Response(content=render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+@app.post("/api/warmup")
+async def warmup(include_rules: bool = False):
+    """Explicitly initializes clients/stores (and optionally ChromaDB + BM25) before traffic arrives."""
+    return {"status": "warm", "timings_ms": await warm_up(include_rules=include_rules)}
+
+async def complete_turn(model: str, api_messages: List[dict], reply: dict):
+    """
+    One JSON-mode completion through the gateway. Yields narration deltas as they stream;
+    the full reply text (and provider usage, when reported) is left in `reply`.
+    """
+    if STREAMING_ENABLED:
+        # Stream the completion and tap the narration out of the partial JSON
+        # so the employee sees text within a few hundred milliseconds.
+        stream = get_llm_gateway().stream(
+            model=model,
+            messages=api_messages,
+            response_format={"type": "json_object"},
+            temperature=0.0,
+            # The final chunk then carries response.usage
+            stream_options={"include_usage": True}
+        )
+        extractor = NarrationStreamExtractor()
+        ai_parts = []
+        async for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                reply["usage"] = chunk.usage
+            if not chunk.choices:
+                continue
+            piece = chunk.choices[0].delta.content
+            if not piece:
+                continue
+            ai_parts.append(piece)
+            narration_delta = extractor.feed(piece)
+            if narration_delta:
+                yield narration_delta
+        reply["text"] = "".join(ai_parts)
+    else:
+        response = await get_llm_gateway().complete(
+            model=model,
+            messages=api_messages,
+            response_format={"type": "json_object"},
+            temperature=0.0
+        )
+        reply["text"] = response.choices[0].message.content
+        reply["usage"] = getattr(response, "usage", None)
+
 @app.post("/api/chat/employee")
 async def chat_employee(request: ChatRequest):
     user_message = request.message or ""
     session_id = request.session_id
 
-    # Simulate HR pre-loading data when a new session starts
-    if session_id not in ACTIVE_SESSIONS:
-        new_session = I9State()
-        new_session.employer = EmployerContext(company_name="CEIPAL Corp", uses_everify=True)
-        new_session.employee = EmployeeProfile(first_name="Rajesh", preloaded_status="H-1B", section1_due_date="EOD Today")
-        # Run gap engine immediately on the pre-loaded data
-        from backend.compliance_matrix import evaluate_compliance_gaps
-        new_session.compliance_gaps = evaluate_compliance_gaps(new_session)
-        ACTIVE_SESSIONS[session_id] = new_session
-        
-    current_state = ACTIVE_SESSIONS[session_id]
+    sessions = get_session_store()
+    conversations = get_conversation_store()
+    turn_key = f"{session_id}:{request.request_id}" if request.request_id else None
+
+    async def locked_turn():
+        rules_task = None
+        # One span per turn; every stage below nests under it
+        with stage("turn"):
+            try:
+                # A retry of a turn that already completed gets the same answer, not a second LLM call
+                if turn_key is not None:
+                    replay = await sessions.load(TURN_NAMESPACE, turn_key)
+                    if replay is not None:
+                        TURN_REPLAYS.inc()
+                        yield replay.decode("utf-8")
+                        return
+
+                # M-274 retrieval (when enabled) depends only on the message, so it starts here and
+                # overlaps the session, HR, history and cache lookups; awaited at prompt build
+                if should_retrieve(user_message):
+                    rules_task = asyncio.create_task(RULE_RETRIEVER.retrieve(user_message))
+
+                # Loaded under the session lock, so this turn starts from the previous turn's result
+                current_state, version = await sessions.get_versioned(session_id)
+
+                # New session: one indexed HR lookup, gaps evaluated on the HR data
+                # (precreated sessions skip this entirely)
+                if current_state is None:
+                    employee_id = request.employee_id or session_id
+                    with stage("hr_lookup"):
+                        record = await get_hr_directory().get(employee_id)
+                    if record is None:
+                        yield sse_event("error", f"No HR record for employee '{employee_id}'")
+                        return
+                    current_state = hydrate_session(record)
+
+                memory = await conversations.get(session_id)
+                if memory is None:
+                    memory = ConversationMemory()
+                    for msg in request.history:
+                        memory.append(msg.role, msg.content)
+
+                # ==========================================
+                # DETERMINISTIC FAST PATH
+                # ==========================================
+                # An unambiguous answer to the gap the agent just asked about never reaches the LLM
+                fast_delta = None
+                if FAST_PATH_ENABLED:
+                    with stage("fast_path"):
+                        fast_delta = extract_fast_delta(current_state, user_message, memory.last_assistant_message())
+
+                if fast_delta is not None:
+                    payload = fast_path_payload(fast_delta)
+                else:
+                    history_window = memory.to_messages()
+                    record_window_savings(memory, history_window)
+
+                    # Cheapest model whose route fits this turn; also part of the cache key
+                    route = MODEL_ROUTER.choose(current_state, user_message, memory.recent_failures)
+
+                    # Same HR profile, gaps, history and message -> same prompt -> replay the stored reply
+                    fingerprint, payload = None, None
+                    if is_cacheable_turn(user_message):
+                        with stage("cache_lookup"):
+                            fingerprint = response_fingerprint(current_state, history_window, user_message, route.model)
+                            payload = await get_response_cache().get(fingerprint)
+                        if payload is not None and STREAMING_ENABLED and payload.narration:
+                            yield sse_event("narration_delta", payload.narration)
+
+                new_state = None
+                cache_fresh_reply = False
+                if fast_delta is None and payload is None:
+                    # ==========================================
+                    # THE CONSTRAINT-DRIVEN PROMPT INJECTION
+                    # ==========================================
+                    # Static rules form a byte-identical prefix; HR records, gaps and state go last.
+                    reference_rules = ""
+                    if rules_task is not None:
+                        try:
+                            with stage("retrieval"):
+                                reference_rules = format_rules_for_prompt(await rules_task)
+                        except Exception:
+                            # Retrieval is advisory; the deterministic backend does not depend on it
+                            RAG_LOOKUPS.inc(outcome="error")
+
+                    with stage("prompt_build"):
+                        prompt = build_prompt(current_state, history_window, user_message, reference_rules)
+                    api_messages = prompt.messages
+                    PROMPT_CACHEABLE_TOKENS.inc(prompt.cacheable_prefix_tokens)
+
+                    # ==========================================
+                    # THE ESCALATION LADDER
+                    # ==========================================
+                    # A reply that does not parse, that the Bouncer rejects, or that comes back
+                    # below the route's confidence floor is retried one route up.
+                    escalated = False
+                    while True:
+                        llm_started = time.perf_counter()
+                        reply = {}
+                        with stage("llm", model=route.model, route=route.name):
+                            async for narration_delta in complete_turn(route.model, api_messages, reply):
+                                yield sse_event("narration_delta", narration_delta)
+                        elapsed = time.perf_counter() - llm_started
+                        # Feeds the fast path's estimate of latency saved per hit
+                        record_llm_latency(elapsed)
+                        record_usage(route.model, reply.get("usage"))
+
+                        try:
+                            # Nothing below runs until the FULL payload has been validated.
+                            with stage("parse"):
+                                raw_json = json.loads(reply["text"])
+                                payload = StateDeltaPayload(**raw_json)
+                            if MODEL_ROUTER.needs_escalation(route, payload.confidence_score):
+                                raise ValueError(f"confidence {payload.confidence_score} below {route.min_confidence} on route {route.name}")
+                            with stage("apply_state_delta"):
+                                new_state = apply_state_delta(
+                                    current_state=current_state,
+                                    delta=payload.state_delta,
+                                    modified_by="AI_Agent"
+                                )
+                        except ValueError:
+                            # JSONDecodeError and pydantic's ValidationError are both ValueErrors
+                            memory.recent_failures += 1
+                            next_route = MODEL_ROUTER.escalation(route)
+                            outcome = "escalated" if next_route is not None else "failed"
+                            MODEL_ROUTER.record(route, outcome, elapsed, api_messages, reply["text"], reply.get("usage"))
+                            if next_route is None:
+                                await conversations.put(session_id, memory)
+                                raise
+                            if STREAMING_ENABLED:
+                                # The rejected narration was already on screen; the next model starts over
+                                yield sse_event("narration_reset", "")
+                            route, escalated = next_route, True
+                            continue
+                        MODEL_ROUTER.record(route, "ok", elapsed, api_messages, reply["text"], reply.get("usage"))
+                        memory.recent_failures = max(0, memory.recent_failures - 1)
+                        break
+                    # The fingerprint names the first route's model; an escalated reply stored under it
+                    # would be replayed as that model's answer and never escalate again
+                    cache_fresh_reply = fingerprint is not None and not escalated
+
+                if new_state is None:
+                    with stage("apply_state_delta"):
+                        new_state = apply_state_delta(
+                            current_state=current_state,
+                            delta=payload.state_delta,
+                            modified_by="FastPath" if fast_delta is not None else "AI_Agent"
+                        )
+                if fast_delta is not None:
+                    payload.narration = templated_narration(new_state)
+                await commit_session(session_id, new_state, version)
+                # Only replies the deterministic backend accepted (and that were committed) are worth replaying
+                if cache_fresh_reply:
+                    await get_response_cache().put(fingerprint, payload)
+                # The hidden INIT trigger is never part of the visible transcript
+                if user_message != "INIT_CONVERSATION":
+                    memory.append("user", user_message)
+                if payload.narration:
+                    memory.append("assistant", payload.narration)
+                await conversations.put(session_id, memory)
+
+                response_payload = {
+                    "intent": payload.intent,
+                    "narration": payload.narration,
+                }
+
+                # The Python Bouncer alone decides if the form opens
+                if new_state.is_ready_for_form:
+                    response_payload["intent"] = "FORM_READY"
+                    with stage("schema"):
+                        response_payload["artifacts"] = {
+                            "dynamic_form": generate_strict_schema(new_state)
+                        }
+
+                with stage("serialize"):
+                    response_payload["current_state"] = new_state.model_dump(mode="json")
+                    result_event = sse_event("result", response_payload)
+                if turn_key is not None:
+                    await sessions.save(TURN_NAMESPACE, turn_key, result_event.encode("utf-8"))
+                yield result_event
+
+            except LLMOverloaded as e:
+                record_error(e)
+                # Load shed: fail fast instead of queueing behind a slow provider
+                yield sse_event("overloaded", {"status": 503, "retry_after": round(e.retry_after), "message": str(e)})
+            except LLMDeadlineExceeded as e:
+                record_error(e)
+                yield sse_event("overloaded", {"status": 504, "retry_after": 5, "message": str(e)})
+            except SessionConflict as e:
+                record_error(e)
+                yield sse_event("overloaded", {"status": 409, "retry_after": 1, "message": str(e)})
+            except Exception as e:
+                record_error(e)
+                yield sse_event("error", f"Compliance Engine Error: {str(e)}")
+            finally:
+                # Fast-path, cached and failed turns never build a prompt: drop their retrieval
+                if rules_task is not None and not rules_task.done():
+                    rules_task.cancel()
+                elif rules_task is not None and not rules_task.cancelled():
+                    # Marks an unawaited failure as seen (no "exception was never retrieved")
+                    rules_task.exception()
 
     async def event_stream():
+        # Turns of one session run one at a time: a double-click or retry waits for the turn
+        # in flight and then builds on its state (or replays its result). Sessions never wait
+        # on each other.
         try:
-            # ==========================================
-            # THE CONSTRAINT-DRIVEN PROMPT INJECTION
-            # ==========================================
-            dynamic_instructions = f"""
-            --- HR RECORDS ---
-            Employee Name: {current_state.employee.first_name}
-            Employer: {current_state.employer.company_name} (E-Verify Active: {current_state.employer.uses_everify})
-            Onboarding Profile: {current_state.employee.preloaded_status}
-            Deadline: {current_state.employee.section1_due_date}
-
-            --- COMPLIANCE GAPS (BLOCKING THE FORM) ---
-            The deterministic backend requires you to resolve these gaps before the form can open:
-            {current_state.compliance_gaps}
-
-            YOUR DIRECTIVES:
-            1. If the user's message is "INIT_CONVERSATION", initiate the chat proactively. Greet them warmly by name, mention their employer and deadline, and state their status naturally (e.g., "Our records indicate you are joining us on an H-1B visa."). Ask them to confirm if this is correct.
-            2. NEVER use robotic database terms like "pre-loaded status". Speak like a highly professional, polite HR Concierge. 
-            3. Include a brief disclaimer in your first message that you are an AI assistant helping them complete Section 1, and that you do not make final legal determinations.
-            4. If there are gaps listed above, your ONLY job is to ask a natural question to resolve ONE of those gaps. 
-            5. NEVER return a 'FORM_READY' intent. Only return 'STATE_UPDATE' or 'ASK_QUESTION'.
-            """
-
-            system_prompt = "\n\n".join([
-                prompts.SYSTEM_ROLE,
-                dynamic_instructions, # Injected right at the top!
-                prompts.IMMIGRATION_CLASSIFICATION_RULES,
-                prompts.ANTI_DISCRIMINATION_GUARDRAILS,
-                prompts.OUTPUT_FORMAT_CONTRACT
-            ])
-
-            state_context = f"\n\nCURRENT BACKEND STATE:\n{current_state.model_dump_json(indent=2)}"
-            
-            api_messages = [{"role": "system", "content": system_prompt + state_context}]
-            for msg in request.history:
-                api_messages.append({"role": msg.role, "content": msg.content})
-            api_messages.append({"role": "user", "content": user_message})
-
-            response = await client.chat.completions.create(
-                model="gpt-4o",
-                messages=api_messages,
-                response_format={"type": "json_object"},
-                temperature=0.0
-            )
-            
-            ai_text = response.choices[0].message.content
-            raw_json = json.loads(ai_text)
-
-            payload = StateDeltaPayload(**raw_json)
-
-            new_state = apply_state_delta(
-                current_state=current_state, 
-                delta=payload.state_delta,
-                modified_by="AI_Agent"
-            )
-            ACTIVE_SESSIONS[session_id] = new_state 
-
-            response_payload = {
-                "intent": payload.intent,
-                "narration": payload.narration,
-                "current_state": new_state.model_dump(mode="json")
+            async with sessions.lock(session_id):
+                async for event in locked_turn():
+                    yield event
+        except SessionBusy as e:
+            record_error(e)
+            yield sse_event("overloaded", {"status": 409, "retry_after": 5, "message": str(e)})
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+# ==========================================
+# SECTION 1 SUBMISSION (deterministic validation)
+# ==========================================
+@app.post("/api/section1/submit")
+async def submit_section1(submission: Section1Submission):
+    """
+    Validates the submitted form against the schema this session was shown and returns
+    every error at once (422, intent VALIDATION_ERROR). Accepted names and the work
+    authorization expiration are committed to the session; identifiers are echoed back
+    normalized but never stored in the session.
+    """
+    session_id = submission.session_id
+    sessions = get_session_store()
+    try:
+        async with sessions.lock(session_id):
+            state, version = await sessions.get_versioned(session_id)
+            if state is None:
+                raise HTTPException(status_code=404, detail="Unknown session")
+            if not state.is_ready_for_form:
+                raise HTTPException(status_code=409, detail="Section 1 is not ready for this session")
+
+            validator = compile_schema(generate_strict_schema(state))
+            errors = validator.validate(submission.fields)
+            if errors:
+                return JSONResponse(status_code=422, content={"intent": "VALIDATION_ERROR", "errors": errors})
+            clean = validator.normalize(submission.fields)
+
+            changes = {
+                "employee.first_name": clean["first_name"],
+                "employee.last_name": clean["last_name"],
             }
+            if "work_auth_expiration" in clean:
+                changes["sla_tracking.work_authorization_expires"] = date.fromisoformat(clean["work_auth_expiration"])
+            for path, new_value in changes.items():
+                section, name = path.split(".")
+                target = getattr(state, section)
+                old_value = getattr(target, name)
+                if old_value != new_value:
+                    state.record_audit(AuditEntry(modified_by="Employee", field_changed=path,
+                                                  old_value=str(old_value), new_value=str(new_value)))
+                    setattr(target, name, new_value)
+            # Which fields were attested, never their values (SSN and identifiers stay out of the ledger)
+            state.record_audit(AuditEntry(modified_by="Employee", field_changed="section1_submission",
+                                          new_value=",".join(sorted(clean))))
+
+            await commit_session(session_id, state, version)
+    except (SessionBusy, SessionConflict) as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return {"intent": "SECTION1_ACCEPTED", "fields": clean, "pdf_url": f"/api/i9/{session_id}/pdf"}
+
+@app.post("/api/section1/validate")
+async def validate_section1_roster(roster: UploadFile = File(...)):
+    """
+    Batch mode for HR-imported rosters (JSON array or JSONL). Each record carries
+    citizenship_status (and uses_everify) next to its Section 1 answers; no LLM is involved.
+    """
+    from backend.bulk_stamp import iter_roster
+
+    with tempfile.NamedTemporaryFile(suffix=".roster", delete=False) as tmp:
+        while chunk := await roster.read(1024 * 1024):
+            tmp.write(chunk)
+    try:
+        return await asyncio.to_thread(validate_roster, iter_roster(tmp.name))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Unreadable roster: {e}")
+    finally:
+        os.remove(tmp.name)
+
+# ==========================================
+# SECTION 1 PDF
+# ==========================================
+def section1_fields_from_state(state: I9State) -> dict:
+    """The employee values the backend is willing to stamp onto Section 1."""
+    return {
+        "first_name": state.employee.first_name,
+        "last_name": state.employee.last_name,
+    }
 
-            # The Python Bouncer alone decides if the form opens
-            if new_state.is_ready_for_form:
-                response_payload["intent"] = "FORM_READY"
-                response_payload["artifacts"] = {
-                    "dynamic_form": generate_strict_schema(new_state)
-                }
+@app.get("/api/i9/{session_id}/pdf")
+async def download_section1_pdf(session_id: str):
+    state = await get_session_store().get(session_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Unknown session")
+    # Same bouncer as the form: no PDF until the backend has unlocked Section 1
+    if not state.is_ready_for_form:
+        raise HTTPException(status_code=409, detail="Section 1 is not ready for this session")
+
+    pdf_bytes = await get_pdf_service().stamp(section1_fields_from_state(state))
+
+    filename = f"i9_section1_{session_id}.pdf"
+    if PDF_ARCHIVE_ENABLED:
+        await asyncio.to_thread(archive_pdf, pdf_bytes, filename)
+
+    def iter_pdf(chunk_size: int = 64 * 1024):
+        for start in range(0, len(pdf_bytes), chunk_size):
+            yield pdf_bytes[start:start + chunk_size]
+
+    return StreamingResponse(
+        iter_pdf(),
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'inline; filename="{filename}"', "Content-Length": str(len(pdf_bytes))},
+    )
+
+@app.get("/api/audit/{session_id}")
+async def read_audit_trail(session_id: str, after: int = 0, limit: int = 100):
+    """
+    Pages through a session's hash-chained audit entries (seq > after, oldest first).
+    `problems` is non-empty when the entry the session's audit cursor points at is missing
+    from the ledger or differs from it (e.g. the newest entries were deleted).
+    """
+    ledger = get_audit_ledger()
+    entries = await ledger.read(session_id, after=after, limit=limit)
+    state = await get_session_store().get(session_id)
+    if not entries and after == 0 and state is None:
+        raise HTTPException(status_code=404, detail="Unknown session")
+    head = await ledger.head(session_id)
+    problems = await ledger.check_cursor(session_id, state.audit_cursor) if state is not None else []
+    return {
+        "session_id": session_id,
+        "head": head.model_dump(),
+        "session_cursor": state.audit_cursor.model_dump() if state is not None else None,
+        "problems": problems,
+        "entries": entries,
+        "next_after": entries[-1]["seq"] if entries and entries[-1]["seq"] < head.seq else None,
+    }
 
-            yield f"data: {json.dumps({'type': 'result', 'content': response_payload})}\n\n"
+# ==========================================
+# SESSION PRE-CREATION (hiring cohorts)
+# ==========================================
+PRECREATE_CHUNK = 256
+
+@app.post("/api/sessions/precreate")
+async def precreate_sessions(request: PrecreateRequest):
+    """
+    Warms one session per hire (session id = employee id) from the HR store, with
+    compliance gaps already evaluated, so the first chat turn skips HR entirely.
+    Sessions that already exist are left untouched.
+    """
+    if not request.employee_ids and not request.employer_id:
+        raise HTTPException(status_code=400, detail="Provide employee_ids or an employer_id")
+
+    directory = get_hr_directory()
+    if request.employee_ids:
+        found = await directory.get_many(request.employee_ids)
+        records = list(found.values())
+        missing = [i for i in request.employee_ids if i not in found]
+    else:
+        records = await directory.cohort(request.employer_id, request.hired_from, request.hired_to)
+        missing = []
+
+    sessions = get_session_store()
+    index = get_backoffice_index()
+    scheduler = get_sla_scheduler()
+    created = 0
+    for start in range(0, len(records), PRECREATE_CHUNK):
+        states = [(r.employee_id, hydrate_session(r)) for r in records[start:start + PRECREATE_CHUNK]]
+        outcomes = await asyncio.gather(*(sessions.put_if_absent(sid, state) for sid, state in states))
+        for (sid, state), was_created in zip(states, outcomes):
+            if was_created:
+                index.update(sid, state)
+                scheduler.track(sid, state)
+        created += sum(outcomes)
 
-        except Exception as e:
-            yield f"data: {json.dumps({'type': 'error', 'content': f'Compliance Engine Error: {str(e)}'})}\n\n"
+    return {
+        "requested": len(request.employee_ids) or len(records),
+        "created": created,
+        "existing": len(records) - created,
+        "missing": missing[:200],
+        "missing_count": len(missing),
+    }
 
-    return StreamingResponse(event_stream(), media_type="text/event-stream")
+# ==========================================
+# HR BACK OFFICE (secondary indexes over live sessions)
+# ==========================================
+@app.get("/api/bo/sessions")
+async def backoffice_sessions(gap: str | None = None, citizenship: str | None = None, workflow: str | None = None,
+                              employer: str | None = None, ready: bool | None = None, due: str = "section1",
+                              due_after: date | None = None, due_before: date | None = None, overdue: bool = False,
+                              offset: int = 0, limit: int = 50):
+    """
+    Filterable, paginated session list, soonest `due` deadline first.
+    overdue=true is shorthand for due_before=yesterday.
+    """
+    started = time.perf_counter()
+    index = get_backoffice_index()
+    await index.refresh(get_session_store())
+    if overdue:
+        due_before = date.fromordinal(date.today().toordinal() - 1)
+    try:
+        page = index.query(gap=gap, citizenship=citizenship, workflow=workflow, employer=employer, ready=ready,
+                           due_kind=due, due_after=due_after, due_before=due_before, offset=offset, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    page["took_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return page
+
+@app.get("/api/bo/summary")
+async def backoffice_summary(employer: str | None = None, due_soon_days: int = 7):
+    """Dashboard counts: sessions per gap / citizenship / workflow / employer, overdue and due-soon deadlines."""
+    started = time.perf_counter()
+    index = get_backoffice_index()
+    await index.refresh(get_session_store())
+    summary = index.counts(employer=employer, due_soon_days=due_soon_days)
+    summary["took_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return summary
+
+@app.post("/api/bo/sessions/{session_id}/section2")
+async def complete_section2(session_id: str, completion: Section2Completion):
+    """HR records that Section 2 was completed; the Section 2 deadline and its reminders are dropped."""
+    sessions = get_session_store()
+    try:
+        async with sessions.lock(session_id):
+            state, version = await sessions.get_versioned(session_id)
+            if state is None:
+                raise HTTPException(status_code=404, detail="Unknown session")
+            if state.sla_tracking.section2_completed_at is None:
+                completed_at = completion.completed_at or datetime.utcnow()
+                state.record_audit(AuditEntry(modified_by=completion.completed_by,
+                                              field_changed="sla_tracking.section2_completed_at",
+                                              new_value=completed_at.isoformat()))
+                state.sla_tracking.section2_completed_at = completed_at
+                await commit_session(session_id, state, version)
+    except (SessionBusy, SessionConflict) as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"session_id": session_id, "section2_completed_at": state.sla_tracking.section2_completed_at}
+
+@app.get("/api/sla/status")
+async def sla_status():
+    """Pending Section 2 / reverification deadlines and when the next reminder fires."""
+    return get_sla_scheduler().status()
+
+# ==========================================
+# BULK SECTION 1 STAMPING (HR rosters)
+# ==========================================
+@app.post("/api/i9/bulk")
+async def bulk_stamp_section1(roster: UploadFile = File(...), format: str = "pdf"):
+    """
+    Accepts a JSON array or JSONL roster and stamps every record.
+    format=pdf returns one multi-form PDF, format=zip one zip of individual PDFs.
+    Bad records are listed in the report instead of failing the whole batch.
+    """
+    from backend.bulk_stamp import iter_roster, run_batch
+
+    if format not in ("pdf", "zip"):
+        raise HTTPException(status_code=400, detail="format must be 'pdf' or 'zip'")
+
+    # Spool to disk so the roster is parsed as a stream, never held in memory whole
+    with tempfile.NamedTemporaryFile(suffix=".roster", delete=False) as tmp:
+        while chunk := await roster.read(1024 * 1024):
+            tmp.write(chunk)
+    try:
+        report = await asyncio.to_thread(run_batch, iter_roster(tmp.name), format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Unreadable roster: {e}")
+    finally:
+        os.remove(tmp.name)
+
+    summary = report.summary()
+    summary.pop("artifact")
+    summary["download_url"] = f"/api/i9/bulk/{report.batch_id}"
+    return summary
+
+@app.get("/api/i9/bulk/{batch_id}")
+async def download_bulk_batch(batch_id: str):
+    from backend.bulk_stamp import find_artifact
+
+    path = find_artifact(batch_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Unknown batch")
+    media_type = "application/pdf" if path.endswith(".pdf") else "application/zip"
+    return FileResponse(path, media_type=media_type, filename=os.path.basename(path))
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 FRONTEND_DIR = os.path.join(BASE_DIR, "..", "frontend")
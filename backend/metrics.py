@@ -0,0 +1,130 @@
+# backend/metrics.py
+import bisect
+import math
+import threading
+from typing import Dict, List, Tuple
+
+class Counter:
+    """A monotonically increasing, optionally labelled, process-local counter."""
+    kind = "counter"
+
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0.0)
+
+    def samples(self) -> Dict[Tuple, float]:
+        with self._lock:
+            return dict(self._values)
+
+
+class Gauge(Counter):
+    """A value that can go down as well as up (sizes, depths), set at observation time."""
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[tuple(sorted(labels.items()))] = float(value)
+
+
+# Latency buckets in seconds: sub-millisecond backend stages up to multi-second LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Histogram:
+    """Fixed-bucket, optionally labelled distribution (Prometheus semantics: cumulative on export)."""
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str = "", buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self) -> Dict[Tuple, dict]:
+        """Per label set: cumulative bucket counts keyed by upper bound, plus sum and count."""
+        with self._lock:
+            out = {}
+            for key, (counts, total, count) in self._values.items():
+                running, cumulative = 0, {}
+                for bound, n in zip(self.buckets + (math.inf,), counts):
+                    running += n
+                    cumulative[bound] = running
+                out[key] = {"buckets": cumulative, "sum": total, "count": count}
+            return out
+
+
+REGISTRY: Dict[str, object] = {}
+
+def counter(name: str, description: str = "") -> Counter:
+    """Returns the registered counter with this name, creating it on first use."""
+    if name not in REGISTRY:
+        REGISTRY[name] = Counter(name, description)
+    return REGISTRY[name]
+
+def gauge(name: str, description: str = "") -> Gauge:
+    if name not in REGISTRY:
+        REGISTRY[name] = Gauge(name, description)
+    return REGISTRY[name]
+
+def histogram(name: str, description: str = "", buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+    if name not in REGISTRY:
+        REGISTRY[name] = Histogram(name, description, buckets)
+    return REGISTRY[name]
+
+
+# ==========================================
+# PROMETHEUS TEXT EXPOSITION (format 0.0.4)
+# ==========================================
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(key: Tuple, extra: Tuple = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+def render_prometheus() -> str:
+    lines: List[str] = []
+    for name in sorted(REGISTRY):
+        metric = REGISTRY[name]
+        lines.append(f"# HELP {name} {_escape(metric.description)}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for key, value in sorted(metric.samples().items()):
+            if metric.kind != "histogram":
+                lines.append(f"{name}{_labels(key)} {_number(value)}")
+                continue
+            for bound, cumulative in value["buckets"].items():
+                lines.append(f"{name}_bucket{_labels(key, (('le', _number(bound)),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(key)} {_number(value['sum'])}")
+            lines.append(f"{name}_count{_labels(key)} {value['count']}")
+    return "\n".join(lines) + "\n"
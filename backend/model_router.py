@@ -0,0 +1,123 @@
+# backend/model_router.py
+import json
+import os
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Optional
+
+from backend.conversation import estimate_tokens
+from backend.metrics import counter
+from backend.models import I9State
+
+# ==========================================
+# ROUTING TABLE (first matching route wins)
+# ==========================================
+# Override with MODEL_ROUTES (inline JSON) or MODEL_ROUTES_PATH (a JSON file), same shape.
+DEFAULT_ROUTES = [
+    {
+        # Confirming a status, an SSN or an expiration date is well within a small model
+        "name": "confirm",
+        "model": "gpt-4o-mini",
+        "max_words": 25,
+        "gaps": ["CONFIRM_CITIZENSHIP_STATUS", "RESOLVE_SSN_STATUS_FOR_EVERIFY", "CONFIRM_WORK_AUTH_EXPIRATION"],
+        "max_failures": 0,
+        "min_confidence": 0.7,
+        "escalate_to": "full",
+    },
+    {"name": "full", "model": "gpt-4o"},
+]
+
+# USD per 1M tokens (input, output); override with MODEL_PRICES='{"model": [in, out]}'
+DEFAULT_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+MODEL_ROUTE_TURNS = counter("model_route_turns_total", "LLM calls per route/model and outcome (ok, escalated, failed)")
+MODEL_ROUTE_SECONDS = counter("model_route_seconds_total", "Wall time spent in LLM calls per route/model")
+MODEL_ROUTE_COST = counter("model_route_cost_usd_total", "Estimated LLM spend per route/model in USD")
+MODEL_ROUTE_TOKENS = counter("model_route_tokens_total", "Prompt and completion tokens per route/model")
+
+
+@dataclass(frozen=True)
+class Route:
+    name: str
+    model: str
+    # Conditions; None means "any"
+    max_words: Optional[int] = None
+    gaps: Optional[FrozenSet[str]] = None
+    max_failures: Optional[int] = None
+    # INIT_CONVERSATION opens the session (greeting + disclaimer); only routes that opt in take it
+    allow_init: bool = False
+    # Escalation
+    min_confidence: float = 0.0
+    escalate_to: Optional[str] = None
+
+    def matches(self, state: I9State, user_message: str, recent_failures: int) -> bool:
+        if user_message == "INIT_CONVERSATION":
+            if not self.allow_init and (self.max_words is not None or self.gaps is not None):
+                return False
+        elif self.max_words is not None and len(user_message.split()) > self.max_words:
+            return False
+        if self.gaps is not None and not set(state.compliance_gaps) <= self.gaps:
+            return False
+        if self.max_failures is not None and recent_failures > self.max_failures:
+            return False
+        return True
+
+
+class ModelRouter:
+    """
+    The Model Dispatcher.
+    Picks the cheapest route whose conditions fit this turn (open gaps, message length,
+    recent rejected replies) and walks the escalation chain when a reply cannot be
+    parsed, fails validation or comes back below the route's confidence floor.
+    """
+
+    def __init__(self, routes: List[dict], prices: Dict[str, tuple]):
+        self.routes = [
+            Route(**{**spec, "gaps": frozenset(spec["gaps"]) if spec.get("gaps") is not None else None})
+            for spec in routes
+        ]
+        self.by_name = {route.name: route for route in self.routes}
+        for route in self.routes:
+            if route.escalate_to and route.escalate_to not in self.by_name:
+                raise ValueError(f"Route {route.name!r} escalates to unknown route {route.escalate_to!r}")
+        self.prices = prices
+
+    def choose(self, state: I9State, user_message: str, recent_failures: int = 0) -> Route:
+        for route in self.routes:
+            if route.matches(state, user_message, recent_failures):
+                return route
+        # The table should end with a catch-all; if not, the last route is it
+        return self.routes[-1]
+
+    def escalation(self, route: Route) -> Optional[Route]:
+        return self.by_name.get(route.escalate_to) if route.escalate_to else None
+
+    def needs_escalation(self, route: Route, confidence_score: float) -> bool:
+        return route.escalate_to is not None and confidence_score < route.min_confidence
+
+    def record(self, route: Route, outcome: str, seconds: float, prompt_messages: List[dict], completion: str,
+               usage=None) -> None:
+        """Per-route latency, token and cost accounting (provider usage when reported, estimate otherwise)."""
+        labels = {"route": route.name, "model": route.model}
+        prompt_tokens = getattr(usage, "prompt_tokens", None) or sum(estimate_tokens(m.get("content") or "") for m in prompt_messages)
+        completion_tokens = getattr(usage, "completion_tokens", None) or estimate_tokens(completion or "")
+        MODEL_ROUTE_TURNS.inc(outcome=outcome, **labels)
+        MODEL_ROUTE_SECONDS.inc(seconds, **labels)
+        MODEL_ROUTE_TOKENS.inc(prompt_tokens, kind="prompt", **labels)
+        MODEL_ROUTE_TOKENS.inc(completion_tokens, kind="completion", **labels)
+        price_in, price_out = self.prices.get(route.model, (0.0, 0.0))
+        MODEL_ROUTE_COST.inc((prompt_tokens * price_in + completion_tokens * price_out) / 1_000_000, **labels)
+
+
+def create_model_router() -> ModelRouter:
+    routes = DEFAULT_ROUTES
+    if os.getenv("MODEL_ROUTES_PATH"):
+        with open(os.getenv("MODEL_ROUTES_PATH"), "r", encoding="utf-8") as f:
+            routes = json.load(f)
+    elif os.getenv("MODEL_ROUTES"):
+        routes = json.loads(os.getenv("MODEL_ROUTES"))
+    prices = dict(DEFAULT_PRICES)
+    prices.update({model: tuple(pair) for model, pair in json.loads(os.getenv("MODEL_PRICES", "{}")).items()})
+    return ModelRouter(routes, prices)
@@ -1,5 +1,6 @@
 # backend/models.py
-from pydantic import BaseModel, Field
+import json
+from pydantic import BaseModel, Field, PrivateAttr
 from typing import Optional, Literal, List, Any
 from datetime import datetime, date
 
@@ -28,9 +29,18 @@ class AuditEntry(BaseModel):
     new_value: Any = None
     legal_basis_reference: Optional[str] = None
 
+class AuditCursor(BaseModel):
+    """Points at the newest entry of this session's chain in the audit ledger (backend/audit_ledger.py)."""
+    seq: int = 0
+    head_hash: Optional[str] = None
+
 class SLATracking(BaseModel):
     hire_date: Optional[date] = None
     section1_completed_at: Optional[datetime] = None
+    section2_completed_at: Optional[datetime] = None
+    # Expiration of the employee's work authorization (drives reverification)
+    work_authorization_expires: Optional[date] = None
+    # Derived by backend/sla_scheduler.py, never set directly
     section2_due_date: Optional[date] = None
     reverification_due_date: Optional[date] = None
 
@@ -67,12 +77,52 @@ class I9State(BaseModel):
     # Compliance Tracking
     sla_tracking: SLATracking = Field(default_factory=SLATracking)
     receipt_handling: ReceiptHandling = Field(default_factory=ReceiptHandling)
-    audit_trail: List[AuditEntry] = Field(default_factory=list)
+    # The ledger itself lives in the append-only audit store; the state only carries its head
+    audit_cursor: AuditCursor = Field(default_factory=AuditCursor)
 
     # The Engine State
     compliance_gaps: List[str] = Field(default_factory=list, description="List of missing information blocking the form")
     is_ready_for_form: bool = False
 
+    # Entries recorded this turn and not yet committed to the ledger (never serialized)
+    _pending_audit: List[AuditEntry] = PrivateAttr(default_factory=list)
+
+    def record_audit(self, entry: AuditEntry) -> None:
+        self._pending_audit.append(entry)
+
+    def drain_audit(self) -> List[AuditEntry]:
+        """Hands the uncommitted entries to the caller (for AuditLedger.append) and clears them."""
+        entries, self._pending_audit = self._pending_audit, []
+        return entries
+
+    # ==========================================
+    # LLM PROJECTION
+    # ==========================================
+    def to_llm_context(self) -> dict:
+        """
+        Only what the agent needs to reason about the next question.
+        HR records travel separately in the prompt; UI flags and SLA timestamps are
+        backend-only; the audit trail is reduced to a count. Unset values are omitted.
+        """
+        context = {
+            "form_edition": self.form_edition,
+            "workflow_mode": self.workflow_mode,
+            "citizenship_status": self.citizenship_status,
+            "visa_type": self.visa_type,
+            "ssn_status_resolved": self.ssn_status_resolved,
+            "expiration_date_resolved": self.expiration_date_resolved,
+            "compliance_gaps": self.compliance_gaps,
+            "is_ready_for_form": self.is_ready_for_form,
+            "audit_entries": self.audit_cursor.seq,
+        }
+        if self.receipt_handling.receipt_presented:
+            context["receipt_handling"] = self.receipt_handling.model_dump(mode="json", exclude_none=True)
+        return {k: v for k, v in context.items() if v is not None}
+
+    def to_llm_json(self) -> str:
+        """Compact (separator-free) JSON of to_llm_context()."""
+        return json.dumps(self.to_llm_context(), separators=(",", ":"))
+
 class StateDeltaPayload(BaseModel):
     intent: Literal["STATE_UPDATE", "ASK_QUESTION", "FORM_READY", "VALIDATION_ERROR", "ESCALATE"]
     state_delta: dict = Field(default_factory=dict)
@@ -0,0 +1,312 @@
+# backend/pdf_service.py
+import asyncio
+import io
+import os
+import re
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "..", "data")
+OUTPUT_DIR = os.path.join(BASE_DIR, "..", "output", "stamped_i9s")
+
+# Use our "dumb/flattened" template
+TEMPLATE_PATH = os.path.join(DATA_DIR, "i9_flat.pdf")
+
+# "thread" (default), "process" or "inline" (asyncio's shared default thread pool). With the
+# cached template a stamp costs tens of microseconds, so shipping ~670 KB back from a process
+# pool costs more than the stamp itself; the process pool pays off only for heavier overlays.
+# See benchmarks/bench_pdf_stamping.py. No mode ever stamps on the event loop.
+PDF_STAMP_EXECUTOR = os.getenv("PDF_STAMP_EXECUTOR", "thread").lower()
+PDF_STAMP_WORKERS = int(os.getenv("PDF_STAMP_WORKERS", str(os.cpu_count() or 2)))
+# Only write stamped forms to OUTPUT_DIR when archiving is explicitly on
+PDF_ARCHIVE_ENABLED = os.getenv("PDF_ARCHIVE_ENABLED", "false").lower() == "true"
+
+# --- THE COORDINATE MAPPING ---
+# These are approximate (X, Y) points for Section 1 of the 2023 I-9.
+# Reportlab-style coordinates: (0,0) is the bottom-left corner of the page.
+FIELD_COORDS = {
+    "last_name": (40, 600),
+    "first_name": (250, 600),
+    "dob": (450, 600),
+    "i94_number": (40, 480)
+}
+FONT_SIZE = 10
+
+_FONT_NAME = "/FI9Stamp"
+
+
+def _pdf_string(value: str) -> bytes:
+    """A PDF literal string in WinAnsi (what the Type1 Helvetica resource uses)."""
+    data = value.encode("cp1252", errors="replace")
+    return b"(" + re.sub(rb"([\\()])", rb"\\\1", data) + b")"
+
+
+def _xref_and_trailer(entries: list, size: int, trailer_body: bytes, prev_xref: int, xref_offset: int) -> bytes:
+    """Classic xref table (contiguous subsections) + trailer for an incremental update."""
+    entries = sorted(entries)
+    out = [b"xref\n"]
+    i = 0
+    while i < len(entries):
+        j = i
+        while j + 1 < len(entries) and entries[j + 1][0] == entries[j][0] + 1:
+            j += 1
+        out.append(b"%d %d\n" % (entries[i][0], j - i + 1))
+        out.extend(b"%010d %05d n\r\n" % (offset, gen) for _, gen, offset in entries[i:j + 1])
+        i = j + 1
+    out.append(
+        b"trailer\n<< /Size %d %s/Prev %d >>\nstartxref\n%d\n%%%%EOF\n"
+        % (size, trailer_body, prev_xref, xref_offset)
+    )
+    return b"".join(out)
+
+
+class StampTemplate:
+    """
+    The Pre-Parsed Template.
+    Parses i9_flat.pdf exactly once and precomputes everything about the output that does
+    not depend on the employee: the new page-1 object, the font and graphics-state streams,
+    the xref layout and the trailer. Stamping then appends a PDF incremental update
+    (one overlay stream plus that cached tail) to the untouched template bytes — no
+    re-parsing, no page copying and no reportlab canvas per form.
+    """
+
+    def __init__(self, path: str = TEMPLATE_PATH):
+        from pypdf import PdfReader
+        from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject
+
+        with open(path, "rb") as f:
+            self.template_bytes = f.read()
+        if not self.template_bytes.endswith(b"\n"):
+            self.template_bytes += b"\n"
+
+        reader = PdfReader(io.BytesIO(self.template_bytes))
+        if reader.is_encrypted:
+            raise ValueError("Encrypted templates cannot be stamped incrementally")
+
+        trailer = reader.trailer
+        size = int(trailer["/Size"])
+        self.prev_xref = int(re.findall(rb"startxref\s+(\d+)", self.template_bytes)[-1])
+
+        # New objects appended by every stamp: [overlay, open-q, font]
+        self.overlay_num, self.open_num, self.font_num = size, size + 1, size + 2
+        self.new_size = size + 3
+
+        page = reader.pages[0]
+        self.page_num = page.indirect_reference.idnum
+        self.page_gen = page.indirect_reference.generation
+
+        # Page 1 minus /Parent and /Contents (filled per output), plus our font resource
+        base_page = DictionaryObject({k: v for k, v in page.items() if k not in ("/Contents", "/Parent")})
+        resources = DictionaryObject({k: v for k, v in page["/Resources"].items()})
+        fonts = DictionaryObject({k: v for k, v in resources.get("/Font", DictionaryObject()).items()})
+        fonts[NameObject(_FONT_NAME)] = IndirectObject(self.font_num, 0, reader)
+        resources[NameObject("/Font")] = fonts
+        base_page[NameObject("/Resources")] = resources
+        page_buf = io.BytesIO()
+        base_page.write_to_stream(page_buf)
+        self._page_body = page_buf.getvalue().rstrip()[:-2]  # drop the closing ">>"
+
+        # The template's own content streams, referenced (never re-encoded) and wrapped in q/Q.
+        # list.__iter__ yields the raw references (ArrayObject's own iteration resolves them);
+        # an (indirect) array is flattened because a nested array would be invalid.
+        raw_contents = page.raw_get("/Contents")
+        resolved = raw_contents.get_object()
+        streams = list(list.__iter__(resolved)) if isinstance(resolved, ArrayObject) else [raw_contents]
+        self._stream_refs = b" ".join(b"%d %d R" % (ref.idnum, ref.generation) for ref in streams)
+
+        parent = page.raw_get("/Parent")
+        self.page_obj = (
+            b"%d %d obj\n" % (self.page_num, self.page_gen)
+            + self._page_dict(b"%d %d R" % (parent.idnum, parent.generation), self.overlay_num)
+            + b"\nendobj\n"
+        )
+        self.open_obj = b"%d 0 obj\n<< /Length 2 >>\nstream\nq\n\nendstream\nendobj\n" % self.open_num
+        self.font_obj = (
+            b"%d 0 obj\n<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>\nendobj\n"
+            % self.font_num
+        )
+
+        trailer_buf = io.BytesIO()
+        for key in ("/Root", "/Info", "/ID"):
+            if key in trailer:
+                trailer_buf.write(key.encode() + b" ")
+                trailer.raw_get(key).write_to_stream(trailer_buf)
+                trailer_buf.write(b" ")
+        self.trailer_body = trailer_buf.getvalue()
+
+        # Catalog minus /Pages, for multi-form documents that need a new page tree
+        root_ref = trailer.raw_get("/Root")
+        self.root_num, self.root_gen = root_ref.idnum, root_ref.generation
+        catalog = DictionaryObject({k: v for k, v in root_ref.get_object().items() if k != "/Pages"})
+        catalog_buf = io.BytesIO()
+        catalog.write_to_stream(catalog_buf)
+        self._catalog_body = catalog_buf.getvalue().rstrip()[:-2]
+
+    def _page_dict(self, parent_ref: bytes, overlay_num: int) -> bytes:
+        return (
+            self._page_body
+            + b"/Parent %s\n/Contents [ %d 0 R %s %d 0 R ]\n>>" % (parent_ref, self.open_num, self._stream_refs, overlay_num)
+        )
+
+    def overlay_stream(self, employee_data: dict) -> bytes:
+        # Close the template's graphics state, then draw each mapped value
+        ops = [b"Q", b"0 g", b"BT", b"/%s %d Tf" % (_FONT_NAME[1:].encode(), FONT_SIZE)]
+        for form_key, user_value in employee_data.items():
+            if form_key in FIELD_COORDS and user_value:
+                x, y = FIELD_COORDS[form_key]
+                ops.append(b"1 0 0 1 %d %d Tm %s Tj" % (x, y, _pdf_string(str(user_value))))
+        ops.append(b"ET")
+        return b"\n".join(ops)
+
+    def overlay_object(self, num: int, employee_data: dict) -> bytes:
+        content = self.overlay_stream(employee_data)
+        return b"%d 0 obj\n<< /Length %d >>\nstream\n" % (num, len(content)) + content + b"\nendstream\nendobj\n"
+
+    def stamp(self, employee_data: dict) -> bytes:
+        base = len(self.template_bytes)
+        entries = []
+        tail = io.BytesIO()
+        for num, gen, obj in (
+            (self.page_num, self.page_gen, self.page_obj),
+            (self.overlay_num, 0, self.overlay_object(self.overlay_num, employee_data)),
+            (self.open_num, 0, self.open_obj),
+            (self.font_num, 0, self.font_obj),
+        ):
+            entries.append((num, gen, base + tail.tell()))
+            tail.write(obj)
+
+        xref_offset = base + tail.tell()
+        tail.write(_xref_and_trailer(entries, self.new_size, self.trailer_body, self.prev_xref, xref_offset))
+        return self.template_bytes + tail.getvalue()
+
+
+class MultiFormWriter:
+    """
+    Streams many Section 1 forms into ONE PDF without holding them in memory.
+    Every form is a new page that shares the template's content streams, fonts and
+    images by reference, so each additional employee costs ~1 KB instead of a full copy.
+    """
+
+    def __init__(self, template: StampTemplate, fp):
+        self.template = template
+        self.fp = fp
+        self.offset = 0
+        self.entries = []
+        self.kids = []
+        self.next_num = template.new_size
+        self._write(template.template_bytes)
+        self._write_object(template.open_num, 0, template.open_obj)
+        self._write_object(template.font_num, 0, template.font_obj)
+        self.pages_num = self._allocate()
+
+    def _allocate(self) -> int:
+        num = self.next_num
+        self.next_num += 1
+        return num
+
+    def _write(self, data: bytes) -> None:
+        self.fp.write(data)
+        self.offset += len(data)
+
+    def _write_object(self, num: int, gen: int, obj: bytes) -> None:
+        self.entries.append((num, gen, self.offset))
+        self._write(obj)
+
+    def add(self, employee_data: dict) -> None:
+        overlay_num, page_num = self._allocate(), self._allocate()
+        self._write_object(overlay_num, 0, self.template.overlay_object(overlay_num, employee_data))
+        page = self.template._page_dict(b"%d 0 R" % self.pages_num, overlay_num)
+        self._write_object(page_num, 0, b"%d 0 obj\n" % page_num + page + b"\nendobj\n")
+        self.kids.append(page_num)
+
+    def close(self) -> None:
+        kids = b" ".join(b"%d 0 R" % num for num in self.kids)
+        self._write_object(
+            self.pages_num, 0,
+            b"%d 0 obj\n<< /Type /Pages /Kids [ %s ] /Count %d >>\nendobj\n" % (self.pages_num, kids, len(self.kids)),
+        )
+        catalog = self.template._catalog_body + b"/Pages %d 0 R\n>>" % self.pages_num
+        self._write_object(
+            self.template.root_num, self.template.root_gen,
+            b"%d %d obj\n" % (self.template.root_num, self.template.root_gen) + catalog + b"\nendobj\n",
+        )
+        xref_offset = self.offset
+        self._write(_xref_and_trailer(
+            self.entries, self.next_num, self.template.trailer_body, self.template.prev_xref, xref_offset
+        ))
+
+
+# ==========================================
+# PER-PROCESS TEMPLATE CACHE
+# ==========================================
+_template: Optional[StampTemplate] = None
+
+def get_template() -> StampTemplate:
+    global _template
+    if _template is None:
+        _template = StampTemplate(TEMPLATE_PATH)
+    return _template
+
+def stamp_section1(employee_data: dict) -> bytes:
+    """Synchronous stamp using this process's cached template. Safe to call from pool workers."""
+    return get_template().stamp(employee_data)
+
+
+# ==========================================
+# ASYNC SERVICE
+# ==========================================
+def _warm_worker():
+    get_template()
+
+
+class PdfStampingService:
+    """Keeps stamping off the event loop; each pool worker parses the template once at start-up."""
+
+    def __init__(self, executor_kind: str = PDF_STAMP_EXECUTOR, workers: int = PDF_STAMP_WORKERS):
+        self.executor_kind = executor_kind
+        self.workers = workers
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self._executor is None and self.executor_kind != "inline":
+            if self.executor_kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        return self._executor
+
+    async def warm(self) -> None:
+        """Parses the template (and starts the pool) before the first request needs it."""
+        await asyncio.to_thread(get_template)
+        executor = self._get_executor()
+        if executor is not None:
+            await asyncio.get_running_loop().run_in_executor(executor, _warm_worker)
+
+    async def stamp(self, employee_data: dict) -> bytes:
+        executor = self._get_executor()
+        if executor is None:
+            return await asyncio.to_thread(stamp_section1, employee_data)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, stamp_section1, employee_data)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_UNSAFE_FILENAME = re.compile(r"[^A-Za-z0-9_-]+")
+
+def safe_filename_part(value, fallback: str) -> str:
+    """Employee-supplied text reduced to something that can never escape OUTPUT_DIR."""
+    cleaned = _UNSAFE_FILENAME.sub("-", str(value or "")).strip("-")[:40]
+    return cleaned or fallback
+
+def archive_pdf(pdf_bytes: bytes, filename: str) -> str:
+    """Writes a stamped form to OUTPUT_DIR (only used when archiving is on)."""
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    path = os.path.join(OUTPUT_DIR, filename)
+    with open(path, "wb") as f:
+        f.write(pdf_bytes)
+    return path
@@ -0,0 +1,108 @@
+# backend/prompt_builder.py
+from dataclasses import dataclass
+from typing import List
+
+from backend import prompts
+from backend.conversation import estimate_tokens
+from backend.models import I9State
+
+# ==========================================
+# 1. STATIC DIRECTIVES (identical for every session)
+# ==========================================
+# These used to be interpolated together with the HR records. They never change,
+# so they now live in the cacheable prefix and refer to the session context below.
+SESSION_DIRECTIVES = """
+YOUR DIRECTIVES:
+1. If the user's message is "INIT_CONVERSATION", initiate the chat proactively. Greet them warmly by name, mention their employer and deadline, and state their status naturally (e.g., "Our records indicate you are joining us on an H-1B visa."). Ask them to confirm if this is correct.
+2. NEVER use robotic database terms like "pre-loaded status". Speak like a highly professional, polite HR Concierge.
+3. Include a brief disclaimer in your first message that you are an AI assistant helping them complete Section 1, and that you do not make final legal determinations.
+4. If the SESSION CONTEXT lists compliance gaps, your ONLY job is to ask a natural question to resolve ONE of those gaps.
+5. NEVER return a 'FORM_READY' intent. Only return 'STATE_UPDATE' or 'ASK_QUESTION'.
+"""
+
+# ==========================================
+# 2. THE PRECOMPILED, BYTE-IDENTICAL PREFIX
+# ==========================================
+# Built once at import. Every request starts with exactly these bytes so the
+# provider's prompt cache can reuse them across turns AND across sessions.
+STATIC_SYSTEM_PREFIX = "\n\n".join([
+    prompts.SYSTEM_ROLE,
+    SESSION_DIRECTIVES,
+    prompts.IMMIGRATION_CLASSIFICATION_RULES,
+    prompts.ANTI_DISCRIMINATION_GUARDRAILS,
+    prompts.OUTPUT_FORMAT_CONTRACT,
+])
+STATIC_PREFIX_CHARS = len(STATIC_SYSTEM_PREFIX)
+STATIC_PREFIX_TOKENS = estimate_tokens(STATIC_SYSTEM_PREFIX)
+
+
+@dataclass
+class BuiltPrompt:
+    messages: List[dict]
+    # Length of the leading run of messages the previous turn's request already started with
+    cacheable_prefix_chars: int
+    cacheable_prefix_tokens: int
+
+
+def build_session_context(state: I9State, reference_rules: str = "") -> str:
+    """The volatile part: HR records, open gaps and the backend state. Always sent last."""
+    context = f"""--- SESSION CONTEXT ---
+--- HR RECORDS ---
+Employee Name: {state.employee.first_name}
+Employer: {state.employer.company_name} (E-Verify Active: {state.employer.uses_everify})
+Onboarding Profile: {state.employee.preloaded_status}
+Deadline: {state.employee.section1_due_date}
+
+--- COMPLIANCE GAPS (BLOCKING THE FORM) ---
+The deterministic backend requires you to resolve these gaps before the form can open:
+{state.compliance_gaps}
+
+CURRENT BACKEND STATE:
+{state.to_llm_json()}"""
+
+    if reference_rules:
+        context += f"""
+
+--- RELEVANT M-274 GUIDANCE (retrieved; cite, never extend) ---
+{reference_rules}"""
+    return context
+
+
+def stable_history(history_window: List[dict]) -> List[dict]:
+    """
+    The leading part of the window the previous request already sent byte for byte: everything
+    before the latest exchange. Once a rolling summary heads the window, compaction rewrites it
+    turn after turn, so none of the history counts.
+    """
+    if history_window and history_window[0]["role"] == "system":
+        return []
+    last_user = max((i for i, m in enumerate(history_window) if m["role"] == "user"), default=0)
+    return history_window[:last_user]
+
+
+def build_prompt(
+    state: I9State,
+    history_window: List[dict],
+    user_message: str,
+    reference_rules: str = "",
+) -> BuiltPrompt:
+    """
+    Orders the request from most to least stable:
+    static prefix -> conversation window (append-only within a session) -> session context -> new message.
+    """
+    messages = [{"role": "system", "content": STATIC_SYSTEM_PREFIX}]
+    messages.extend(history_window)
+
+    # Only what the previous turn already sent can hit the provider's prompt cache
+    stable = stable_history(history_window)
+    prefix_chars = STATIC_PREFIX_CHARS + sum(len(m["content"]) for m in stable)
+    prefix_tokens = STATIC_PREFIX_TOKENS + sum(estimate_tokens(m["content"]) for m in stable)
+
+    messages.append({"role": "system", "content": build_session_context(state, reference_rules)})
+    messages.append({"role": "user", "content": user_message})
+
+    return BuiltPrompt(
+        messages=messages,
+        cacheable_prefix_chars=prefix_chars,
+        cacheable_prefix_tokens=prefix_tokens,
+    )
@@ -0,0 +1,227 @@
+# backend/resources.py
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from backend.conversation import ConversationStore
+from backend.session_store import SessionStore, create_session_store
+
+# ==========================================
+# LAZILY INITIALIZED, LIFESPAN-MANAGED RESOURCES
+# ==========================================
+# Importing the app must stay cheap: nothing here opens a socket, a file or imports
+# the OpenAI SDK until a request (or an explicit warm-up) actually needs it.
+
+_llm_client = None
+_llm_gateway = None
+_session_store: Optional[SessionStore] = None
+_conversations: Optional[ConversationStore] = None
+_pdf_service = None
+_audit_ledger = None
+_response_cache = None
+_hr_directory = None
+_backoffice_index = None
+_sla_scheduler = None
+_init_lock = asyncio.Lock()
+
+# Warm everything during startup instead of on the first employee request
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "false").lower() == "true"
+
+
+def get_llm_client():
+    global _llm_client
+    if _llm_client is None:
+        import openai
+
+        from backend.llm_gateway import LLM_ATTEMPT_TIMEOUT_SECONDS
+
+        # Retries and timeouts are owned by the gateway; the SDK must not stack its own on top.
+        # OPENAI_BASE_URL (read by the SDK) points this at the mock server for load tests.
+        _llm_client = openai.AsyncClient(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            max_retries=0,
+            timeout=LLM_ATTEMPT_TIMEOUT_SECONDS,
+        )
+    return _llm_client
+
+
+def get_llm_gateway():
+    global _llm_gateway
+    if _llm_gateway is None:
+        from backend.llm_gateway import LLMGateway
+
+        _llm_gateway = LLMGateway(get_llm_client())
+    return _llm_gateway
+
+
+def get_session_store() -> SessionStore:
+    global _session_store
+    if _session_store is None:
+        # Pluggable persistence (memory LRU/TTL or shared SQLite WAL), see backend/session_store.py
+        _session_store = create_session_store()
+    return _session_store
+
+
+def get_conversation_store() -> ConversationStore:
+    global _conversations
+    if _conversations is None:
+        _conversations = ConversationStore(get_session_store())
+    return _conversations
+
+
+def get_pdf_service():
+    global _pdf_service
+    if _pdf_service is None:
+        from backend.pdf_service import PdfStampingService
+
+        _pdf_service = PdfStampingService()
+    return _pdf_service
+
+
+def get_audit_ledger():
+    global _audit_ledger
+    if _audit_ledger is None:
+        from backend.audit_ledger import create_audit_ledger
+
+        _audit_ledger = create_audit_ledger()
+    return _audit_ledger
+
+
+def get_response_cache():
+    global _response_cache
+    if _response_cache is None:
+        from backend.response_cache import DEFAULT_RESPONSE_CACHE_PATH, ResponseCache
+
+        # Its own store (and its own RESPONSE_CACHE_* limits) so cached replies never evict live sessions
+        _response_cache = ResponseCache(create_session_store("RESPONSE_CACHE", DEFAULT_RESPONSE_CACHE_PATH))
+    return _response_cache
+
+
+async def warm_up(include_rules: bool = False) -> dict:
+    """Initializes every resource up front and reports how long each one took (ms)."""
+    timings = {}
+    async with _init_lock:
+        start = time.perf_counter()
+        get_session_store()
+        get_conversation_store()
+        get_audit_ledger()
+        get_response_cache()
+        get_hr_directory()
+        timings["session_store"] = round((time.perf_counter() - start) * 1000, 1)
+
+        start = time.perf_counter()
+        await get_backoffice_index().refresh(get_session_store())
+        timings["backoffice_index"] = round((time.perf_counter() - start) * 1000, 1)
+
+        start = time.perf_counter()
+        get_llm_gateway()
+        timings["llm_client"] = round((time.perf_counter() - start) * 1000, 1)
+
+        start = time.perf_counter()
+        await get_pdf_service().warm()
+        timings["pdf_template"] = round((time.perf_counter() - start) * 1000, 1)
+
+        if include_rules:
+            from backend import db
+
+            start = time.perf_counter()
+            timings["rule_chunks"] = await asyncio.to_thread(db.warm_up)
+            timings["rules"] = round((time.perf_counter() - start) * 1000, 1)
+    return timings
+
+
+def get_hr_directory():
+    global _hr_directory
+    if _hr_directory is None:
+        # Demo profile, roster file or indexed SQLite behind a read-through cache (HR_PROVIDER)
+        from backend.hr_directory import create_hr_provider
+
+        _hr_directory = create_hr_provider()
+    return _hr_directory
+
+
+def get_backoffice_index():
+    global _backoffice_index
+    if _backoffice_index is None:
+        # In-process secondary indexes over the session store (see backend/backoffice_index.py)
+        from backend.backoffice_index import BackOfficeIndex
+
+        _backoffice_index = BackOfficeIndex()
+    return _backoffice_index
+
+
+def get_sla_scheduler():
+    global _sla_scheduler
+    if _sla_scheduler is None:
+        # Section 2 / reverification deadlines over the session store (see backend/sla_scheduler.py)
+        from backend.sla_scheduler import SLAScheduler
+
+        _sla_scheduler = SLAScheduler(get_session_store())
+    return _sla_scheduler
+
+
+def resource_status() -> dict:
+    """Which lazy resources are live right now (never triggers initialization)."""
+    from backend import db
+
+    return {
+        "llm_client": _llm_client is not None,
+        "llm_lanes": _llm_gateway.status() if _llm_gateway is not None else {},
+        "session_store": _session_store is not None,
+        "audit_ledger": _audit_ledger is not None,
+        "response_cache": _response_cache is not None,
+        "hr_directory": len(_hr_directory) if _hr_directory is not None else None,
+        "backoffice_index": len(_backoffice_index) if _backoffice_index is not None else None,
+        "sla_scheduler": _sla_scheduler is not None and _sla_scheduler.status()["running"],
+        "rules_collection": db.is_initialized(),
+    }
+
+
+async def shutdown() -> None:
+    global _llm_client, _llm_gateway, _session_store, _conversations, _pdf_service, _audit_ledger, _response_cache, _hr_directory
+    global _backoffice_index, _sla_scheduler
+    if _sla_scheduler is not None:
+        # Before the session store closes under its tick
+        await _sla_scheduler.stop()
+        _sla_scheduler = None
+    if _pdf_service is not None:
+        _pdf_service.shutdown()
+        _pdf_service = None
+    if _audit_ledger is not None:
+        # Flushes any group-commit batch still waiting
+        await _audit_ledger.close()
+        _audit_ledger = None
+    if _response_cache is not None:
+        await _response_cache.close()
+        _response_cache = None
+    if _hr_directory is not None:
+        await _hr_directory.close()
+        _hr_directory = None
+    if _llm_client is not None:
+        await _llm_client.close()
+    if _session_store is not None:
+        await _session_store.close()
+    _llm_client, _llm_gateway, _session_store, _conversations = None, None, None, None
+    _backoffice_index = None
+
+
+@asynccontextmanager
+async def lifespan(app):
+    if WARMUP_ON_STARTUP:
+        from backend.retrieval import RAG_ENABLED
+
+        await warm_up(include_rules=RAG_ENABLED)
+    else:
+        # Always parsed up front: the first PDF download must not pay for it
+        try:
+            await get_pdf_service().warm()
+        except Exception as e:
+            print(f"PDF template warm-up failed, will retry on first stamp: {e}")
+    from backend.sla_scheduler import SLA_SCHEDULER_ENABLED
+
+    if SLA_SCHEDULER_ENABLED:
+        get_sla_scheduler().start()
+    yield
+    await shutdown()
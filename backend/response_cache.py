@@ -0,0 +1,71 @@
+# backend/response_cache.py
+import hashlib
+import json
+import os
+from typing import List, Optional
+
+from backend.metrics import counter
+from backend.models import I9State, StateDeltaPayload
+from backend.prompt_builder import STATIC_SYSTEM_PREFIX
+from backend.retrieval import normalize_query
+from backend.session_store import BASE_DIR, SessionStore
+
+RESPONSE_NAMESPACE = "response"
+DEFAULT_RESPONSE_CACHE_PATH = os.path.join(BASE_DIR, "..", "data", "response_cache.db")
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+# "init" caches only the INIT_CONVERSATION greeting; "all" caches every turn whose inputs repeat
+RESPONSE_CACHE_SCOPE = os.getenv("RESPONSE_CACHE_SCOPE", "all").lower()
+
+RESPONSE_CACHE_LOOKUPS = counter("response_cache_lookups_total", "LLM response cache lookups by outcome")
+
+# Any edit to the static prompt (directives, rules, output contract) invalidates every entry
+_PROMPT_VERSION = hashlib.sha256(STATIC_SYSTEM_PREFIX.encode("utf-8")).hexdigest()[:16]
+
+
+def response_fingerprint(state: I9State, history_window: List[dict], user_message: str, model: str) -> str:
+    """
+    Canonical digest of everything the prompt is built from: the static prefix version,
+    the model, the HR records, the LLM projection of the state (gaps included), the
+    replayed history and the normalized user message. Same digest, same prompt.
+    """
+    canonical = {
+        "prompt": _PROMPT_VERSION,
+        "model": model,
+        "employer": state.employer.model_dump(mode="json"),
+        "employee": state.employee.model_dump(mode="json"),
+        "state": state.to_llm_context(),
+        "history": history_window,
+        "message": user_message if user_message == "INIT_CONVERSATION" else normalize_query(user_message),
+    }
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def is_cacheable_turn(user_message: str) -> bool:
+    return RESPONSE_CACHE_ENABLED and (RESPONSE_CACHE_SCOPE == "all" or user_message == "INIT_CONVERSATION")
+
+
+class ResponseCache:
+    """
+    The Greeting Cache.
+    Validated LLM payloads keyed by response_fingerprint(). Eviction (LRU/TTL/byte cap)
+    and persistence come from the SessionStore backend it is given, configured with
+    RESPONSE_CACHE_* variables (see create_session_store).
+    """
+
+    def __init__(self, store: SessionStore):
+        self.store = store
+
+    async def get(self, fingerprint: str) -> Optional[StateDeltaPayload]:
+        data = await self.store.load(RESPONSE_NAMESPACE, fingerprint)
+        RESPONSE_CACHE_LOOKUPS.inc(outcome="hit" if data is not None else "miss")
+        return StateDeltaPayload.model_validate_json(data) if data is not None else None
+
+    async def put(self, fingerprint: str, payload: StateDeltaPayload) -> None:
+        # Escalations and validation errors depend on context we do not fingerprint; never replay them
+        if payload.intent in ("ESCALATE", "VALIDATION_ERROR"):
+            return
+        await self.store.save(RESPONSE_NAMESPACE, fingerprint, payload.model_dump_json().encode("utf-8"))
+
+    async def close(self) -> None:
+        await self.store.close()
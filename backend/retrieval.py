@@ -0,0 +1,174 @@
+# backend/retrieval.py
+import asyncio
+import math
+import operator
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+from backend.bm25 import reciprocal_rank_fusion
+from backend.conversation import estimate_tokens
+from backend.metrics import counter
+
+# M-274 retrieval is opt-in: it costs an embedding round-trip plus a Chroma query per miss.
+RAG_ENABLED = os.getenv("RAG_ENABLED", "false").lower() == "true"
+RAG_N_RESULTS = int(os.getenv("RAG_N_RESULTS", "3"))
+RAG_TOKEN_BUDGET = int(os.getenv("RAG_TOKEN_BUDGET", "600"))
+# One-word confirmations like "yes" or "no" carry no retrievable question
+RAG_MIN_QUERY_CHARS = int(os.getenv("RAG_MIN_QUERY_CHARS", "4"))
+
+RAG_EXACT_CACHE_SIZE = int(os.getenv("RAG_EXACT_CACHE_SIZE", "2048"))
+# Every embedding-path lookup scans this many cached vectors, so keep it small
+RAG_EMBEDDING_CACHE_SIZE = int(os.getenv("RAG_EMBEDDING_CACHE_SIZE", "128"))
+RAG_EMBEDDING_CACHE_TTL = float(os.getenv("RAG_EMBEDDING_CACHE_TTL", "3600"))
+# Cosine similarity above which two queries are treated as the same question
+RAG_SIMILARITY_THRESHOLD = float(os.getenv("RAG_SIMILARITY_THRESHOLD", "0.95"))
+# Short queries made only of indexed terms ("List C", "I-94", "receipt rule") skip the vector path
+RAG_KEYWORD_MAX_WORDS = int(os.getenv("RAG_KEYWORD_MAX_WORDS", "4"))
+# Candidates pulled from each index before reciprocal-rank fusion
+RAG_FUSION_CANDIDATES = int(os.getenv("RAG_FUSION_CANDIDATES", "10"))
+
+RAG_LOOKUPS = counter("rag_lookups_total", "Rule retrieval lookups by cache outcome")
+
+_PUNCTUATION = re.compile(r"[^\w\s-]")
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase, strip punctuation, collapse whitespace: 'What is List C?' == 'what is list c'."""
+    return " ".join(_PUNCTUATION.sub(" ", text.lower()).split())
+
+
+def _unit(vector: List[float]) -> List[float]:
+    """Scaled to length 1, so cosine similarity against another unit vector is a plain dot product."""
+    norm = math.sqrt(sum(map(operator.mul, vector, vector)))
+    return [x / norm for x in vector] if norm else list(vector)
+
+
+def _dot(a: List[float], b: List[float]) -> float:
+    return sum(map(operator.mul, a, b))
+
+
+class RuleRetriever:
+    """
+    The Two-Level Rule Cache in front of hybrid search.
+    L1: exact-match LRU on the normalized query text (no network at all).
+    Keyword path: exact-term queries are answered from BM25 alone.
+    L2: embedding-keyed cache with TTL; a paraphrase whose embedding is close enough
+        to a cached one reuses its results and skips the vector query.
+    Otherwise BM25 and vector results are merged with reciprocal-rank fusion.
+    """
+
+    def __init__(
+        self,
+        n_results: int = RAG_N_RESULTS,
+        exact_cache_size: int = RAG_EXACT_CACHE_SIZE,
+        embedding_cache_size: int = RAG_EMBEDDING_CACHE_SIZE,
+        embedding_cache_ttl: float = RAG_EMBEDDING_CACHE_TTL,
+        similarity_threshold: float = RAG_SIMILARITY_THRESHOLD,
+    ):
+        self.n_results = n_results
+        self.exact_cache_size = exact_cache_size
+        self.embedding_cache_size = embedding_cache_size
+        self.embedding_cache_ttl = embedding_cache_ttl
+        self.similarity_threshold = similarity_threshold
+        self._exact: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._by_embedding: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (unit embedding, docs, expires_at)
+        self._lock = threading.Lock()
+
+    async def retrieve(self, query: str) -> List[str]:
+        key = normalize_query(query)
+
+        with self._lock:
+            if key in self._exact:
+                self._exact.move_to_end(key)
+                RAG_LOOKUPS.inc(outcome="exact_hit")
+                return self._exact[key]
+
+        # Imported lazily so the chat path never touches Chroma unless RAG is on
+        from backend import db
+
+        keyword_index = await asyncio.to_thread(db.get_bm25_index)
+        if self._is_exact_term_query(key, keyword_index):
+            docs = [keyword_index.document(chunk_id) for chunk_id, _ in keyword_index.search(key, self.n_results)]
+            RAG_LOOKUPS.inc(outcome="keyword")
+            self._store_exact(key, docs)
+            return docs
+
+        embedding = await asyncio.to_thread(db.embed_query, key)
+        # The similarity scan is CPU-bound; keep it off the event loop serving the SSE streams
+        docs = await asyncio.to_thread(self._lookup_embedding, embedding)
+        if docs is not None:
+            RAG_LOOKUPS.inc(outcome="embedding_hit")
+        else:
+            docs = await asyncio.to_thread(self._hybrid_search, db, key, embedding, keyword_index)
+            RAG_LOOKUPS.inc(outcome="miss")
+            self._store_embedding(key, embedding, docs)
+
+        self._store_exact(key, docs)
+        return docs
+
+    def _is_exact_term_query(self, key: str, keyword_index) -> bool:
+        return 0 < len(key.split()) <= RAG_KEYWORD_MAX_WORDS and keyword_index.has_phrase(key)
+
+    def _hybrid_search(self, db, key: str, embedding: List[float], keyword_index) -> List[str]:
+        vector_hits = db.query_rule_ids_by_embedding(embedding, RAG_FUSION_CANDIDATES)
+        keyword_hits = keyword_index.search(key, RAG_FUSION_CANDIDATES)
+
+        documents = dict(vector_hits)
+        fused = reciprocal_rank_fusion([
+            [chunk_id for chunk_id, _ in vector_hits],
+            [chunk_id for chunk_id, _ in keyword_hits],
+        ])[:self.n_results]
+        return [documents[chunk_id] if chunk_id in documents else keyword_index.document(chunk_id) for chunk_id in fused]
+
+    def _lookup_embedding(self, embedding: List[float]) -> Optional[List[str]]:
+        now = time.monotonic()
+        with self._lock:
+            for key in [key for key, (_, _, expires_at) in self._by_embedding.items() if expires_at < now]:
+                del self._by_embedding[key]
+            # Scan a snapshot so the lock is not held while scoring
+            cached = list(self._by_embedding.values())
+        query = _unit(embedding)
+        best_docs, best_score = None, self.similarity_threshold
+        for cached_embedding, docs, _ in cached:
+            score = _dot(query, cached_embedding)
+            if score >= best_score:
+                best_docs, best_score = docs, score
+        return best_docs
+
+    def _store_embedding(self, key: str, embedding: List[float], docs: List[str]) -> None:
+        entry = (_unit(embedding), docs, time.monotonic() + self.embedding_cache_ttl)
+        with self._lock:
+            self._by_embedding[key] = entry
+            self._by_embedding.move_to_end(key)
+            while len(self._by_embedding) > self.embedding_cache_size:
+                self._by_embedding.popitem(last=False)
+
+    def _store_exact(self, key: str, docs: List[str]) -> None:
+        with self._lock:
+            self._exact[key] = docs
+            self._exact.move_to_end(key)
+            while len(self._exact) > self.exact_cache_size:
+                self._exact.popitem(last=False)
+
+
+def should_retrieve(user_message: str) -> bool:
+    return RAG_ENABLED and user_message != "INIT_CONVERSATION" and len(user_message.strip()) >= RAG_MIN_QUERY_CHARS
+
+
+def format_rules_for_prompt(docs: List[str], token_budget: int = RAG_TOKEN_BUDGET) -> str:
+    """Joins retrieved passages in rank order, stopping (or truncating) at the token budget."""
+    selected, used = [], 0
+    for doc in docs:
+        cost = estimate_tokens(doc)
+        if used + cost > token_budget:
+            remaining_chars = (token_budget - used - 4) * 4
+            if remaining_chars > 200:
+                selected.append(doc[:remaining_chars].rsplit(" ", 1)[0] + " …")
+            break
+        selected.append(doc)
+        used += cost
+    return "\n---\n".join(selected)
@@ -0,0 +1,210 @@
+# backend/rules_engine.py
+"""
+A small declarative rules DSL and its compiler.
+
+Rules only describe *what* must hold (conditions on state fields) and *what follows*
+(a compliance gap, or the value of a derived field). compile_rules() turns a table of
+them into a RuleEngine that knows which rules read which fields, so applying a delta
+re-evaluates only the rules downstream of the fields that actually changed.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+
+# ==========================================
+# 1. THE DSL
+# ==========================================
+class _Presence:
+    def __init__(self, present: bool):
+        self.present = present
+
+    def __repr__(self) -> str:
+        return "PRESENT" if self.present else "MISSING"
+
+# Truthiness tests, matching the original hand-written checks (`if not state.citizenship_status`)
+PRESENT = _Presence(True)
+MISSING = _Presence(False)
+
+@dataclass(frozen=True)
+class OneOf:
+    values: frozenset
+
+def one_of(*values) -> OneOf:
+    return OneOf(frozenset(values))
+
+@dataclass(frozen=True)
+class Gap:
+    """Emits `code` into state.compliance_gaps while every condition in `when` holds."""
+    code: str
+    when: Dict[str, Any]
+
+@dataclass(frozen=True)
+class Derive:
+    """Sets `field` to the value of the first case whose conditions all hold, else `default`."""
+    field: str
+    default: Any
+    cases: Tuple[Tuple[Dict[str, Any], Any], ...] = ()
+
+Rule = Union[Gap, Derive]
+
+GAPS_FIELD = "compliance_gaps"
+
+
+# ==========================================
+# 2. THE COMPILER
+# ==========================================
+def _condition_source(path: str, expected, constants: Dict[str, Any]) -> str:
+    if not all(part.isidentifier() for part in path.split(".")):
+        raise ValueError(f"Invalid field path in rule: {path!r}")
+    value = f"s.{path}"
+    if isinstance(expected, _Presence):
+        return f"bool({value})" if expected.present else f"not {value}"
+    name = f"_c{len(constants)}"
+    if isinstance(expected, OneOf):
+        constants[name] = expected.values
+        return f"{value} in {name}"
+    constants[name] = expected
+    return f"{value} == {name}"
+
+def _compile_conditions(when: Dict[str, Any]) -> Callable[[Any], bool]:
+    """Generates one flat boolean expression per rule, so matching costs what a hand-written `if` does."""
+    constants: Dict[str, Any] = {}
+    expression = " and ".join(_condition_source(path, expected, constants) for path, expected in when.items()) or "True"
+    return eval(f"lambda s: {expression}", {"__builtins__": {"bool": bool}, **constants})
+
+@dataclass
+class _CompiledRule:
+    rule: Rule
+    output: str
+    inputs: frozenset
+    evaluate: Callable[[Any], Any]  # Gap -> bool, Derive -> value
+    order: int = 0
+
+def _compile_rule(rule: Rule) -> _CompiledRule:
+    if isinstance(rule, Gap):
+        return _CompiledRule(rule, GAPS_FIELD, frozenset(rule.when), _compile_conditions(rule.when))
+
+    cases = [(_compile_conditions(when), value) for when, value in rule.cases]
+    default = rule.default
+
+    def evaluate(state):
+        for matches, value in cases:
+            if matches(state):
+                return value
+        return default
+    inputs = frozenset(path for when, _ in rule.cases for path in when)
+    return _CompiledRule(rule, rule.field, inputs, evaluate)
+
+
+@dataclass
+class RuleEngine:
+    rules: List[_CompiledRule]
+    gap_codes: List[str]
+    dependents: Dict[str, List[_CompiledRule]] = field(default_factory=dict)
+    # All gap predicates fused into a single function, see compile_rules()
+    gaps_for: Callable[[Any], List[str]] = None
+    _affected_cache: Dict[frozenset, List[_CompiledRule]] = field(default_factory=dict)
+
+    @property
+    def inputs(self) -> Set[str]:
+        """Every state field (dotted for nested models) some rule reads."""
+        return set(self.dependents)
+
+    @property
+    def outputs(self) -> Set[str]:
+        return {compiled.output for compiled in self.rules}
+
+    def affected(self, changed: Iterable[str]) -> List[_CompiledRule]:
+        """Rules downstream of the changed fields, including through derived outputs, in evaluation order."""
+        key = frozenset(changed)
+        cached = self._affected_cache.get(key)
+        if cached is not None:
+            return cached
+        frontier, seen = list(key), {}
+        while frontier:
+            for compiled in self.dependents.get(frontier.pop(), ()):
+                if id(compiled) not in seen:
+                    seen[id(compiled)] = compiled
+                    frontier.append(compiled.output)
+        ordered = sorted(seen.values(), key=lambda compiled: compiled.order)
+        # Deltas touch a handful of field combinations, so this stays tiny
+        self._affected_cache[key] = ordered
+        return ordered
+
+    def apply(self, state, changed: Optional[Iterable[str]] = None) -> Set[str]:
+        """
+        Re-evaluates the rules affected by `changed` (all rules when None) and writes
+        their outputs onto the state. Returns the names of outputs whose value changed.
+        """
+        rules = self.rules if changed is None else self.affected(changed)
+        updated = set()
+        gaps = None
+        for compiled in rules:
+            if compiled.output == GAPS_FIELD:
+                if gaps is None:
+                    gaps = set(state.compliance_gaps)
+                active = compiled.evaluate(state)
+                code = compiled.rule.code
+                if active != (code in gaps):
+                    (gaps.add if active else gaps.discard)(code)
+                    # Written immediately so later rules that read compliance_gaps see it
+                    state.compliance_gaps = [c for c in self.gap_codes if c in gaps]
+                    updated.add(GAPS_FIELD)
+                continue
+            value = compiled.evaluate(state)
+            if getattr(state, compiled.output) != value:
+                # Fresh copies: table defaults like [] must never be shared between states
+                setattr(state, compiled.output, list(value) if isinstance(value, list) else value)
+                updated.add(compiled.output)
+        return updated
+
+
+def compile_rules(table: Iterable[Rule]) -> RuleEngine:
+    """Compiles once at import; raises ValueError on duplicate outputs or dependency cycles."""
+    compiled = [_compile_rule(rule) for rule in table]
+
+    derived = [c.output for c in compiled if c.output != GAPS_FIELD]
+    if len(derived) != len(set(derived)):
+        raise ValueError("Each derived field may be set by exactly one Derive rule")
+
+    # Topological order: a rule runs after every rule producing one of its inputs (Kahn's algorithm)
+    producers: Dict[str, List[_CompiledRule]] = {}
+    for c in compiled:
+        producers.setdefault(c.output, []).append(c)
+    remaining = {id(c): {id(p) for path in c.inputs for p in producers.get(path, ()) if p is not c} for c in compiled}
+    by_id = {id(c): c for c in compiled}
+    ordered = []
+    while remaining:
+        ready = [rule_id for rule_id, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"Dependency cycle among rules: {[by_id[i].output for i in remaining]}")
+        # Keep table order among rules that are ready together (it defines gap order too)
+        for rule_id in sorted(ready, key=lambda i: compiled.index(by_id[i])):
+            del remaining[rule_id]
+            ordered.append(by_id[rule_id])
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    for order, c in enumerate(ordered):
+        c.order = order
+
+    dependents: Dict[str, List[_CompiledRule]] = {}
+    for c in ordered:
+        for path in c.inputs:
+            dependents.setdefault(path, []).append(c)
+            # A change to a nested model (e.g. `employer`) reaches rules on `employer.uses_everify`
+            if "." in path:
+                dependents.setdefault(path.split(".", 1)[0], []).append(c)
+
+    # Full, side-effect-free gap evaluation in table order
+    gap_rules = [c for c in compiled if c.output == GAPS_FIELD]
+    predicates = {f"_g{i}": c.evaluate for i, c in enumerate(gap_rules)}
+    body = "".join(f"    if _g{i}(s): out.append({c.rule.code!r})\n" for i, c in enumerate(gap_rules))
+    namespace: Dict[str, Any] = {}
+    exec(f"def gaps_for(s):\n    out = []\n{body}    return out\n", predicates, namespace)
+
+    return RuleEngine(
+        rules=ordered,
+        gap_codes=[c.rule.code for c in gap_rules],
+        dependents=dependents,
+        gaps_for=namespace["gaps_for"],
+    )
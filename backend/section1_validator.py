@@ -0,0 +1,327 @@
+# backend/section1_validator.py
+"""
+The Section 1 Gatekeeper.
+Deterministic validation of submitted Section 1 fields, compiled from the same schema
+generate_strict_schema() sends to the UI, so the form and its validator cannot drift.
+It enforces the VALIDATION_PHASE_RULES (prompts.py) without an LLM:
+
+  - every required field is present; fields the schema did not offer are rejected
+    (an expiration date where none is allowed, an A-Number a citizen was never asked for)
+  - formats: SSN, A-Number, USCIS number, I-94, foreign passport, names, dates
+  - exactly one of A-Number / I-94 / foreign passport when the schema offers the choice
+  - dates: birth date in the past, work authorization expiration not yet passed
+
+Every error is reported at once. Each record is first matched against one combined
+pattern covering all of its format checks, so a valid record costs a single regex
+match; only failures are diagnosed field by field. Rosters are grouped by schema shape
+and validated column by column.
+
+    python -m backend.section1_validator roster.jsonl
+"""
+import argparse
+import re
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from backend.hr_directory import parse_bool
+from backend.models import EmployerContext, I9State
+from backend.state_machine import CITIZENSHIP_STATUSES, derive_flags
+
+# Cap on invalid records echoed back by validate_roster
+REPORT_ERROR_LIMIT = 200
+# Field values are joined with this for the combined match; no valid value contains it
+_SEPARATOR = "\x1f"
+
+# ==========================================
+# 1. PRECOMPILED FORMATS
+# ==========================================
+SSN = r"(?!000|666|9\d\d)\d{3}-?(?!00)\d{2}-?(?!0000)\d{4}"
+A_NUMBER = r"A?-?\d{7,9}"
+USCIS_NUMBER = r"\d{3}-?\d{3}-?\d{3}"
+I94_NUMBER = r"\d{9}[A-Z]\d|\d{11}"
+PASSPORT_NUMBER = r"[A-Z0-9]{6,12}"
+PERSON_NAME = r"[^\W\d_](?:[^\W\d_]|[ .'\-]){0,59}"
+DATE = r"\d{4}-\d{2}-\d{2}|\d{2}/\d{2}/\d{4}"
+
+# name -> (pattern, uppercase before matching, what the employee is told)
+FIELD_FORMATS: Dict[str, Tuple[str, bool, str]] = {
+    "first_name": (PERSON_NAME, False, "letters, spaces, apostrophes, periods and hyphens only"),
+    "last_name": (PERSON_NAME, False, "letters, spaces, apostrophes, periods and hyphens only"),
+    "ssn": (SSN, False, "a valid Social Security number (123-45-6789)"),
+    "alien_number": (A_NUMBER, True, "7 to 9 digits, optionally prefixed with A"),
+    "opt_alien_number": (A_NUMBER, True, "7 to 9 digits, optionally prefixed with A"),
+    "uscis_number": (USCIS_NUMBER, False, "9 digits"),
+    "opt_i94_number": (I94_NUMBER, True, "11 characters: 11 digits, or 9 digits, a letter and a digit"),
+    "opt_passport_number": (PASSPORT_NUMBER, True, "6 to 12 letters and digits"),
+}
+DATE_FORMAT_HINT = "a date as YYYY-MM-DD or MM/DD/YYYY"
+# Date fields with a direction: birth dates lie in the past, authorizations in the future
+DATE_RULES = {"dob": "past", "work_auth_expiration": "future"}
+MAX_AGE_YEARS = 130
+ONE_OF_PREFIX = "opt_"
+
+
+def _error(field: str, code: str, message: str) -> dict:
+    return {"field": field, "code": code, "message": message}
+
+
+def parse_date(value: str) -> Optional[date]:
+    try:
+        if "/" in value:
+            return datetime.strptime(value, "%m/%d/%Y").date()
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+# ==========================================
+# 2. THE COMPILED FORM
+# ==========================================
+@dataclass(frozen=True)
+class FieldSpec:
+    name: str
+    label: str
+    required: bool
+    kind: str
+    pattern: Optional[re.Pattern]
+    upper: bool
+    hint: str
+
+    def clean(self, raw: Any) -> str:
+        value = "" if raw is None else str(raw).strip()
+        return value.upper() if self.upper else value
+
+
+class CompiledSection1:
+    """One schema shape, compiled once and reused for every submission with that shape."""
+
+    def __init__(self, schema_fields: List[dict]):
+        specs = []
+        for field in schema_fields:
+            kind = field.get("type", "text")
+            if kind == "date":
+                source, upper, hint = DATE, False, DATE_FORMAT_HINT
+            else:
+                source, upper, hint = FIELD_FORMATS.get(field["name"], (None, False, ""))
+            specs.append(FieldSpec(
+                name=field["name"],
+                label=field.get("label", field["name"]),
+                required=bool(field.get("required")),
+                kind=kind,
+                pattern=re.compile(source) if source else None,
+                upper=upper,
+                hint=hint,
+            ))
+        self.fields: Tuple[FieldSpec, ...] = tuple(specs)
+        self.allowed = frozenset(spec.name for spec in specs)
+        self.one_of = tuple(spec.name for spec in specs if spec.name.startswith(ONE_OF_PREFIX))
+        self.date_fields = tuple(spec for spec in specs if spec.kind == "date")
+        # Every format check of the record in one pattern: (?:ssn)\x1f(?:dob)?\x1f...
+        parts = []
+        for spec in specs:
+            body = spec.pattern.pattern if spec.pattern else f"[^{_SEPARATOR}]+"
+            parts.append(f"(?:{body})" if spec.required else f"(?:{body})?")
+        self.combined = re.compile(_SEPARATOR.join(parts))
+
+    # --- single record ---
+    def validate(self, values: Dict[str, Any], today: Optional[date] = None) -> List[dict]:
+        """Every problem with the submission (empty when valid)."""
+        cleaned = [spec.clean(values.get(spec.name)) for spec in self.fields]
+        unexpected = [name for name, raw in values.items() if name not in self.allowed and raw not in (None, "")]
+        if not unexpected and self._passes(cleaned, today or date.today()):
+            return []
+        return self._diagnose(cleaned, unexpected, today or date.today())
+
+    def _passes(self, cleaned: List[str], today: date) -> bool:
+        if any(_SEPARATOR in value for value in cleaned):
+            return False
+        if self.combined.fullmatch(_SEPARATOR.join(cleaned)) is None:
+            return False
+        return not self._date_errors(cleaned, today) and not self._one_of_errors(cleaned)
+
+    def _date_errors(self, cleaned: List[str], today: date) -> List[dict]:
+        errors = []
+        for index, spec in enumerate(self.fields):
+            value = cleaned[index]
+            if spec.kind != "date" or not value:
+                continue
+            parsed = parse_date(value)
+            if parsed is None:
+                errors.append(_error(spec.name, "format", f"{spec.label} is not a real calendar date"))
+            elif DATE_RULES.get(spec.name) == "past" and not (date(today.year - MAX_AGE_YEARS, 1, 1) < parsed < today):
+                errors.append(_error(spec.name, "date_range", f"{spec.label} must be in the past"))
+            elif DATE_RULES.get(spec.name) == "future" and parsed < today:
+                errors.append(_error(spec.name, "date_range", f"{spec.label} has already passed"))
+        return errors
+
+    def _one_of_errors(self, cleaned: List[str]) -> List[dict]:
+        if not self.one_of:
+            return []
+        given = [spec.name for spec, value in zip(self.fields, cleaned) if spec.name in self.one_of and value]
+        if len(given) == 1:
+            return []
+        labels = ", ".join(spec.label for spec in self.fields if spec.name in self.one_of)
+        return [_error(",".join(self.one_of), "one_of", f"Provide exactly one of: {labels}")]
+
+    def _diagnose(self, cleaned: List[str], unexpected: List[str], today: date) -> List[dict]:
+        errors = [_error(name, "unexpected", f"{name} is not part of this form") for name in unexpected]
+        for spec, value in zip(self.fields, cleaned):
+            if not value:
+                if spec.required:
+                    errors.append(_error(spec.name, "required", f"{spec.label} is required"))
+            elif _SEPARATOR in value or (spec.pattern is not None and spec.pattern.fullmatch(value) is None):
+                errors.append(_error(spec.name, "format", f"{spec.label} must be {spec.hint}"))
+        format_failures = {error["field"] for error in errors}
+        errors.extend(e for e in self._date_errors(cleaned, today) if e["field"] not in format_failures)
+        errors.extend(self._one_of_errors(cleaned))
+        return errors
+
+    def normalize(self, values: Dict[str, Any]) -> Dict[str, str]:
+        """Canonical values of a valid submission (digits-only identifiers, ISO dates)."""
+        clean = {}
+        for spec in self.fields:
+            value = spec.clean(values.get(spec.name))
+            if not value:
+                continue
+            if spec.kind == "date":
+                value = parse_date(value).isoformat()
+            elif spec.name == "ssn":
+                digits = value.replace("-", "")
+                value = f"{digits[:3]}-{digits[3:5]}-{digits[5:]}"
+            elif spec.name in ("alien_number", "opt_alien_number", "uscis_number"):
+                value = re.sub(r"[^0-9]", "", value)
+            clean[spec.name] = value
+        return clean
+
+    # --- many records ---
+    def validate_columns(self, columns: Dict[str, List[Any]], count: int, today: Optional[date] = None) -> List[List[dict]]:
+        """
+        Validates `count` records given as one column per field. Columns are cleaned and
+        joined in bulk; only records the combined pattern rejects are diagnosed.
+        """
+        today = today or date.today()
+        cleaned_columns = [
+            [spec.clean(raw) for raw in columns.get(spec.name, [None] * count)] for spec in self.fields
+        ]
+        rows = list(zip(*cleaned_columns)) if cleaned_columns else [()] * count
+        unexpected_columns = [name for name in columns if name not in self.allowed]
+        match = self.combined.fullmatch
+        results: List[List[dict]] = []
+        for index, row in enumerate(rows):
+            unexpected = [name for name in unexpected_columns if columns[name][index] not in (None, "")]
+            row = list(row)
+            if not unexpected and _SEPARATOR not in "".join(row) and match(_SEPARATOR.join(row)) is not None:
+                # Formats all pass; only the semantic checks are left
+                errors = self._date_errors(row, today) if self.date_fields else []
+                errors.extend(self._one_of_errors(row))
+                results.append(errors)
+            else:
+                results.append(self._diagnose(row, unexpected, today))
+        return results
+
+
+_COMPILED: Dict[tuple, CompiledSection1] = {}
+
+
+def compile_schema(schema: dict) -> CompiledSection1:
+    """Cached per schema shape (field names, types, required flags); labels and values do not matter."""
+    key = tuple((f["name"], f.get("type", "text"), bool(f.get("required"))) for f in schema["fields"])
+    compiled = _COMPILED.get(key)
+    if compiled is None:
+        compiled = _COMPILED[key] = CompiledSection1(schema["fields"])
+    return compiled
+
+
+# ==========================================
+# 3. ROSTER BATCHES (no LLM anywhere)
+# ==========================================
+# Roster keys that describe the employee's situation rather than Section 1 answers
+CONTEXT_KEYS = frozenset({"employee_id", "employer_id", "company_name", "citizenship_status", "uses_everify",
+                          "hire_date", "preloaded_status", "section1_due_date"})
+
+
+def _roster_answers(record: dict, validator: CompiledSection1) -> dict:
+    """The record's Section 1 answers under schema names; rosters say i94_number for opt_i94_number."""
+    answers = {}
+    for key, value in record.items():
+        if key in CONTEXT_KEYS:
+            continue
+        if key not in validator.allowed and ONE_OF_PREFIX + key in validator.allowed:
+            key = ONE_OF_PREFIX + key
+        answers[key] = value
+    return answers
+
+
+def validator_for(citizenship_status: str, uses_everify: bool) -> CompiledSection1:
+    from backend.main import generate_strict_schema
+
+    state = I9State(employer=EmployerContext(uses_everify=uses_everify), citizenship_status=citizenship_status)
+    return compile_schema(generate_strict_schema(derive_flags(state)))
+
+
+def validate_roster(records: Iterable[tuple], today: Optional[date] = None) -> dict:
+    """
+    Validates (index, record) pairs as produced by bulk_stamp.iter_roster. Records are
+    grouped by schema shape (citizenship status, E-Verify) and each group is checked column-wise.
+    """
+    started = time.perf_counter()
+    groups: Dict[tuple, List[Tuple[int, dict]]] = {}
+    failures: List[dict] = []
+    total = 0
+    for index, record in records:
+        total += 1
+        if isinstance(record, Exception) or not isinstance(record, dict):
+            failures.append({"index": index, "errors": [_error("record", "format", str(record) if isinstance(record, Exception) else "Record must be a JSON object")]})
+            continue
+        status = record.get("citizenship_status")
+        if status not in CITIZENSHIP_STATUSES:
+            failures.append({"index": index, "employee_id": record.get("employee_id"),
+                             "errors": [_error("citizenship_status", "required", f"citizenship_status must be one of {', '.join(CITIZENSHIP_STATUSES)}")]})
+            continue
+        try:
+            uses_everify = parse_bool(record.get("uses_everify"), default=True)
+        except ValueError as e:
+            failures.append({"index": index, "employee_id": record.get("employee_id"),
+                             "errors": [_error("uses_everify", "format", f"uses_everify {e}")]})
+            continue
+        groups.setdefault((status, uses_everify), []).append((index, record))
+
+    for (status, uses_everify), members in groups.items():
+        validator = validator_for(status, uses_everify)
+        answers = [_roster_answers(record, validator) for _, record in members]
+        names = set(validator.allowed)
+        for answer in answers:
+            names.update(answer)
+        columns = {name: [answer.get(name) for answer in answers] for name in names}
+        for (index, record), errors in zip(members, validator.validate_columns(columns, len(members), today)):
+            if errors:
+                failures.append({"index": index, "employee_id": record.get("employee_id"), "errors": errors})
+
+    failures.sort(key=lambda failure: failure["index"])
+    elapsed = time.perf_counter() - started
+    return {
+        "total": total,
+        "valid": total - len(failures),
+        "invalid": len(failures),
+        "failures": failures[:REPORT_ERROR_LIMIT],
+        "seconds": round(elapsed, 3),
+        "records_per_sec": round(total / elapsed) if elapsed else None,
+    }
+
+
+def main():
+    from backend.bulk_stamp import iter_roster
+
+    parser = argparse.ArgumentParser(description="Validate Section 1 answers of a roster (.json array or .jsonl)")
+    parser.add_argument("roster")
+    args = parser.parse_args()
+    report = validate_roster(iter_roster(args.roster))
+    print(f"{report['valid']}/{report['total']} valid in {report['seconds']}s ({report['records_per_sec']} records/s)")
+    for failure in report["failures"][:20]:
+        print(f"  #{failure['index']} {failure.get('employee_id') or ''}: " + "; ".join(e["message"] for e in failure["errors"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,479 @@
+# backend/session_store.py
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+
+from backend.models import I9State
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SQLITE_PATH = os.path.join(BASE_DIR, "..", "data", "sessions.db")
+
+STATE_NAMESPACE = "state"
+
+# Cross-worker session leases (SQLite backend). The TTL must outlast the slowest turn
+# (LLM deadline, plus one escalation); a crashed worker's lease simply expires.
+SESSION_LOCK_TTL_SECONDS = float(os.getenv("SESSION_LOCK_TTL_SECONDS", "120"))
+# How long a second request for the same session waits for the first before giving up
+SESSION_LOCK_WAIT_SECONDS = float(os.getenv("SESSION_LOCK_WAIT_SECONDS", "60"))
+_LEASE_POLL_SECONDS = 0.05
+
+
+class SessionBusy(Exception):
+    """Another turn for this session held the lock for longer than SESSION_LOCK_WAIT_SECONDS."""
+
+
+class SessionConflict(Exception):
+    """Compare-and-swap failed: the session changed since this turn loaded it."""
+
+
+# ==========================================
+# 1. SERIALIZATION (compact, not indented)
+# ==========================================
+def serialize_state(state: I9State) -> bytes:
+    """Compact wire format: no indentation, defaults omitted (they are restored on load)."""
+    return state.model_dump_json(exclude_defaults=True).encode("utf-8")
+
+def deserialize_state(data: bytes) -> I9State:
+    return I9State.model_validate_json(data)
+
+
+# ==========================================
+# 2. PER-KEY LOCKS (one event loop)
+# ==========================================
+class KeyedLocks:
+    """
+    One asyncio.Lock per key, created on demand and dropped when nobody holds or waits
+    on it, so idle sessions cost nothing and different keys never contend.
+    """
+
+    def __init__(self):
+        self._locks: Dict[str, list] = {}
+
+    @asynccontextmanager
+    async def hold(self, key: str, timeout: float = SESSION_LOCK_WAIT_SECONDS):
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            try:
+                await asyncio.wait_for(entry[0].acquire(), timeout=timeout)
+            except asyncio.TimeoutError:
+                raise SessionBusy(f"Session {key} is busy with another turn")
+            try:
+                yield
+            finally:
+                entry[0].release()
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+
+# ==========================================
+# 3. THE STORE INTERFACE
+# ==========================================
+class SessionStore(ABC):
+    """
+    Pluggable persistence for in-flight I-9 sessions.
+    Backends only move opaque bytes around (namespace, key) -> value; the typed
+    helpers below own the I9State wire format so every backend stores the same thing.
+    Every entry carries a version that each write bumps, for compare-and-swap.
+    """
+
+    # True when other processes write to the same store (readers that mirror it must poll)
+    shared = False
+
+    def __init__(self):
+        self._locks = KeyedLocks()
+
+    @abstractmethod
+    async def load(self, namespace: str, key: str) -> Optional[bytes]: ...
+
+    @abstractmethod
+    async def load_versioned(self, namespace: str, key: str) -> Optional[Tuple[bytes, int]]: ...
+
+    @abstractmethod
+    async def save(self, namespace: str, key: str, value: bytes) -> None: ...
+
+    @abstractmethod
+    async def save_if_version(self, namespace: str, key: str, value: bytes, expected_version: int) -> bool:
+        """Writes only if the entry is still at expected_version (0: absent). Returns False on conflict."""
+
+    async def create_many(self, namespace: str, keys: List[str], value: bytes) -> List[bool]:
+        """Creates each absent key; True where this call created it (claims, dedupe markers)."""
+        return list(await asyncio.gather(*(self.save_if_version(namespace, key, value, 0) for key in keys)))
+
+    @abstractmethod
+    async def remove(self, namespace: str, key: str) -> None: ...
+
+    @abstractmethod
+    async def size(self) -> int:
+        """Number of live entries across all namespaces."""
+
+    @abstractmethod
+    async def scan(self, namespace: str, updated_after: float = 0.0) -> List[Tuple[str, bytes, float]]:
+        """Live (key, value, updated_at) entries of one namespace, for rebuilding derived indexes."""
+
+    async def close(self) -> None:
+        pass
+
+    def lock(self, session_id: str):
+        """Serializes turns of one session; in-process here, across workers where the backend can."""
+        return self._locks.hold(session_id)
+
+    async def get(self, session_id: str) -> Optional[I9State]:
+        data = await self.load(STATE_NAMESPACE, session_id)
+        return deserialize_state(data) if data is not None else None
+
+    async def get_versioned(self, session_id: str) -> Tuple[Optional[I9State], int]:
+        entry = await self.load_versioned(STATE_NAMESPACE, session_id)
+        if entry is None:
+            return None, 0
+        return deserialize_state(entry[0]), entry[1]
+
+    async def put(self, session_id: str, state: I9State) -> None:
+        await self.save(STATE_NAMESPACE, session_id, serialize_state(state))
+
+    async def put_if_absent(self, session_id: str, state: I9State) -> bool:
+        """Creates the session unless one already exists (never clobbers a session in progress)."""
+        return await self.save_if_version(STATE_NAMESPACE, session_id, serialize_state(state), 0)
+
+    async def put_if_version(self, session_id: str, state: I9State, expected_version: int) -> None:
+        """Raises SessionConflict instead of silently overwriting a concurrent turn's state."""
+        if not await self.save_if_version(STATE_NAMESPACE, session_id, serialize_state(state), expected_version):
+            raise SessionConflict(f"Session {session_id} changed while this turn was running; please retry")
+
+    async def delete(self, session_id: str) -> None:
+        await self.remove(STATE_NAMESPACE, session_id)
+
+    async def scan_states(self, updated_after: float = 0.0) -> List[Tuple[str, bytes, float]]:
+        """Serialized sessions (see deserialize_state); updated_after only narrows shared stores."""
+        return await self.scan(STATE_NAMESPACE, updated_after)
+
+
+# ==========================================
+# 4. IN-MEMORY BACKEND (LRU + TTL + byte cap)
+# ==========================================
+class InMemorySessionStore(SessionStore):
+    """
+    Single-process store. Entries are kept serialized so the memory cap is measured
+    in real bytes; the least recently used sessions are evicted first, and anything
+    idle longer than ttl_seconds is dropped on access or during eviction sweeps.
+    """
+
+    def __init__(self, max_entries: int = 10_000, max_bytes: int = 256 * 1024 * 1024, ttl_seconds: float = 86_400):
+        super().__init__()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        # slot -> (value, touched_at, version)
+        self._entries: "OrderedDict[tuple, tuple[bytes, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def bytes_used(self) -> int:
+        return self._bytes
+
+    def _live(self, slot: tuple, now: float) -> Optional[tuple]:
+        entry = self._entries.get(slot)
+        if entry is None:
+            return None
+        if now - entry[1] > self.ttl_seconds:
+            self._drop(slot)
+            return None
+        return entry
+
+    async def load(self, namespace: str, key: str) -> Optional[bytes]:
+        entry = await self.load_versioned(namespace, key)
+        return entry[0] if entry is not None else None
+
+    async def load_versioned(self, namespace: str, key: str) -> Optional[Tuple[bytes, int]]:
+        slot = (namespace, key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._live(slot, now)
+            if entry is None:
+                return None
+            value, _, version = entry
+            # Reading counts as activity: refresh both recency and the idle clock
+            self._entries[slot] = (value, now, version)
+            self._entries.move_to_end(slot)
+            return value, version
+
+    def _write(self, slot: tuple, value: bytes, version: int) -> None:
+        if slot in self._entries:
+            self._drop(slot)
+        self._entries[slot] = (value, time.monotonic(), version)
+        self._bytes += len(value)
+        self._evict()
+
+    async def save(self, namespace: str, key: str, value: bytes) -> None:
+        slot = (namespace, key)
+        with self._lock:
+            entry = self._entries.get(slot)
+            self._write(slot, value, (entry[2] if entry is not None else 0) + 1)
+
+    async def save_if_version(self, namespace: str, key: str, value: bytes, expected_version: int) -> bool:
+        slot = (namespace, key)
+        with self._lock:
+            entry = self._live(slot, time.monotonic())
+            if (entry[2] if entry is not None else 0) != expected_version:
+                return False
+            self._write(slot, value, expected_version + 1)
+            return True
+
+    async def remove(self, namespace: str, key: str) -> None:
+        with self._lock:
+            if (namespace, key) in self._entries:
+                self._drop((namespace, key))
+
+    async def size(self) -> int:
+        return len(self._entries)
+
+    async def scan(self, namespace: str, updated_after: float = 0.0) -> List[Tuple[str, bytes, float]]:
+        # Only this process writes here, so a scan is always a full one (touched_at is not a write time)
+        now = time.monotonic()
+        with self._lock:
+            return [
+                (key, value, 0.0)
+                for (ns, key), (value, touched_at, _) in self._entries.items()
+                if ns == namespace and now - touched_at <= self.ttl_seconds
+            ]
+
+    def _drop(self, slot: tuple) -> None:
+        value = self._entries.pop(slot)[0]
+        self._bytes -= len(value)
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        # Expired entries first (oldest are at the front), then LRU until under the caps
+        while self._entries:
+            slot, (_, touched_at, _) = next(iter(self._entries.items()))
+            over_cap = len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            if not over_cap and now - touched_at <= self.ttl_seconds:
+                break
+            self._drop(slot)
+
+
+# ==========================================
+# 5. SQLITE BACKEND (WAL, shared across workers)
+# ==========================================
+class SQLiteSessionStore(SessionStore):
+    """
+    Durable store that several uvicorn workers on one host can share.
+    WAL mode lets readers proceed while a writer commits; blocking sqlite calls
+    run in worker threads so the event loop never stalls on disk I/O.
+    Session locks are an in-process lock plus a lease row, so a turn also excludes
+    turns for the same session running in other workers.
+    """
+
+    shared = True
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH, ttl_seconds: float = 86_400, sweep_every: int = 500):
+        super().__init__()
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.sweep_every = sweep_every
+        self._writes = 0
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS kv ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value BLOB NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS kv_updated_at ON kv(updated_at)")
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(kv)")}
+            if "version" not in columns:
+                # Stores created before compare-and-swap start every entry at version 0
+                conn.execute("ALTER TABLE kv ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS leases ("
+                " key TEXT PRIMARY KEY,"
+                " owner TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; sqlite connections must not be shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _load_sync(self, namespace: str, key: str) -> Optional[Tuple[bytes, int]]:
+        row = self._connect().execute(
+            "SELECT value, updated_at, version FROM kv WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_seconds:
+            return None
+        return bytes(row[0]), row[2]
+
+    def _save_sync(self, namespace: str, key: str, value: bytes, sweep: bool) -> None:
+        conn = self._connect()
+        now = time.time()
+        conn.execute(
+            "INSERT INTO kv (namespace, key, value, updated_at, version) VALUES (?, ?, ?, ?, 1) "
+            "ON CONFLICT(namespace, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at,"
+            " version = kv.version + 1",
+            (namespace, key, value, now),
+        )
+        if sweep:
+            conn.execute("DELETE FROM kv WHERE updated_at < ?", (now - self.ttl_seconds,))
+
+    def _save_if_version_sync(self, namespace: str, key: str, value: bytes, expected_version: int) -> bool:
+        conn = self._connect()
+        now = time.time()
+        if expected_version == 0:
+            # Absent, or expired (an expired row counts as absent, as in _load_sync)
+            cursor = conn.execute(
+                "INSERT INTO kv (namespace, key, value, updated_at, version) VALUES (?, ?, ?, ?, 1) "
+                "ON CONFLICT(namespace, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at,"
+                " version = 1 WHERE kv.updated_at < ?",
+                (namespace, key, value, now, now - self.ttl_seconds),
+            )
+        else:
+            cursor = conn.execute(
+                "UPDATE kv SET value = ?, updated_at = ?, version = version + 1 "
+                "WHERE namespace = ? AND key = ? AND version = ? AND updated_at >= ?",
+                (value, now, namespace, key, expected_version, now - self.ttl_seconds),
+            )
+        return cursor.rowcount == 1
+
+    def _create_many_sync(self, namespace: str, keys: List[str], value: bytes) -> List[bool]:
+        conn = self._connect()
+        created = []
+        # One transaction for the whole batch instead of a commit per key
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for key in keys:
+                created.append(self._save_if_version_sync(namespace, key, value, 0))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return created
+
+    def _acquire_lease_sync(self, key: str, owner: str) -> bool:
+        now = time.time()
+        cursor = self._connect().execute(
+            "INSERT INTO leases (key, owner, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+            "WHERE leases.expires_at < ?",
+            (key, owner, now + SESSION_LOCK_TTL_SECONDS, now),
+        )
+        return cursor.rowcount == 1
+
+    def _release_lease_sync(self, key: str, owner: str) -> None:
+        self._connect().execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+
+    @asynccontextmanager
+    async def _lease(self, session_id: str):
+        owner = uuid.uuid4().hex
+        deadline = time.monotonic() + SESSION_LOCK_WAIT_SECONDS
+        while not await asyncio.to_thread(self._acquire_lease_sync, session_id, owner):
+            if time.monotonic() >= deadline:
+                raise SessionBusy(f"Session {session_id} is busy with another turn")
+            await asyncio.sleep(_LEASE_POLL_SECONDS)
+        try:
+            yield
+        finally:
+            # Synchronous on purpose: also runs when the client disconnected and the task is being cancelled
+            self._release_lease_sync(session_id, owner)
+
+    @asynccontextmanager
+    async def _hold(self, session_id: str):
+        # In-process first, so same-worker requests queue on the event loop instead of polling the lease
+        async with self._locks.hold(session_id):
+            async with self._lease(session_id):
+                yield
+
+    def lock(self, session_id: str):
+        return self._hold(session_id)
+
+    def _remove_sync(self, namespace: str, key: str) -> None:
+        self._connect().execute("DELETE FROM kv WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def _size_sync(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM kv").fetchone()[0]
+
+    def _scan_sync(self, namespace: str, updated_after: float) -> List[Tuple[str, bytes, float]]:
+        cutoff = max(updated_after, time.time() - self.ttl_seconds)
+        rows = self._connect().execute(
+            "SELECT key, value, updated_at FROM kv WHERE namespace = ? AND updated_at > ? ORDER BY updated_at",
+            (namespace, cutoff),
+        )
+        return [(key, bytes(value), updated_at) for key, value, updated_at in rows]
+
+    async def load(self, namespace: str, key: str) -> Optional[bytes]:
+        entry = await asyncio.to_thread(self._load_sync, namespace, key)
+        return entry[0] if entry is not None else None
+
+    async def load_versioned(self, namespace: str, key: str) -> Optional[Tuple[bytes, int]]:
+        return await asyncio.to_thread(self._load_sync, namespace, key)
+
+    async def save(self, namespace: str, key: str, value: bytes) -> None:
+        self._writes += 1
+        sweep = self._writes % self.sweep_every == 0
+        await asyncio.to_thread(self._save_sync, namespace, key, value, sweep)
+
+    async def save_if_version(self, namespace: str, key: str, value: bytes, expected_version: int) -> bool:
+        return await asyncio.to_thread(self._save_if_version_sync, namespace, key, value, expected_version)
+
+    async def create_many(self, namespace: str, keys: List[str], value: bytes) -> List[bool]:
+        return await asyncio.to_thread(self._create_many_sync, namespace, keys, value)
+
+    async def remove(self, namespace: str, key: str) -> None:
+        await asyncio.to_thread(self._remove_sync, namespace, key)
+
+    async def size(self) -> int:
+        return await asyncio.to_thread(self._size_sync)
+
+    async def scan(self, namespace: str, updated_after: float = 0.0) -> List[Tuple[str, bytes, float]]:
+        return await asyncio.to_thread(self._scan_sync, namespace, updated_after)
+
+
+# ==========================================
+# 6. FACTORY
+# ==========================================
+def create_session_store(env_prefix: str = "SESSION", default_path: str = DEFAULT_SQLITE_PATH,
+                         default_ttl_seconds: float = 86_400, default_backend: str = "memory") -> SessionStore:
+    """
+    Builds the backend selected by {env_prefix}_STORE_BACKEND ("memory" or "sqlite").
+    Other caches reuse the same backends under their own prefix (e.g. RESPONSE_CACHE_*).
+    """
+    backend = os.getenv(f"{env_prefix}_STORE_BACKEND", default_backend).lower()
+    ttl_seconds = float(os.getenv(f"{env_prefix}_TTL_SECONDS", str(default_ttl_seconds)))
+
+    if backend == "sqlite":
+        return SQLiteSessionStore(
+            path=os.getenv(f"{env_prefix}_STORE_PATH", default_path),
+            ttl_seconds=ttl_seconds,
+        )
+    if backend == "memory":
+        return InMemorySessionStore(
+            max_entries=int(os.getenv(f"{env_prefix}_MAX_ENTRIES", "10000")),
+            max_bytes=int(os.getenv(f"{env_prefix}_MAX_BYTES", str(256 * 1024 * 1024))),
+            ttl_seconds=ttl_seconds,
+        )
+    raise ValueError(f"Unknown {env_prefix}_STORE_BACKEND: {backend}")
@@ -0,0 +1,360 @@
+# backend/sla_scheduler.py
+"""
+The SLA Clock.
+Derives the Section 2 and reverification due dates of every session and fires
+reminder / escalation events for them in batches:
+
+  section2        due 3 business days after the first day of employment
+  reverification  due on the work authorization (or receipt) expiration date
+
+Pending deadlines live in one min-heap keyed by fire date. A state change pushes a new
+entry and invalidates the old one lazily (O(log n)); stale entries are skipped when they
+surface and the heap is compacted when they pile up. On start the heap is rebuilt from
+the session store, and every fired event first claims a marker in its own store
+(SLA_MARKERS_STORE_BACKEND, SQLite by default), so a restart, a resync or a second worker
+never sends the same reminder twice. An in-memory marker store only works for a single
+process whose markers never get evicted. Deadlines are only as durable
+as the sessions they come from, so SESSION_TTL_SECONDS must outlast the reverification
+reminder window for those reminders to survive a restart.
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Awaitable, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from backend.metrics import counter
+from backend.models import I9State
+from backend.session_store import SessionStore, create_session_store, deserialize_state
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SLA_MARKERS_PATH = os.path.join(BASE_DIR, "..", "data", "sla_markers.db")
+
+SLA_SCHEDULER_ENABLED = os.getenv("SLA_SCHEDULER_ENABLED", "true").lower() == "true"
+SLA_TICK_SECONDS = float(os.getenv("SLA_TICK_SECONDS", "60"))
+# With a store shared across workers, re-read it this often to pick up other workers' changes
+SLA_RESYNC_SECONDS = float(os.getenv("SLA_RESYNC_SECONDS", "300"))
+SLA_BATCH_SIZE = int(os.getenv("SLA_BATCH_SIZE", "500"))
+SECTION2_BUSINESS_DAYS = 3
+# Reminders go out this long before the due date (business days for Section 2, calendar days for reverification)
+SLA_SECTION2_REMINDER_DAYS = int(os.getenv("SLA_SECTION2_REMINDER_DAYS", "1"))
+SLA_REVERIFICATION_REMINDER_DAYS = int(os.getenv("SLA_REVERIFICATION_REMINDER_DAYS", "90"))
+# Comma-separated ISO dates that are not business days (federal holidays, office closures)
+SLA_HOLIDAYS: FrozenSet[date] = frozenset(
+    date.fromisoformat(day.strip()) for day in os.getenv("SLA_HOLIDAYS", "").split(",") if day.strip()
+)
+# Optional: POST every fired batch here as {"events": [...]}
+SLA_WEBHOOK_URL = os.getenv("SLA_WEBHOOK_URL", "")
+
+FIRED_NAMESPACE = "sla_fired"
+# Fired markers must outlive the longest schedule, or a rebuild would resend old escalations
+SLA_MARKERS_DEFAULT_TTL_SECONDS = 400 * 86_400
+DEADLINE_KINDS = ("section2", "reverification")
+STAGES = ("reminder", "escalation")
+
+SLA_EVENTS = counter("sla_events_total", "SLA reminder and escalation events fired, by deadline kind and stage")
+
+
+# ==========================================
+# 1. BUSINESS-DAY MATH
+# ==========================================
+def is_business_day(day: date, holidays: FrozenSet[date] = SLA_HOLIDAYS) -> bool:
+    return day.weekday() < 5 and day not in holidays
+
+
+def add_business_days(start: date, days: int, holidays: FrozenSet[date] = SLA_HOLIDAYS) -> date:
+    """Moves `days` business days from start (negative goes back); start itself never counts."""
+    step = 1 if days >= 0 else -1
+    day, remaining = start, abs(days)
+    while remaining:
+        day += timedelta(days=step)
+        if is_business_day(day, holidays):
+            remaining -= 1
+    return day
+
+
+# ==========================================
+# 2. DERIVING DUE DATES
+# ==========================================
+def derive_due_dates(state: I9State) -> I9State:
+    """Recomputes sla_tracking.section2_due_date and reverification_due_date in place."""
+    sla = state.sla_tracking
+    hire_date = sla.hire_date or state.employee.hire_date
+    if hire_date is not None and sla.section2_completed_at is None:
+        sla.section2_due_date = add_business_days(hire_date, SECTION2_BUSINESS_DAYS)
+    else:
+        sla.section2_due_date = None
+
+    # Citizens, nationals and LPRs are never reverified; a receipt expires on its own clock
+    expirations = []
+    if state.citizenship_status == "alien_authorized" and sla.work_authorization_expires is not None:
+        expirations.append(sla.work_authorization_expires)
+    if state.receipt_handling.receipt_presented and state.receipt_handling.receipt_expiration_date is not None:
+        expirations.append(state.receipt_handling.receipt_expiration_date)
+    sla.reverification_due_date = min(expirations) if expirations else None
+    return state
+
+
+def fire_date(kind: str, stage: str, due: date) -> date:
+    if stage == "escalation":
+        # The day after the deadline passed
+        return due + timedelta(days=1)
+    if kind == "section2":
+        return add_business_days(due, -SLA_SECTION2_REMINDER_DAYS)
+    return due - timedelta(days=SLA_REVERIFICATION_REMINDER_DAYS)
+
+
+def _due_dates(state: I9State) -> Dict[str, Optional[date]]:
+    return {
+        "section2": state.sla_tracking.section2_due_date,
+        "reverification": state.sla_tracking.reverification_due_date,
+    }
+
+
+# ==========================================
+# 3. EVENTS & SINKS
+# ==========================================
+@dataclass(frozen=True)
+class SLAEvent:
+    session_id: str
+    kind: str
+    stage: str
+    due_date: date
+
+    @property
+    def marker(self) -> str:
+        return f"{self.session_id}:{self.kind}:{self.stage}:{self.due_date.isoformat()}"
+
+    def to_dict(self) -> dict:
+        return {"session_id": self.session_id, "kind": self.kind, "stage": self.stage, "due_date": self.due_date.isoformat()}
+
+
+EventSink = Callable[[List[SLAEvent]], Awaitable[None]]
+
+
+async def print_sink(events: List[SLAEvent]) -> None:
+    tally: Dict[Tuple[str, str], int] = {}
+    for event in events:
+        tally[(event.kind, event.stage)] = tally.get((event.kind, event.stage), 0) + 1
+    print("SLA events: " + ", ".join(f"{n} {kind} {stage}" for (kind, stage), n in sorted(tally.items())))
+
+
+def webhook_sink(url: str) -> EventSink:
+    import httpx
+
+    client = httpx.AsyncClient(timeout=10.0)
+
+    async def send(events: List[SLAEvent]) -> None:
+        response = await client.post(url, json={"events": [event.to_dict() for event in events]})
+        response.raise_for_status()
+    return send
+
+
+def create_sink() -> EventSink:
+    return webhook_sink(SLA_WEBHOOK_URL) if SLA_WEBHOOK_URL else print_sink
+
+
+# ==========================================
+# 4. THE SCHEDULER (min-heap, lazy invalidation)
+# ==========================================
+class SLAScheduler:
+    """
+    The Alarm Clock.
+    _pending holds the live schedule per (session, kind): [due ordinal, token, stage index].
+    Heap entries are (fire ordinal, token, session, kind, stage index); an entry is live only
+    while its token still matches _pending, so rescheduling never searches the heap.
+    """
+
+    def __init__(self, store: SessionStore, markers: Optional[SessionStore] = None,
+                 sink: Optional[EventSink] = None, batch_size: int = SLA_BATCH_SIZE):
+        self.store = store
+        # Separate from the sessions so markers never evict a live session from an LRU store.
+        # Durable by default: a rebuild restarts every deadline at stage 0 and relies on them.
+        self.markers = markers or create_session_store(
+            "SLA_MARKERS", DEFAULT_SLA_MARKERS_PATH, SLA_MARKERS_DEFAULT_TTL_SECONDS, default_backend="sqlite"
+        )
+        if store.shared and not self.markers.shared:
+            print("SLA markers are per-process while sessions are shared: every worker will send its own reminders")
+        self.sink = sink or create_sink()
+        self.batch_size = batch_size
+        self._heap: List[Tuple[int, int, str, str, int]] = []
+        self._pending: Dict[Tuple[str, str], list] = {}
+        self._tokens = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+        self._last_tick: Optional[float] = None
+        self._rebuilt_at = 0.0
+        # States tracked while a rebuild was reading the store, replayed over its result
+        self._touched: Optional[Dict[str, Optional[I9State]]] = None
+
+    def __len__(self) -> int:
+        """Deadlines with a reminder or escalation still to fire."""
+        return sum(1 for entry in self._pending.values() if entry[2] < len(STAGES))
+
+    # --- scheduling ---
+    def track(self, session_id: str, state: I9State) -> None:
+        """Called after a state is committed; only deadlines whose date moved are rescheduled."""
+        if self._touched is not None:
+            self._touched[session_id] = state
+        self._track(session_id, state, push=True)
+
+    def _track(self, session_id: str, state: I9State, push: bool) -> None:
+        for kind, due in _due_dates(state).items():
+            key = (session_id, kind)
+            entry = self._pending.get(key)
+            if due is None:
+                if entry is not None:
+                    del self._pending[key]
+                continue
+            if entry is not None and entry[0] == due.toordinal():
+                continue
+            token = next(self._tokens)
+            self._pending[key] = [due.toordinal(), token, 0]
+            self._push(session_id, kind, due, 0, token, push)
+
+    def untrack(self, session_id: str) -> None:
+        if self._touched is not None:
+            self._touched[session_id] = None
+        for kind in DEADLINE_KINDS:
+            self._pending.pop((session_id, kind), None)
+
+    def _push(self, session_id: str, kind: str, due: date, stage: int, token: int, push: bool = True) -> None:
+        item = (fire_date(kind, STAGES[stage], due).toordinal(), token, session_id, kind, stage)
+        if push:
+            heapq.heappush(self._heap, item)
+            # Lazy deletion leaves dead entries behind; compact once they dominate
+            if len(self._heap) > 2 * len(self._pending) + 1024:
+                self._compact()
+        else:
+            self._heap.append(item)
+
+    def _compact(self) -> None:
+        self._heap = [
+            (fire_date(kind, STAGES[stage], date.fromordinal(due)).toordinal(), token, session_id, kind, stage)
+            for (session_id, kind), (due, token, stage) in self._pending.items()
+            if stage < len(STAGES)
+        ]
+        heapq.heapify(self._heap)
+
+    def pop_due(self, today: date) -> List[SLAEvent]:
+        """Up to batch_size events due on or before today; each advances its deadline to the next stage."""
+        events: List[SLAEvent] = []
+        limit = today.toordinal()
+        while self._heap and self._heap[0][0] <= limit and len(events) < self.batch_size:
+            _, token, session_id, kind, stage = heapq.heappop(self._heap)
+            entry = self._pending.get((session_id, kind))
+            if entry is None or entry[1] != token or entry[2] != stage:
+                continue
+            due = date.fromordinal(entry[0])
+            entry[2] = stage + 1
+            if entry[2] < len(STAGES):
+                self._push(session_id, kind, due, entry[2], token)
+                if fire_date(kind, STAGES[entry[2]], due) <= today:
+                    # Already past the next stage too (e.g. after downtime): only send the latest one
+                    continue
+            events.append(SLAEvent(session_id, kind, STAGES[stage], due))
+        return events
+
+    def _requeue(self, events: List[SLAEvent]) -> None:
+        """Puts undelivered events back so the next tick retries them."""
+        for event in events:
+            entry = self._pending.get((event.session_id, event.kind))
+            stage = STAGES.index(event.stage)
+            if entry is not None and entry[0] == event.due_date.toordinal() and entry[2] == stage + 1:
+                entry[2] = stage
+                token = entry[1] = next(self._tokens)
+                self._push(event.session_id, event.kind, event.due_date, stage, token)
+
+    # --- firing ---
+    async def fire_due(self, today: Optional[date] = None) -> int:
+        """Fires everything due by today, batch by batch. Returns the number of events delivered."""
+        today = today or date.today()
+        delivered = 0
+        while True:
+            events = self.pop_due(today)
+            if not events:
+                return delivered
+            claimed = await self.markers.create_many(FIRED_NAMESPACE, [event.marker for event in events], b"1")
+            batch = [event for event, won in zip(events, claimed) if won]
+            if not batch:
+                continue
+            try:
+                await self.sink(batch)
+            except Exception as e:
+                print(f"SLA sink failed for {len(batch)} events, retrying next tick: {e}")
+                await asyncio.gather(*(self.markers.remove(FIRED_NAMESPACE, event.marker) for event in batch))
+                self._requeue(batch)
+                return delivered
+            for event in batch:
+                SLA_EVENTS.inc(kind=event.kind, stage=event.stage)
+            delivered += len(batch)
+
+    # --- lifecycle ---
+    async def rebuild(self) -> int:
+        """Recreates the whole schedule from the session store (O(n) heapify). Returns deadlines pending."""
+        self._touched = {}
+        try:
+            self._rebuilt_at = time.monotonic()
+            entries = await self.store.scan_states()
+            states = await asyncio.to_thread(
+                lambda: [(key, derive_due_dates(deserialize_state(value))) for key, value, _ in entries]
+            )
+            # Stages restart from the top; the fired markers keep already-sent events from repeating
+            self._heap, self._pending = [], {}
+            for session_id, state in states:
+                self._track(session_id, state, push=False)
+            heapq.heapify(self._heap)
+            for session_id, state in self._touched.items():
+                if state is None:
+                    self.untrack(session_id)
+                else:
+                    self._track(session_id, state, push=True)
+        finally:
+            self._touched = None
+        return len(self)
+
+    async def run(self) -> None:
+        started = time.perf_counter()
+        pending = await self.rebuild()
+        print(f"SLA scheduler tracking {pending} deadlines (rebuilt in {time.perf_counter() - started:.2f}s)")
+        while True:
+            try:
+                if self.store.shared and time.monotonic() - self._rebuilt_at > SLA_RESYNC_SECONDS:
+                    await self.rebuild()
+                await self.fire_due()
+            except Exception as e:
+                print(f"SLA tick failed: {e}")
+            self._last_tick = time.time()
+            await asyncio.sleep(SLA_TICK_SECONDS)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.markers.close()
+
+    def status(self) -> dict:
+        # Drop dead entries off the top so the head is the next real event
+        while self._heap and not self._is_live(self._heap[0]):
+            heapq.heappop(self._heap)
+        return {
+            "running": self._task is not None,
+            "pending": len(self),
+            "heap_entries": len(self._heap),
+            "next_fire_date": date.fromordinal(self._heap[0][0]).isoformat() if self._heap else None,
+            "last_tick": self._last_tick,
+        }
+
+    def _is_live(self, item: Tuple[int, int, str, str, int]) -> bool:
+        entry = self._pending.get((item[2], item[3]))
+        return entry is not None and entry[1] == item[1] and entry[2] == item[4]
@@ -1,6 +1,41 @@
 # backend/state_machine.py
 from datetime import datetime
+from typing import Any, Dict
+from pydantic import TypeAdapter
 from backend.models import I9State, AuditEntry
+from backend.compliance_matrix import COMPLIANCE_ENGINE
+
+# Which fields feed the rules, and which the rules own, both come from the compiled matrix
+DERIVED_INPUTS = COMPLIANCE_ENGINE.inputs
+DERIVED_OUTPUTS = COMPLIANCE_ENGINE.outputs
+
+# The ledger cursor and the flags belong to the backend: a delta may set neither
+_PROTECTED_FIELDS = {"audit_cursor"} | DERIVED_OUTPUTS
+
+_FIELD_ADAPTERS: Dict[str, TypeAdapter] = {}
+
+def _validate_field(key: str, value: Any) -> Any:
+    """Validates one field against its I9State annotation without rebuilding the model."""
+    adapter = _FIELD_ADAPTERS.get(key)
+    if adapter is None:
+        adapter = _FIELD_ADAPTERS[key] = TypeAdapter(I9State.model_fields[key].annotation)
+    return adapter.validate_python(value)
+
+CITIZENSHIP_STATUSES = ("citizen", "noncitizen_national", "lpr", "alien_authorized")
+
+def normalize_citizenship_status(raw) -> str:
+    """Maps free-text status ("US Citizen", "green card holder / LPR", ...) onto the I9State literal.
+    Unrecognized text is returned unchanged and left for validation to reject."""
+    raw_status = str(raw).lower().strip().replace("non-citizen", "noncitizen").replace("non citizen", "noncitizen")
+    if "citizen" in raw_status and "noncitizen" not in raw_status:
+        return "citizen"
+    elif "noncitizen" in raw_status:
+        return "noncitizen_national"
+    elif "permanent resident" in raw_status or "lpr" in raw_status:
+        return "lpr"
+    elif "alien" in raw_status or "authorized" in raw_status:
+        return "alien_authorized"
+    return raw
 
 def apply_state_delta(
     current_state: I9State, 
@@ -11,8 +46,9 @@ def apply_state_delta(
     """
     The Deterministic Bouncer.
     Translates AI English, enforces statutory rules, and creates an immutable audit log.
+    Applied in place: only touched fields are validated, and audit entries are queued on
+    the state (record_audit) for the caller to commit to the append-only ledger.
     """
-    state_dict = current_state.model_dump()
     proposed_changes = {}
 
     # ==========================================
@@ -30,20 +66,12 @@ def apply_state_delta(
 
     # B. Merge flat keys
     for key, value in delta.items():
-        if key in state_dict and value is not None and not isinstance(value, dict):
+        if key in I9State.model_fields and key not in _PROTECTED_FIELDS and value is not None and not isinstance(value, dict):
             proposed_changes[key] = value
 
     # C. Clean Citizenship Status Strings
     if "citizenship_status" in proposed_changes:
-        raw_status = str(proposed_changes["citizenship_status"]).lower().strip()
-        if "citizen" in raw_status and "noncitizen" not in raw_status:
-            proposed_changes["citizenship_status"] = "citizen"
-        elif "noncitizen" in raw_status:
-            proposed_changes["citizenship_status"] = "noncitizen_national"
-        elif "permanent resident" in raw_status or "lpr" in raw_status:
-            proposed_changes["citizenship_status"] = "lpr"
-        elif "alien" in raw_status or "authorized" in raw_status:
-            proposed_changes["citizenship_status"] = "alien_authorized"
+        proposed_changes["citizenship_status"] = normalize_citizenship_status(proposed_changes["citizenship_status"])
 
     # D. Clean Workflow Mode
     if "workflow_mode" in proposed_changes:
@@ -54,13 +82,15 @@ def apply_state_delta(
     # ==========================================
     # 2. THE IMMUTABLE AUDIT LEDGER
     # ==========================================
+    # Validate every proposed value first so a bad delta leaves the state untouched
+    validated = {key: _validate_field(key, value) for key, value in proposed_changes.items()}
+
     # Before we apply changes, we log EXACTLY what is changing for ICE audits
-    audit_log = current_state.audit_trail.copy()
-    
-    for key, new_val in proposed_changes.items():
-        old_val = state_dict.get(key)
+    changed_fields = set()
+    for key, new_val in validated.items():
+        old_val = getattr(current_state, key)
         if old_val != new_val:
-            audit_log.append(AuditEntry(
+            current_state.record_audit(AuditEntry(
                 timestamp=datetime.utcnow(),
                 modified_by=modified_by,
                 field_changed=key,
@@ -68,56 +98,28 @@ def apply_state_delta(
                 new_value=str(new_val),
                 legal_basis_reference=legal_basis
             ))
-            state_dict[key] = new_val
-
-    state_dict["audit_trail"] = audit_log
-
-    # Create the draft state object
-    updated_state = I9State(**state_dict)
+            setattr(current_state, key, new_val)
+            changed_fields.add(key)
 
     # ==========================================
     # 3. DETERMINISTIC RULE ENFORCEMENT ENGINE
     # ==========================================
-    
-    # RESET: Deny-by-default all UI flags
-    updated_state.requires_alien_number = False
-    updated_state.requires_uscis_number = False
-    updated_state.requires_expiration_date = False
-    updated_state.alien_identifier_options = []
-    updated_state.eligible_document_lists = []
-
-    status = updated_state.citizenship_status
-
-    if status in ["citizen", "noncitizen_national"]:
-        updated_state.requires_expiration_date = False
-        # INA §1324b Guardrail: Neutral pathway presentation
-        updated_state.eligible_document_lists = ["LIST_A", "LIST_B_AND_C"]
-
-    elif status == "lpr":
-        updated_state.requires_alien_number = True
-        updated_state.requires_uscis_number = True
-        updated_state.requires_expiration_date = False
-        updated_state.eligible_document_lists = ["LIST_A", "LIST_B_AND_C"]
-
-    elif status == "alien_authorized":
-        # Rule: Expiration date is required for most EADs and Visas
-        updated_state.requires_expiration_date = True
-        
-        # INA §1324b Guardrail: Give the employee the choice of identifier
-        # We do not force an I-94 just because they said "H-1B". We offer all valid options.
-        updated_state.alien_identifier_options = ["alien_number", "i94_number", "passport"]
-        updated_state.eligible_document_lists = ["LIST_A", "LIST_B_AND_C"]
+    # Only the rules downstream of what actually changed are re-evaluated
+    if changed_fields & DERIVED_INPUTS:
+        COMPLIANCE_ENGINE.apply(current_state, changed_fields)
+        _stamp_section1_ready(current_state)
+    return current_state
+
+def derive_flags(updated_state: I9State) -> I9State:
+    """Full re-evaluation of the compliance matrix (gaps, UI flags, readiness)."""
+    COMPLIANCE_ENGINE.apply(updated_state)
+    _stamp_section1_ready(updated_state)
+    return updated_state
 
+def _stamp_section1_ready(state: I9State) -> None:
     # ==========================================
-    # 4. READINESS & SLA CHECK
+    # 4. SLA CHECK
     # ==========================================
-    if updated_state.workflow_mode and updated_state.citizenship_status:
-        updated_state.is_ready_for_form = True
-        
-        # Stamp the exact millisecond the backend decided the form was legally ready
-        if not updated_state.sla_tracking.section1_completed_at:
-             updated_state.sla_tracking.section1_completed_at = datetime.utcnow()
-    else:
-        updated_state.is_ready_for_form = False
-
-    return updated_state
\ No newline at end of file
+    # Stamp the exact millisecond the backend decided the form was legally ready
+    if state.is_ready_for_form and not state.sla_tracking.section1_completed_at:
+        state.sla_tracking.section1_completed_at = datetime.utcnow()
@@ -0,0 +1,116 @@
+# backend/streaming.py
+import json
+
+def sse_event(event_type: str, content) -> str:
+    """Formats one Server-Sent Event frame in the shape the employee UI expects."""
+    return f"data: {json.dumps({'type': event_type, 'content': content})}\n\n"
+
+
+_SIMPLE_ESCAPES = {
+    '"': '"', "\\": "\\", "/": "/",
+    "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t",
+}
+
+
+class NarrationStreamExtractor:
+    """
+    The Incremental Narration Tap.
+    Consumes the model's JSON answer chunk-by-chunk and returns the decoded text of
+    the top-level "narration" string as soon as it arrives, long before the full
+    StateDeltaPayload can be parsed. Nested "narration" keys (e.g. inside state_delta)
+    are ignored; only depth-1 keys of the root object count.
+    """
+
+    def __init__(self, field_name: str = "narration"):
+        self.field_name = field_name
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._unicode_buf = None     # collects the 4 hex digits of a \uXXXX escape
+        self._high_surrogate = None  # first half of a \uD83D\uDE00-style pair
+        self._string_buf = []        # current key (only buffered when it could be a key)
+        self._expect_key = False     # next string at depth 1 is an object key
+        self._last_key = None
+        self._awaiting_value = False # saw `"narration":` and waiting for the opening quote
+        self._capturing = False      # inside the narration value itself
+        self._done = False
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    def feed(self, chunk: str) -> str:
+        """Returns the newly decoded narration text contained in this chunk (may be empty)."""
+        out = []
+        for ch in chunk:
+            if self._in_string:
+                self._consume_string_char(ch, out)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_buf = []
+                if self._awaiting_value and self._depth == 1:
+                    self._capturing = True
+                    self._awaiting_value = False
+            elif ch in "{[":
+                self._depth += 1
+                self._awaiting_value = False
+                self._expect_key = ch == "{" and self._depth == 1
+            elif ch in "}]":
+                self._depth -= 1
+                self._expect_key = False
+            elif ch == ":" and self._depth == 1:
+                self._awaiting_value = self._last_key == self.field_name and not self._done
+                self._expect_key = False
+            elif ch == "," and self._depth == 1:
+                self._expect_key = True
+                self._awaiting_value = False
+            elif not ch.isspace():
+                # Non-string scalar (number, bool, null) as a value
+                self._awaiting_value = False
+
+        return "".join(out)
+
+    def _consume_string_char(self, ch: str, out: list) -> None:
+        if self._unicode_buf is not None:
+            self._unicode_buf.append(ch)
+            if len(self._unicode_buf) == 4:
+                code = int("".join(self._unicode_buf), 16)
+                self._unicode_buf = None
+                if 0xD800 <= code <= 0xDBFF:
+                    self._high_surrogate = code
+                elif 0xDC00 <= code <= 0xDFFF and self._high_surrogate is not None:
+                    combined = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+                    self._high_surrogate = None
+                    self._emit(chr(combined), out)
+                else:
+                    self._emit(chr(code), out)
+            return
+
+        if self._escape:
+            self._escape = False
+            if ch == "u":
+                self._unicode_buf = []
+            else:
+                self._emit(_SIMPLE_ESCAPES.get(ch, ch), out)
+            return
+
+        if ch == "\\":
+            self._escape = True
+        elif ch == '"':
+            self._in_string = False
+            if self._capturing:
+                self._capturing = False
+                self._done = True
+            elif self._expect_key and self._depth == 1:
+                self._last_key = "".join(self._string_buf)
+            self._string_buf = []
+        else:
+            self._emit(ch, out)
+
+    def _emit(self, text: str, out: list) -> None:
+        if self._capturing:
+            out.append(text)
+        elif self._expect_key and self._depth == 1:
+            self._string_buf.append(text)
@@ -0,0 +1,93 @@
+# backend/telemetry.py
+import os
+import time
+
+from backend.metrics import counter, histogram
+
+# ==========================================
+# TELEMETRY CONFIGURATION
+# ==========================================
+# Per-stage latency histograms for the chat pipeline (served at /metrics)
+STAGE_TIMERS_ENABLED = os.getenv("STAGE_TIMERS_ENABLED", "true").lower() == "true"
+# OpenTelemetry spans; needs opentelemetry-api plus an SDK/exporter configured by the deployment
+OTEL_ENABLED = os.getenv("OTEL_ENABLED", "false").lower() == "true"
+OTEL_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "i9-compliance-engine")
+
+CHAT_STAGE_SECONDS = histogram("chat_stage_seconds", "Wall time per chat pipeline stage")
+CHAT_ERRORS = counter("chat_errors_total", "Chat turns that ended in an error, by exception type")
+LLM_USAGE_TOKENS = counter(
+    "llm_usage_tokens_total",
+    "Tokens reported by the provider (response.usage) by model and kind: prompt, completion, cached_prompt",
+)
+
+_tracer = None
+if OTEL_ENABLED:
+    try:
+        from opentelemetry import trace
+
+        _tracer = trace.get_tracer(OTEL_SERVICE_NAME)
+    except ImportError:
+        print("OTEL_ENABLED is set but opentelemetry-api is not installed; spans are disabled.")
+
+
+class _NoopStage:
+    """Shared do-nothing context manager: what stage() costs when telemetry is off."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NOOP_STAGE = _NoopStage()
+
+
+class _Stage:
+    __slots__ = ("name", "attributes", "started", "span_cm")
+
+    def __init__(self, name: str, attributes: dict):
+        self.name = name
+        self.attributes = attributes
+        self.span_cm = None
+
+    def __enter__(self):
+        if _tracer is not None:
+            self.span_cm = _tracer.start_as_current_span(f"chat.{self.name}", attributes=self.attributes or None)
+            self.span_cm.__enter__()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if STAGE_TIMERS_ENABLED:
+            CHAT_STAGE_SECONDS.observe(time.perf_counter() - self.started, stage=self.name)
+        if self.span_cm is not None:
+            # Records the exception on the span and sets its status
+            self.span_cm.__exit__(exc_type, exc, tb)
+        return False
+
+
+def stage(name: str, **attributes):
+    """
+    Times one pipeline stage into chat_stage_seconds{stage=name} and, with OTEL_ENABLED,
+    wraps it in a `chat.<name>` span (nested under the enclosing stage).
+    """
+    if not STAGE_TIMERS_ENABLED and _tracer is None:
+        return _NOOP_STAGE
+    return _Stage(name, attributes)
+
+
+def record_error(error: BaseException) -> None:
+    CHAT_ERRORS.inc(type=type(error).__name__)
+
+
+def record_usage(model: str, usage) -> None:
+    """Provider-reported token counts; streams report them in the final chunk (stream_options.include_usage)."""
+    if usage is None:
+        return
+    LLM_USAGE_TOKENS.inc(getattr(usage, "prompt_tokens", 0) or 0, model=model, kind="prompt")
+    LLM_USAGE_TOKENS.inc(getattr(usage, "completion_tokens", 0) or 0, model=model, kind="completion")
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", 0) if details is not None else 0
+    if cached:
+        LLM_USAGE_TOKENS.inc(cached, model=model, kind="cached_prompt")
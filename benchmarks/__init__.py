@@ -0,0 +1,5 @@
+# benchmarks/
+# Standalone performance scripts. Run from the repo root, e.g.:
+#   python -m benchmarks.bench_prompt_size
+# bench_core and load_chat save JSON under benchmarks/results/; diff two runs with
+#   python -m benchmarks.compare OLD.json NEW.json
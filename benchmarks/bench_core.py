@@ -0,0 +1,163 @@
+# benchmarks/bench_core.py
+"""
+Microbenchmarks for the hot backend functions of one chat turn, timed call by call so
+the saved JSON carries p50/p95/p99 and not just a mean.
+
+  apply_state_delta         one visa_type change per call on a live session state
+  evaluate_compliance_gaps  full gap evaluation over synthetic states
+  generate_strict_schema    the FORM_READY schema for ready states
+  validate_section1         compiled Section 1 validation of one submitted form
+  generate_i9_pdf           template stamp + write (to a temp dir)
+  query_rules               ChromaDB rule lookup; skipped when chromadb is not installed.
+                            With EMBEDDING_PROVIDER=openai, point OPENAI_BASE_URL at
+                            benchmarks.mock_openai_server to keep it offline.
+
+    python -m benchmarks.bench_core [--iterations 20000] [--pdf-iterations 50] [--only apply_state_delta,query_rules] [--out FILE]
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import Callable, List
+
+from backend.compliance_matrix import evaluate_compliance_gaps
+from backend.models import EmployeeProfile, EmployerContext, I9State
+from backend.state_machine import apply_state_delta, derive_flags
+from benchmarks.bench_rules_engine import synthetic_states
+from benchmarks.results import save_results, summarize
+
+QUERIES = [
+    "What documents can I use if my green card expired?",
+    "Do I need a social security number for E-Verify?",
+    "I am on an H-1B visa, what do I put for expiration date?",
+    "Can I leave the alien number blank?",
+]
+
+
+def run(label: str, fn: Callable[[int], object], iterations: int) -> dict:
+    samples: List[float] = []
+    clock = time.perf_counter
+    for i in range(iterations):
+        start = clock()
+        fn(i)
+        samples.append(clock() - start)
+    summary = summarize(samples)
+    summary["ops_per_sec"] = iterations / sum(samples) if samples else 0.0
+    print(f"{label:<26} n={iterations:<7} p50 {summary['p50_ms'] * 1000:9.2f} us  "
+          f"p95 {summary['p95_ms'] * 1000:9.2f} us  p99 {summary['p99_ms'] * 1000:9.2f} us")
+    return summary
+
+
+def session_state() -> I9State:
+    state = I9State(
+        employer=EmployerContext(company_name="CEIPAL Corp", uses_everify=True),
+        employee=EmployeeProfile(first_name="Rajesh", last_name="Kumar", preloaded_status="H-1B"),
+    )
+    return derive_flags(state)
+
+
+def bench_apply_state_delta(iterations: int) -> dict:
+    state = apply_state_delta(session_state(), {"citizenship_status": "alien_authorized"})
+    state.drain_audit()
+    deltas = [{"visa_type": "H-1B"}, {"visa_type": "L-1"}]
+
+    def call(i):
+        apply_state_delta(state, deltas[i % 2])
+        # The chat endpoint drains into the ledger every turn; keep the queue from growing here
+        state.drain_audit()
+    return run("apply_state_delta", call, iterations)
+
+
+def bench_evaluate_compliance_gaps(iterations: int) -> dict:
+    states = synthetic_states(min(iterations, 10_000))
+    return run("evaluate_compliance_gaps", lambda i: evaluate_compliance_gaps(states[i % len(states)]), iterations)
+
+
+def bench_generate_strict_schema(iterations: int) -> dict:
+    from backend.main import generate_strict_schema
+
+    ready = [
+        apply_state_delta(session_state(), delta)
+        for delta in (
+            {"citizenship_status": "citizen", "ssn_status_resolved": True},
+            {"citizenship_status": "lpr", "ssn_status_resolved": True},
+            {"citizenship_status": "alien_authorized", "ssn_status_resolved": True, "expiration_date_resolved": True},
+        )
+    ]
+    return run("generate_strict_schema", lambda i: generate_strict_schema(ready[i % len(ready)]), iterations)
+
+
+def bench_validate_section1(iterations: int) -> dict:
+    from backend.section1_validator import validator_for
+
+    validator = validator_for("alien_authorized", True)
+    forms = [
+        {"first_name": "Rajesh", "last_name": "Kumar", "dob": "1990-05-04", "ssn": "123-45-6789",
+         "work_auth_expiration": "2027-08-01", "opt_i94_number": "12345678901"},
+        {"first_name": "R4jesh", "last_name": "", "dob": "2090-05-04", "ssn": "000-45-6789",
+         "work_auth_expiration": "2020-08-01", "opt_i94_number": "123", "opt_passport_number": "X123"},
+    ]
+    return run("validate_section1", lambda i: validator.validate(forms[i % len(forms)]), iterations)
+
+
+def bench_generate_i9_pdf(iterations: int) -> dict:
+    from backend import pdf_service, tools
+
+    if not os.path.exists(pdf_service.TEMPLATE_PATH):
+        print(f"generate_i9_pdf            skipped: no template at {pdf_service.TEMPLATE_PATH}")
+        return {"skipped": "template missing"}
+    with tempfile.TemporaryDirectory() as out_dir:
+        # Keep benchmark PDFs out of the real output/ directory
+        tools.OUTPUT_DIR = out_dir
+        tools.generate_i9_pdf({"first_name": "Warm", "last_name": "Up"})
+        return run("generate_i9_pdf", lambda i: tools.generate_i9_pdf({"first_name": "Bench", "last_name": f"Employee{i}"}), iterations)
+
+
+def bench_query_rules(iterations: int) -> dict:
+    try:
+        import chromadb  # noqa: F401
+    except ImportError:
+        print("query_rules                skipped: chromadb is not installed")
+        return {"skipped": "chromadb not installed"}
+    from backend import db
+
+    if db.get_collection().count() == 0:
+        db.ingest_rules()
+    db.query_rules(QUERIES[0])
+    return run("query_rules", lambda i: db.query_rules(QUERIES[i % len(QUERIES)]), iterations)
+
+
+BENCHES = {
+    "apply_state_delta": bench_apply_state_delta,
+    "evaluate_compliance_gaps": bench_evaluate_compliance_gaps,
+    "generate_strict_schema": bench_generate_strict_schema,
+    "validate_section1": bench_validate_section1,
+    "generate_i9_pdf": bench_generate_i9_pdf,
+    "query_rules": bench_query_rules,
+}
+# I/O-bound benches get their own, smaller iteration count
+SLOW_BENCHES = {"generate_i9_pdf", "query_rules"}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20_000)
+    parser.add_argument("--pdf-iterations", type=int, default=50, help="Iterations for generate_i9_pdf and query_rules")
+    parser.add_argument("--only", default="", help="Comma-separated subset of: " + ", ".join(BENCHES))
+    parser.add_argument("--out", default=None, help="Result file (default: benchmarks/results/bench_core-<timestamp>.json)")
+    args = parser.parse_args()
+
+    selected = [name.strip() for name in args.only.split(",") if name.strip()] or list(BENCHES)
+    unknown = set(selected) - set(BENCHES)
+    if unknown:
+        parser.error(f"Unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    results = {}
+    for name in selected:
+        iterations = args.pdf_iterations if name in SLOW_BENCHES else args.iterations
+        results[name] = BENCHES[name](iterations)
+    save_results("bench_core", results, {**vars(args), "selected": selected}, args.out)
+
+
+if __name__ == "__main__":
+    main()
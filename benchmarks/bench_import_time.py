@@ -0,0 +1,67 @@
+# benchmarks/bench_import_time.py
+"""
+Import-time guard for worker cold start.
+Runs `python -X importtime -c "import backend.main"` in a fresh interpreter, prints the
+slowest modules, and exits non-zero if the total exceeds the budget or if a module
+that must stay lazy (chromadb, openai, pypdf, reportlab) was pulled in at import.
+
+    python -m benchmarks.bench_import_time [--budget-ms 1500] [--module backend.main]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+LAZY_MODULES = ("chromadb", "openai", "pypdf", "reportlab", "onnxruntime")
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(module: str) -> list:
+    """Returns (self_us, cumulative_us, depth, name) per imported module."""
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=repo_root, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        sys.exit(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((int(self_us), int(cumulative_us), len(indent) // 2, name))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="backend.main")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_TIME_BUDGET_MS", "1500")))
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    rows = measure(args.module)
+    target = next((r for r in rows if r[3] == args.module), None)
+    total_ms = target[1] / 1000 if target else sum(r[0] for r in rows) / 1000
+
+    print(f"{args.module}: {total_ms:.1f} ms cumulative ({len(rows)} modules)")
+    print(f"{'cumulative_ms':>14} {'self_ms':>8}  module")
+    for self_us, cumulative_us, _, name in sorted(rows, key=lambda r: r[1], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>8.1f}  {name}")
+
+    leaked = sorted({r[3] for r in rows if r[3].split(".")[0] in LAZY_MODULES})
+    failed = False
+    if leaked:
+        print(f"FAIL: lazy-only modules imported eagerly: {', '.join(leaked[:10])}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"FAIL: {total_ms:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# benchmarks/bench_pdf_stamping.py
+"""
+Section 1 stamping throughput in PDFs per second.
+
+  legacy   re-parse i9_flat.pdf + reportlab overlay + page copy per form (the original tools.py path)
+  cached   StampTemplate incremental update, single process
+  pool     PdfStampingService over a process pool (one template parse per worker)
+
+    python -m benchmarks.bench_pdf_stamping [--count 500] [--workers 4]
+"""
+import argparse
+import asyncio
+import io
+import time
+
+from backend.pdf_service import FIELD_COORDS, TEMPLATE_PATH, PdfStampingService, get_template, stamp_section1
+
+SAMPLE = {"first_name": "Rajesh", "last_name": "Kumar", "dob": "1990-04-12", "i94_number": "12345678901"}
+
+
+def legacy_stamp(employee_data: dict) -> bytes:
+    from pypdf import PdfReader, PdfWriter
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    packet = io.BytesIO()
+    can = canvas.Canvas(packet, pagesize=letter)
+    can.setFont("Helvetica", 10)
+    for form_key, user_value in employee_data.items():
+        if form_key in FIELD_COORDS and user_value:
+            x, y = FIELD_COORDS[form_key]
+            can.drawString(x, y, str(user_value))
+    can.save()
+    packet.seek(0)
+    overlay_pdf = PdfReader(packet)
+
+    template_pdf = PdfReader(TEMPLATE_PATH)
+    writer = PdfWriter()
+    page1 = template_pdf.pages[0]
+    page1.merge_page(overlay_pdf.pages[0])
+    writer.add_page(page1)
+    for i in range(1, len(template_pdf.pages)):
+        writer.add_page(template_pdf.pages[i])
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def records(count: int):
+    return [dict(SAMPLE, first_name=f"Employee{i}") for i in range(count)]
+
+
+def rate(label: str, count: int, seconds: float) -> None:
+    print(f"{label:<8} {count:>6} PDFs in {seconds:7.3f}s  -> {count / seconds:10.1f} PDFs/sec")
+
+
+async def bench_pool(count: int, workers: int) -> float:
+    service = PdfStampingService(executor_kind="process", workers=workers)
+    await asyncio.gather(*(service.stamp(SAMPLE) for _ in range(workers)))  # spin up + parse per worker
+    start = time.perf_counter()
+    await asyncio.gather(*(service.stamp(r) for r in records(count)))
+    elapsed = time.perf_counter() - start
+    service.shutdown()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=500)
+    parser.add_argument("--legacy-count", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    for record in records(args.legacy_count):
+        legacy_stamp(record)
+    rate("legacy", args.legacy_count, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    get_template()
+    print(f"template parse (once per process): {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    start = time.perf_counter()
+    for record in records(args.count):
+        stamp_section1(record)
+    rate("cached", args.count, time.perf_counter() - start)
+
+    rate("pool", args.count, asyncio.run(bench_pool(args.count, args.workers)))
+
+
+if __name__ == "__main__":
+    main()
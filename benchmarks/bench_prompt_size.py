@@ -0,0 +1,43 @@
+# benchmarks/bench_prompt_size.py
+"""
+Prompt size per turn across a 30-turn synthetic session.
+Compares the legacy full-state dump (model_dump_json(indent=2)) with the
+compact LLM projection now embedded by backend/prompt_builder.py.
+"""
+from backend.models import I9State
+from backend.prompt_builder import build_session_context
+from backend.state_machine import apply_state_delta
+
+TURNS = 30
+
+# A plausible, noisy conversation: the agent keeps revising what it heard.
+SYNTHETIC_DELTAS = [
+    {"workflow_mode": "new hire"},
+    {"immigration": {"classification": "alien authorized", "visa_type": "H-1B"}},
+    {"visa_type": "H1B"},
+    {"ssn_status_resolved": True},
+    {"visa_type": "H-1B"},
+    {"expiration_date_resolved": True},
+]
+
+
+def main():
+    state = I9State()
+    ledger = []  # stands in for backend/audit_ledger.py; the state only keeps a cursor
+    print(f"{'turn':>4} {'audit':>6} {'full_dump_bytes':>16} {'projection_bytes':>17} {'context_bytes':>14}")
+    for turn in range(1, TURNS + 1):
+        delta = dict(SYNTHETIC_DELTAS[turn % len(SYNTHETIC_DELTAS)])
+        # Force a change every turn so the audit trail grows like a long, indecisive session
+        delta["visa_type"] = f"{delta.get('visa_type', 'H-1B')}#{turn}"
+        state = apply_state_delta(state, delta, modified_by="bench")
+        ledger.extend(state.drain_audit())
+        state.audit_cursor.seq = len(ledger)
+
+        full_dump = len(state.model_dump_json(indent=2).encode())
+        projection = len(state.to_llm_json().encode())
+        context = len(build_session_context(state).encode())
+        print(f"{turn:>4} {len(ledger):>6} {full_dump:>16} {projection:>17} {context:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# benchmarks/bench_state_delta.py
+"""
+Per-delta cost of apply_state_delta as one session's audit trail grows.
+
+  legacy       model_dump() + audit_trail.copy() + I9State(**state_dict) every turn (the original path,
+               with the audit trail still embedded in the state)
+  incremental  backend.state_machine.apply_state_delta (touched fields only, entries drained to a ledger)
+
+Each delta changes visa_type, so every turn adds an audit entry. Flat per-bucket
+times mean the cost no longer depends on history length.
+
+    python -m benchmarks.bench_state_delta [--deltas 10000] [--bucket 1000]
+"""
+import argparse
+import time
+from datetime import datetime
+from typing import List
+
+from pydantic import Field
+
+from backend.models import AuditEntry, I9State
+from backend.state_machine import apply_state_delta, derive_flags
+
+
+class LegacyI9State(I9State):
+    audit_trail: List[AuditEntry] = Field(default_factory=list)
+
+
+def legacy_apply(current_state: LegacyI9State, delta: dict) -> LegacyI9State:
+    state_dict = current_state.model_dump()
+    audit_log = current_state.audit_trail.copy()
+    for key, new_val in delta.items():
+        old_val = state_dict.get(key)
+        if old_val != new_val:
+            audit_log.append(AuditEntry(
+                timestamp=datetime.utcnow(), modified_by="AI_Agent", field_changed=key,
+                old_value=str(old_val), new_value=str(new_val),
+            ))
+            state_dict[key] = new_val
+    state_dict["audit_trail"] = audit_log
+    return derive_flags(LegacyI9State(**state_dict))
+
+
+def deltas(count: int):
+    for i in range(count):
+        delta = {"visa_type": f"H-1B/{i}"}
+        if i % 50 == 0:
+            delta["citizenship_status"] = "alien_authorized" if i % 100 else "lpr"
+        yield delta
+
+
+def incremental_apply(ledger: list):
+    def apply(state: I9State, delta: dict) -> I9State:
+        state = apply_state_delta(state, delta)
+        ledger.extend(state.drain_audit())
+        return state
+    return apply
+
+
+def run(label: str, apply, state: I9State, count: int, bucket: int, audit_count) -> None:
+    buckets, start = [], time.perf_counter()
+    for i, delta in enumerate(deltas(count), 1):
+        state = apply(state, delta)
+        if i % bucket == 0:
+            now = time.perf_counter()
+            buckets.append((now - start) / bucket * 1e6)
+            start = now
+    per_bucket = "  ".join(f"{us:7.1f}" for us in buckets)
+    print(f"{label:<12} audit={audit_count(state):>6}  us/delta per {bucket}: {per_bucket}")
+    print(f"{'':<12} growth last/first bucket: {buckets[-1] / buckets[0]:.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--deltas", type=int, default=10000)
+    parser.add_argument("--legacy-deltas", type=int, default=3000)
+    parser.add_argument("--bucket", type=int, default=1000)
+    args = parser.parse_args()
+
+    run("legacy", legacy_apply, LegacyI9State(), args.legacy_deltas, args.bucket, lambda s: len(s.audit_trail))
+    ledger = []
+    run("incremental", incremental_apply(ledger), I9State(), args.deltas, args.bucket, lambda s: len(ledger))
+
+
+if __name__ == "__main__":
+    main()
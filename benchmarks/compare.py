@@ -0,0 +1,77 @@
+# benchmarks/compare.py
+"""
+Diffs two result files written by benchmarks.results.save_results and flags regressions.
+
+Every numeric leaf under "results" present in both files is compared. Latencies
+(*_ms) regress when they grow, throughputs (*_per_sec) when they shrink; counts and
+other leaves are shown but never fail the run. Exits 1 when any change is worse than
+--threshold percent, so it can gate CI.
+
+    python -m benchmarks.compare benchmarks/results/bench_core-A.json benchmarks/results/bench_core-B.json [--threshold 10]
+"""
+import argparse
+import json
+import sys
+from typing import Dict, Iterator, Tuple
+
+
+def _leaves(node, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    if isinstance(node, dict):
+        for key in sorted(node):
+            yield from _leaves(node[key], f"{prefix}.{key}" if prefix else key)
+    elif isinstance(node, list):
+        for index, item in enumerate(node):
+            # Lists of levels/cases are keyed by their label when they have one
+            label = item.get("concurrency", item.get("name", index)) if isinstance(item, dict) else index
+            yield from _leaves(item, f"{prefix}[{label}]")
+    elif isinstance(node, (int, float)) and not isinstance(node, bool):
+        yield prefix, float(node)
+
+
+def _direction(path: str) -> int:
+    """+1 if bigger is worse, -1 if smaller is worse, 0 if informational."""
+    leaf = path.rsplit(".", 1)[-1]
+    if leaf.endswith("_ms"):
+        return 1
+    if leaf.endswith("_per_sec"):
+        return -1
+    return 0
+
+
+def compare(old: dict, new: dict, threshold: float) -> int:
+    before: Dict[str, float] = dict(_leaves(old["results"]))
+    after: Dict[str, float] = dict(_leaves(new["results"]))
+    print(f"{old['benchmark']}: {old['environment'].get('commit')} -> {new['environment'].get('commit')}")
+    regressions = 0
+    for path in sorted(set(before) & set(after)):
+        a, b = before[path], after[path]
+        change = (b - a) / a * 100 if a else 0.0
+        direction = _direction(path)
+        flag = ""
+        if direction and change * direction > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif direction and change * direction < -threshold:
+            flag = "  improved"
+        print(f"  {path:<60} {a:>12.3f} -> {b:>12.3f}  {change:+7.1f}%{flag}")
+    print(f"{regressions} regression(s) beyond {threshold:.0f}%")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent change that counts as a regression")
+    args = parser.parse_args()
+    with open(args.old, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    if old.get("benchmark") != new.get("benchmark"):
+        sys.exit(f"Different benchmarks: {old.get('benchmark')} vs {new.get('benchmark')}")
+    sys.exit(1 if compare(old, new, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
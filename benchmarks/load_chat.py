@@ -0,0 +1,130 @@
+# benchmarks/load_chat.py
+"""
+End-to-end load generator for /api/chat/employee. Each virtual employee runs one
+scripted SSE session (INIT greeting, then the answers in --turns), and concurrency is
+stepped through --concurrency so latency can be read against load.
+
+Per level it reports, per turn:
+  latency     request sent -> final SSE event (result / error / overloaded)
+  first_event request sent -> first SSE event (what the employee perceives as "typing")
+and turns/sec over the level's wall time, plus the final event types seen.
+
+Start the mock provider and the app first, e.g.:
+
+    python -m benchmarks.mock_openai_server --port 8100 --latency-ms 800
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=mock uvicorn backend.main:app --port 8000
+    python -m benchmarks.load_chat --base-url http://127.0.0.1:8000 --concurrency 1,8,32,64 --sessions 64
+
+Every session sends the same script, so the response cache answers all but the first
+one; start the app with RESPONSE_CACHE_ENABLED=false to measure LLM turns. The gateway's
+LLM_TPM_LIMIT (tier quota) also applies to the mock; raise it to measure the app itself.
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from collections import Counter
+from typing import List
+
+import httpx
+
+from benchmarks.results import save_results, summarize
+
+DEFAULT_TURNS = [
+    # Long enough to skip the fast path, so every turn exercises the LLM round-trip
+    "Yes, I am joining on an H-1B visa, I have a social security number and my authorization expires next year",
+]
+
+
+async def run_turn(client: httpx.AsyncClient, url: str, session_id: str, message: str) -> dict:
+    started = time.perf_counter()
+    first_event, final_type = None, "no_result"
+    try:
+        async with client.stream("POST", url, json={"session_id": session_id, "message": message}) as response:
+            if response.status_code != 200:
+                return {"latency": time.perf_counter() - started, "first_event": None, "type": f"http_{response.status_code}"}
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                if first_event is None:
+                    first_event = time.perf_counter() - started
+                event_type = json.loads(line[6:]).get("type")
+                if event_type in ("result", "error", "overloaded"):
+                    final_type = event_type
+    except httpx.HTTPError as e:
+        final_type = type(e).__name__
+    return {"latency": time.perf_counter() - started, "first_event": first_event, "type": final_type}
+
+
+async def run_session(client: httpx.AsyncClient, url: str, session_id: str, turns: List[str]) -> List[dict]:
+    outcomes = []
+    for message in ["INIT_CONVERSATION"] + turns:
+        outcome = await run_turn(client, url, session_id, message)
+        outcomes.append(outcome)
+        if outcome["type"] != "result":
+            # A real employee would retry later; the rest of this script is meaningless now
+            break
+    return outcomes
+
+
+async def run_level(base_url: str, concurrency: int, sessions: int, turns: List[str], timeout: float, run_id: str) -> dict:
+    url = f"{base_url.rstrip('/')}/api/chat/employee"
+    gate = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        async def one(index: int) -> List[dict]:
+            async with gate:
+                return await run_session(client, url, f"load-{run_id}-c{concurrency}-{index}", turns)
+
+        started = time.perf_counter()
+        per_session = await asyncio.gather(*(one(i) for i in range(sessions)))
+        wall = time.perf_counter() - started
+
+    outcomes = [outcome for session in per_session for outcome in session]
+    ok = [o for o in outcomes if o["type"] == "result"]
+    level = {
+        "concurrency": concurrency,
+        "sessions": sessions,
+        "turns": len(outcomes),
+        "wall_seconds": wall,
+        "turns_per_sec": len(ok) / wall if wall else 0.0,
+        "outcomes": dict(Counter(o["type"] for o in outcomes)),
+        "latency": summarize([o["latency"] for o in ok]),
+        "first_event": summarize([o["first_event"] for o in ok if o["first_event"] is not None]),
+    }
+    latency = level["latency"]
+    print(f"c={concurrency:<4} turns={len(outcomes):<5} ok={len(ok):<5} {level['turns_per_sec']:7.1f} turns/s  "
+          f"p50 {latency.get('p50_ms', 0):8.1f} ms  p95 {latency.get('p95_ms', 0):8.1f} ms  "
+          f"p99 {latency.get('p99_ms', 0):8.1f} ms  first event p50 {level['first_event'].get('p50_ms', 0):7.1f} ms  "
+          f"{level['outcomes']}")
+    return level
+
+
+async def run(args) -> dict:
+    run_id = uuid.uuid4().hex[:8]
+    levels = []
+    for concurrency in args.concurrency:
+        levels.append(await run_level(args.base_url, concurrency, args.sessions or concurrency * 4,
+                                      args.turns, args.timeout, run_id))
+    return {"levels": levels}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=lambda v: [int(c) for c in v.split(",")], default=[1, 4, 16, 64],
+                        help="Comma-separated concurrent sessions per level")
+    parser.add_argument("--sessions", type=int, default=0, help="Sessions per level (default: 4x the concurrency)")
+    parser.add_argument("--turns", nargs="+", default=DEFAULT_TURNS, help="Employee messages sent after INIT_CONVERSATION")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--out", default=None, help="Result file (default: benchmarks/results/load_chat-<timestamp>.json)")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    save_results("load_chat", results, vars(args), args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+# benchmarks/mock_openai_server.py
+"""
+A local stand-in for the OpenAI API, for load-testing the LLM gateway without spending
+tokens. Speaks just enough of /v1/chat/completions (JSON and SSE streaming) and
+/v1/embeddings for the openai SDK, with tunable latency, concurrency cap and failures.
+
+Deterministic: latency jitter and injected errors come from a seeded RNG (--seed), chat
+replies are scripted from the last user message (see reply_for), and embeddings are
+feature-hashed from the input text, so two runs with the same flags see the same traffic.
+
+    python -m benchmarks.mock_openai_server --port 8100 --latency-ms 800 --max-concurrency 20 --error-rate 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=mock uvicorn backend.main:app
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from backend.embeddings import HashingEmbeddingFunction
+
+app = FastAPI(title="Mock OpenAI")
+
+CONFIG = {
+    "latency_ms": 800.0, "jitter_ms": 200.0, "max_concurrency": 20, "error_rate": 0.0, "chunk_chars": 8,
+    "embedding_latency_ms": 20.0, "embedding_dim": 1536, "seed": 0,
+}
+STATS = {"in_flight": 0, "served": 0, "rate_limited": 0, "errors": 0, "embeddings": 0}
+RNG = random.Random(CONFIG["seed"])
+
+REPLY = {
+    "intent": "ASK_QUESTION",
+    "state_delta": {},
+    "narration": "Thank you. Could you confirm your citizenship or immigration status for Section 1?",
+    "confidence_score": 0.9,
+}
+GREETING = {
+    "intent": "ASK_QUESTION",
+    "state_delta": {},
+    "narration": (
+        "Hello! I'm an AI assistant helping you complete Section 1 of Form I-9; I don't make final legal "
+        "determinations. Our records indicate you are joining us on an H-1B visa. Is this correct?"
+    ),
+    "confidence_score": 0.95,
+}
+# An answer that resolves every gap, so a scripted session reaches FORM_READY
+RESOLVED = {
+    "intent": "STATE_UPDATE",
+    "state_delta": {
+        "citizenship_status": "alien_authorized", "visa_type": "H-1B",
+        "ssn_status_resolved": True, "expiration_date_resolved": True,
+    },
+    "narration": "Thank you for confirming. Section 1 of your Form I-9 is ready.",
+    "confidence_score": 0.95,
+}
+
+
+def reply_for(messages) -> dict:
+    """INIT greets, a message mentioning a visa or SSN resolves every gap, anything else gets a question."""
+    last = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+    if last == "INIT_CONVERSATION":
+        return GREETING
+    lowered = last.lower()
+    if any(word in lowered for word in ("h-1b", "visa", "ssn", "social security")):
+        return RESOLVED
+    return REPLY
+
+
+def _error(status: int, message: str, retry_after: float = None) -> JSONResponse:
+    headers = {"retry-after": f"{retry_after:.2f}"} if retry_after else {}
+    return JSONResponse({"error": {"message": message, "type": "mock_error", "code": status}}, status_code=status, headers=headers)
+
+
+def _usage(messages, text: str) -> dict:
+    prompt = sum(len(m.get("content") or "") for m in messages) // 4
+    completion = len(text) // 4
+    return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+
+@app.get("/stats")
+async def stats():
+    return {**STATS, **CONFIG}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    if STATS["in_flight"] >= CONFIG["max_concurrency"]:
+        STATS["rate_limited"] += 1
+        return _error(429, "Rate limit reached (mock)", retry_after=0.5)
+    if RNG.random() < CONFIG["error_rate"]:
+        STATS["errors"] += 1
+        return _error(RNG.choice([500, 502, 503]), "Upstream failure (mock)")
+
+    model = body.get("model", "gpt-4o")
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+    created = int(time.time())
+    latency = max(0.0, RNG.gauss(CONFIG["latency_ms"], CONFIG["jitter_ms"])) / 1000
+    messages = body.get("messages", [])
+    text = json.dumps(reply_for(messages))
+
+    if not body.get("stream"):
+        STATS["in_flight"] += 1
+        try:
+            await asyncio.sleep(latency)
+        finally:
+            STATS["in_flight"] -= 1
+        STATS["served"] += 1
+        return {
+            "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": _usage(messages, text),
+        }
+
+    async def events():
+        # Counted only once the body starts: a client that disconnects before that never
+        # enters the generator, so the slot would never be released
+        STATS["in_flight"] += 1
+        try:
+            # Time to first token, then the rest spread over a short tail
+            await asyncio.sleep(latency * 0.4)
+            size = CONFIG["chunk_chars"]
+            pieces = [text[i:i + size] for i in range(0, len(text), size)]
+            for piece in pieces:
+                chunk = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(latency * 0.6 / len(pieces))
+            done = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            }
+            yield f"data: {json.dumps(done)}\n\n"
+            if (body.get("stream_options") or {}).get("include_usage"):
+                usage = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                         "choices": [], "usage": _usage(messages, text)}
+                yield f"data: {json.dumps(usage)}\n\n"
+            yield "data: [DONE]\n\n"
+            STATS["served"] += 1
+        finally:
+            STATS["in_flight"] -= 1
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    inputs = body.get("input", [])
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    await asyncio.sleep(CONFIG["embedding_latency_ms"] / 1000)
+    STATS["embeddings"] += len(inputs)
+    vectors = HashingEmbeddingFunction(dim=int(body.get("dimensions") or CONFIG["embedding_dim"]))(inputs)
+    tokens = sum(len(text) for text in inputs) // 4
+    return {
+        "object": "list",
+        "data": [{"object": "embedding", "index": i, "embedding": vector} for i, vector in enumerate(vectors)],
+        "model": body.get("model", "text-embedding-3-small"),
+        "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+    }
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=CONFIG["latency_ms"])
+    parser.add_argument("--jitter-ms", type=float, default=CONFIG["jitter_ms"])
+    parser.add_argument("--max-concurrency", type=int, default=CONFIG["max_concurrency"])
+    parser.add_argument("--error-rate", type=float, default=CONFIG["error_rate"])
+    parser.add_argument("--embedding-latency-ms", type=float, default=CONFIG["embedding_latency_ms"])
+    parser.add_argument("--seed", type=int, default=CONFIG["seed"])
+    args = parser.parse_args()
+    CONFIG.update(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                  max_concurrency=args.max_concurrency, error_rate=args.error_rate,
+                  embedding_latency_ms=args.embedding_latency_ms, seed=args.seed)
+    RNG.seed(args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+// HR back office: counts from /api/bo/summary, one page of /api/bo/sessions at a time.
+// Every filter is answered by the backend's secondary indexes; nothing is filtered here.
+const API_BASE = "http://localhost:8001";
+const PAGE_SIZE = 50;
+
+const totalsEl = document.getElementById("totals");
+const rowsEl = document.getElementById("rows");
+const statusEl = document.getElementById("indexStatus");
+const pageInfoEl = document.getElementById("pageInfo");
+const prevBtn = document.getElementById("prev");
+const nextBtn = document.getElementById("next");
+
+const filters = {
+    gap: document.getElementById("fGap"),
+    citizenship: document.getElementById("fCitizenship"),
+    workflow: document.getElementById("fWorkflow"),
+    employer: document.getElementById("fEmployer"),
+    due: document.getElementById("fDue"),
+    overdue: document.getElementById("fOverdue"),
+};
+// Facet name in /api/bo/summary for each filter that is filled from it
+const FACET_FILTERS = { gap: "gap", citizenship: "citizenship", workflow: "workflow", employer: "employer" };
+
+let offset = 0;
+
+function escapeHtml(value) {
+    const div = document.createElement("div");
+    div.textContent = value ?? "";
+    return div.innerHTML;
+}
+
+function chip(label, value) {
+    return `<div class="total-chip"><div class="k">${escapeHtml(label)}</div><div class="v">${value}</div></div>`;
+}
+
+function fillSelect(select, counts) {
+    const current = select.value;
+    select.innerHTML = `<option value="">Any</option>` + Object.entries(counts)
+        .map(([value, n]) => `<option value="${escapeHtml(value)}">${escapeHtml(value)} (${n})</option>`)
+        .join("");
+    select.value = counts[current] ? current : "";
+}
+
+async function loadSummary() {
+    const res = await fetch(`${API_BASE}/api/bo/summary`);
+    const summary = await res.json();
+
+    const due = summary.deadlines[filters.due.value];
+    totalsEl.innerHTML = [
+        chip("Open sessions", summary.sessions),
+        chip("Ready for form", summary.ready_for_form),
+        chip("Overdue", due.overdue),
+        chip("Due in 7 days", due.due_soon),
+    ].join("");
+
+    for (const [name, facet] of Object.entries(FACET_FILTERS)) {
+        fillSelect(filters[name], summary.facets[facet] || {});
+    }
+    statusEl.textContent = `Summary in ${summary.took_ms} ms`;
+}
+
+async function loadPage() {
+    const params = new URLSearchParams({ offset, limit: PAGE_SIZE, due: filters.due.value });
+    for (const name of ["gap", "citizenship", "workflow", "employer", "overdue"]) {
+        if (filters[name].value) params.set(name, filters[name].value);
+    }
+    const res = await fetch(`${API_BASE}/api/bo/sessions?${params}`);
+    const page = await res.json();
+    const today = new Date().toISOString().slice(0, 10);
+
+    rowsEl.innerHTML = page.sessions.map(s => {
+        const due = s.deadlines[filters.due.value] || "";
+        const dueClass = due && due < today ? "due-overdue" : "";
+        const section2 = s.deadlines.section2
+            ? `<button class="btn" data-section2="${escapeHtml(s.session_id)}">Section 2 done</button>`
+            : "";
+        const gaps = s.compliance_gaps.map(g => `<span class="gap-pill">${escapeHtml(g)}</span>`).join("") || "None";
+        return `<tr>
+            <td>${escapeHtml(s.session_id)}</td>
+            <td>${escapeHtml(s.employee_name)}</td>
+            <td>${escapeHtml(s.employer)}</td>
+            <td>${escapeHtml(s.citizenship_status)}</td>
+            <td>${escapeHtml(s.workflow_mode)}</td>
+            <td>${gaps}</td>
+            <td class="${dueClass}">${escapeHtml(due)}</td>
+            <td>${section2}</td>
+        </tr>`;
+    }).join("");
+
+    const last = Math.min(offset + page.sessions.length, page.total);
+    pageInfoEl.textContent = page.total
+        ? `${offset + 1}-${last} of ${page.total} (${page.took_ms} ms)`
+        : "No matching sessions";
+    prevBtn.disabled = offset === 0;
+    nextBtn.disabled = page.next_offset === null;
+}
+
+async function refresh() {
+    try {
+        await loadSummary();
+        await loadPage();
+    } catch (err) {
+        statusEl.textContent = "Backend unreachable";
+        console.error(err);
+    }
+}
+
+// Recording Section 2 drops its deadline (and pending reminders) on the backend
+rowsEl.addEventListener("click", async (event) => {
+    const sessionId = event.target.dataset.section2;
+    if (!sessionId) return;
+    event.target.disabled = true;
+    await fetch(`${API_BASE}/api/bo/sessions/${encodeURIComponent(sessionId)}/section2`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: "{}",
+    });
+    refresh();
+});
+
+for (const select of Object.values(filters)) {
+    select.addEventListener("change", () => { offset = 0; refresh(); });
+}
+prevBtn.addEventListener("click", () => { offset = Math.max(0, offset - PAGE_SIZE); loadPage(); });
+nextBtn.addEventListener("click", () => { offset += PAGE_SIZE; loadPage(); });
+
+window.addEventListener("DOMContentLoaded", refresh);